@@ -0,0 +1,247 @@
+import os
+import shutil
+import hashlib
+from typing import Dict, List, Tuple
+
+
+class AssetPlan:
+    """How every static file of a build reaches the output directory."""
+
+    def __init__(self):
+        # Destination path -> source path, for files copied as they are
+        self.copies: Dict[str, str] = {}
+        # (source root, destination root, [(input path, output dir), ...]) per
+        # static tree, for images handed to the ImageProcessor instead
+        self.conversions: List[Tuple[str, str, List[Tuple[str, str]]]] = []
+
+    def conversion_count(self) -> int:
+        return sum(len(jobs) for _, _, jobs in self.conversions)
+
+
+def build_asset_plan(sources: List[Tuple[str, str, bool]], image_processor=None) -> AssetPlan:
+    """
+    Decide once, up front, what happens to each static file.
+
+    Args:
+        sources: (source root, destination root, convert images?) tuples, in
+                 copy order; a later tree overrides files of an earlier one
+        image_processor: ImageProcessor used to pick the images to convert,
+                         or None to copy everything
+
+    Returns:
+        AssetPlan where each file is either copied or converted, never both
+        (originals kept by keep_original are written by the ImageProcessor)
+    """
+    plan = AssetPlan()
+
+    for source_root, destination_root, convert in sources:
+        if not os.path.isdir(source_root):
+            continue
+
+        jobs = []
+        for root, dirs, files in os.walk(source_root):
+            dirs.sort()
+            rel_path = os.path.relpath(root, source_root)
+            output_dir = os.path.join(destination_root, rel_path) if rel_path != '.' else destination_root
+
+            for filename in sorted(files):
+                source_path = os.path.join(root, filename)
+                if convert and image_processor and image_processor.should_process(source_path):
+                    jobs.append((source_path, output_dir))
+                else:
+                    plan.copies[os.path.join(output_dir, filename)] = source_path
+
+        if jobs:
+            plan.conversions.append((source_root, destination_root, jobs))
+
+    return plan
+
+
+class AssetSync:
+    """
+    Incremental sync of planned copies into an existing output directory.
+
+    Files whose destination already matches the source (same size and
+    mtime, or same content when use_hash is on) are left alone. Changed
+    files are copied, hard-linked or reflinked depending on mode.
+    """
+
+    MODES = ('copy', 'hardlink', 'reflink')
+
+    # Files the build may rewrite in place (pages, project-site URL and image
+    # reference rewriting, sitemap/search/feed outputs). These are always
+    # copied fresh: never linked (that would modify the source) and never
+    # skipped (the previous output may already be rewritten).
+    REWRITTEN_EXTENSIONS = {'.html', '.htm', '.css', '.js', '.json', '.xml', '.rss'}
+
+    def __init__(self, mode: str = 'copy', use_hash: bool = False):
+        """
+        Args:
+            mode: 'copy', 'hardlink' or 'reflink' (copy-on-write clone);
+                  links fall back to copying where unsupported
+            use_hash: Compare content hashes instead of mtimes
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown asset sync mode '{mode}', expected one of {', '.join(self.MODES)}")
+        self.mode = mode
+        self.use_hash = use_hash
+        self._unchanged = set()
+        self.stats = {'copied': 0, 'linked': 0, 'skipped': 0, 'removed': 0,
+                      'bytes_copied': 0, 'bytes_linked': 0, 'bytes_skipped': 0}
+
+    def _is_rewritten(self, path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in self.REWRITTEN_EXTENSIONS
+
+    def _up_to_date(self, source: str, destination: str) -> bool:
+        try:
+            src_stat = os.stat(source)
+            dst_stat = os.stat(destination)
+        except OSError:
+            return False
+        if os.path.samestat(src_stat, dst_stat):
+            return True
+        if src_stat.st_size != dst_stat.st_size:
+            return False
+        if self.use_hash:
+            return _hash_file(source) == _hash_file(destination)
+        return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+    def prune_output(self, output_root: str, plan: AssetPlan):
+        """
+        Empty output_root except for planned copies that are still current.
+
+        Replaces wiping the whole output directory before a build.
+        """
+        self._unchanged = set()
+        if not os.path.isdir(output_root):
+            return
+
+        for root, dirs, files in os.walk(output_root, topdown=False):
+            for filename in files:
+                path = os.path.join(root, filename)
+                source = plan.copies.get(path)
+                if source and not self._is_rewritten(path) and self._up_to_date(source, path):
+                    self._unchanged.add(path)
+                    continue
+                os.remove(path)
+                self.stats['removed'] += 1
+            for dirname in dirs:
+                path = os.path.join(root, dirname)
+                if os.path.islink(path):
+                    os.remove(path)
+                elif not os.listdir(path):
+                    os.rmdir(path)
+
+    def seed_from(self, previous_root: str, output_root: str, plan: AssetPlan):
+        """
+        Start a fresh output_root from the still-current assets of a previous build.
+
+        Used when each build goes into a new staging directory: planned
+        copies that are unchanged in previous_root are hard-linked (the
+        previous build is never modified, so sharing the inode is safe)
+        and then skipped by sync(). Falls back to copying across filesystems.
+        """
+        self._unchanged = set()
+        if not os.path.isdir(previous_root):
+            return
+
+        for destination, source in plan.copies.items():
+            if self._is_rewritten(destination):
+                continue
+            previous = os.path.join(previous_root, os.path.relpath(destination, output_root))
+            if not self._up_to_date(source, previous):
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                os.link(previous, destination)
+            except OSError:
+                shutil.copy2(previous, destination)
+            self._unchanged.add(destination)
+
+    def _place(self, source: str, destination: str) -> str:
+        """Materialize one file; returns 'copied' or 'linked'."""
+        if os.path.lexists(destination):
+            os.remove(destination)
+        if self.mode != 'copy' and not self._is_rewritten(destination):
+            try:
+                if self.mode == 'hardlink':
+                    os.link(source, destination)
+                else:
+                    _reflink(source, destination)
+                return 'linked'
+            except OSError:
+                if os.path.lexists(destination):
+                    os.remove(destination)
+        shutil.copy2(source, destination)
+        return 'copied'
+
+    def sync(self, plan: AssetPlan) -> Dict[str, int]:
+        """
+        Bring every planned copy up to date.
+
+        Args:
+            plan: AssetPlan from build_asset_plan()
+
+        Returns:
+            Counters: copied, linked, skipped, removed and bytes per outcome
+        """
+        created_dirs = set()
+
+        for destination, source in plan.copies.items():
+            if destination in self._unchanged:
+                self.stats['skipped'] += 1
+                self.stats['bytes_skipped'] += os.path.getsize(destination)
+                continue
+
+            parent = os.path.dirname(destination)
+            if parent not in created_dirs:
+                os.makedirs(parent, exist_ok=True)
+                created_dirs.add(parent)
+            try:
+                outcome = self._place(source, destination)
+            except shutil.SameFileError:
+                print("Source and destination represent the same file.")
+                continue
+            except PermissionError:
+                print(f"Permission denied: {destination}")
+                continue
+            self.stats[outcome] += 1
+            self.stats[f"bytes_{outcome}"] += os.path.getsize(destination)
+
+        return self.stats
+
+    def summary(self) -> str:
+        """One-line report of the last sync."""
+        stats = self.stats
+        line = (f"Static assets: {stats['copied']} copied ({_format_bytes(stats['bytes_copied'])}), "
+                f"{stats['skipped']} unchanged ({_format_bytes(stats['bytes_skipped'])})")
+        if self.mode != 'copy':
+            line += f", {stats['linked']} {self.mode}ed ({_format_bytes(stats['bytes_linked'])})"
+        return line
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source: str, destination: str):
+    """Copy-on-write clone (Linux FICLONE); raises OSError where unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    FICLONE = 0x40049409
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, destination)
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
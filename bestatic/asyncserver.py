@@ -0,0 +1,261 @@
+import asyncio
+import io
+import os
+import stat
+import html
+import posixpath
+import mimetypes
+import http.client
+import email.utils
+from http import HTTPStatus
+from urllib.parse import urlsplit, urlunsplit, unquote
+
+from bestatic.httpserver import EXTENSIONS_MAP, file_etag, is_not_modified, requested_range
+from bestatic import livereload
+
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class AsyncStaticServer:
+    """
+    Single-threaded asyncio static file server.
+
+    Same responses as BestaticHandler (keep-alive, ETag/Last-Modified, 304,
+    single byte ranges, optional no-store) but each connection is a
+    coroutine instead of an OS thread, at most max_connections are served
+    at once, and file bodies go out with loop.sendfile (os.sendfile where
+    the platform has it). Directories without an index page are 404s.
+    With a live_reload hub, HTML pages get the live reload client script
+    and rebuild events are streamed from livereload.EVENTS_PATH.
+    """
+
+    def __init__(self, directory, no_store=False, max_connections=256, idle_timeout=15, live_reload=None):
+        """
+        Initialize the server.
+
+        Args:
+            directory: Directory to serve
+            no_store: Send no-store cache headers instead of validators
+            max_connections: Connections handled concurrently; others wait
+            idle_timeout: Seconds an idle keep-alive connection is kept open
+            live_reload: LiveReloadHub to stream rebuild events from, or None
+        """
+        self.directory = os.path.abspath(directory)
+        self.no_store = no_store
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.extensions_map = EXTENSIONS_MAP
+        self.live_reload = live_reload
+        self._slots = None
+
+    def guess_type(self, path):
+        base, ext = posixpath.splitext(path)
+        if ext in self.extensions_map:
+            return self.extensions_map[ext]
+        ext = ext.lower()
+        if ext in self.extensions_map:
+            return self.extensions_map[ext]
+        guess, _ = mimetypes.guess_type(path)
+        return guess or 'application/octet-stream'
+
+    def translate_path(self, url_path):
+        """Map a URL path to a file under the served directory (as SimpleHTTPRequestHandler does)."""
+        trailing_slash = url_path.rstrip().endswith('/')
+        url_path = posixpath.normpath(unquote(url_path, errors='surrogatepass'))
+        path = self.directory
+        for word in filter(None, url_path.split('/')):
+            if os.path.dirname(word) or word in (os.curdir, os.pardir):
+                continue
+            path = os.path.join(path, word)
+        if trailing_slash:
+            path += '/'
+        return path
+
+    async def start(self, host=None, port=8080, reuse_port=False):
+        """Bind and start accepting connections; returns the asyncio.Server."""
+        self._slots = asyncio.Semaphore(self.max_connections)
+        return await asyncio.start_server(self.handle_client, host, port, reuse_address=True,
+                                          reuse_port=reuse_port or None,
+                                          limit=MAX_HEADER_BYTES, backlog=self.max_connections)
+
+    async def handle_client(self, reader, writer):
+        async with self._slots:
+            try:
+                while True:
+                    try:
+                        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                            asyncio.TimeoutError, ConnectionError):
+                        break
+                    if not await self.handle_request(head, reader, writer):
+                        break
+            except ConnectionError:
+                pass  # Ignore client disconnects
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+
+    async def handle_request(self, head, reader, writer):
+        """Answer one request; returns True to keep the connection open."""
+        request_line, _, header_block = head.partition(b"\r\n")
+        parts = request_line.decode('iso-8859-1').split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            await self.send_error(writer, HTTPStatus.BAD_REQUEST, keep_alive=False)
+            return False
+        method, target, version = parts
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+
+        connection = headers.get("Connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        body_length = headers.get("Content-Length")
+        if body_length and body_length.isdigit():
+            await reader.readexactly(int(body_length))
+
+        if method not in ("GET", "HEAD"):
+            await self.send_error(writer, HTTPStatus.NOT_IMPLEMENTED, keep_alive)
+            return keep_alive
+
+        if self.live_reload is not None:
+            url_path = urlsplit(target).path
+            if url_path == livereload.EVENTS_PATH:
+                await self.stream_events(writer)
+                return False
+            if url_path == livereload.SCRIPT_PATH:
+                await self.send_body(method, writer, livereload.CLIENT_SCRIPT.encode("utf-8"),
+                                     [("Content-Type", "text/javascript")], keep_alive)
+                return keep_alive
+
+        await self.send_file(method, target, headers, writer, keep_alive)
+        return keep_alive
+
+    async def stream_events(self, writer):
+        """Hold the connection open and push rebuild events to the browser."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def deliver(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        self.live_reload.subscribe(deliver)
+        try:
+            self.write_head(writer, HTTPStatus.OK, [("Content-Type", "text/event-stream")], keep_alive=False)
+            writer.write(b"retry: 1000\n\n")
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), livereload.PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    event = b": ping\n\n"  # Detects browsers that went away
+                writer.write(event)
+                await writer.drain()
+        finally:
+            self.live_reload.unsubscribe(deliver)
+
+    async def send_body(self, method, writer, body, headers, keep_alive):
+        """Send an in-memory response body."""
+        self.write_head(writer, HTTPStatus.OK, [("Content-Length", str(len(body)))] + headers, keep_alive)
+        if method == "GET":
+            writer.write(body)
+        await writer.drain()
+
+    def write_head(self, writer, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 "Server: Bestatic",
+                 f"Date: {email.utils.formatdate(usegmt=True)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if self.no_store:
+            lines += ["Cache-Control: no-cache, no-store, must-revalidate", "Pragma: no-cache", "Expires: 0"]
+        else:
+            lines.append("Cache-Control: no-cache")
+        lines += [f"{name}: {value}" for name, value in headers]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1', 'strict'))
+
+    async def send_error(self, writer, status, keep_alive):
+        body = (f"<!DOCTYPE html><html><head><title>Error response</title></head><body>"
+                f"<h1>{status.value} {html.escape(status.phrase)}</h1></body></html>").encode('utf-8')
+        self.write_head(writer, status, [("Content-Type", "text/html;charset=utf-8"),
+                                         ("Content-Length", str(len(body)))], keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+    async def send_file(self, method, target, headers, writer, keep_alive):
+        parts = urlsplit(target)
+        path = self.translate_path(parts.path)
+
+        if os.path.isdir(path):
+            if not parts.path.endswith('/'):
+                location = urlunsplit(('', '', parts.path + '/', parts.query, ''))
+                self.write_head(writer, HTTPStatus.MOVED_PERMANENTLY,
+                                [("Location", location), ("Content-Length", "0")], keep_alive)
+                await writer.drain()
+                return
+            path = next((os.path.join(path, index) for index in ("index.html", "index.htm")
+                         if os.path.isfile(os.path.join(path, index))), path)
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            await self.send_error(writer, HTTPStatus.NOT_FOUND, keep_alive)
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                await self.send_error(writer, HTTPStatus.NOT_FOUND, keep_alive)
+                return
+            etag = file_etag(st)
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+            if not self.no_store and is_not_modified(headers, etag, st.st_mtime):
+                self.write_head(writer, HTTPStatus.NOT_MODIFIED,
+                                [("ETag", etag), ("Last-Modified", last_modified)], keep_alive)
+                await writer.drain()
+                return
+
+            content_type = self.guess_type(path)
+            if self.live_reload is not None and content_type.startswith("text/html"):
+                response_headers = [("Content-Type", content_type), ("Last-Modified", last_modified)]
+                if not self.no_store:
+                    response_headers.append(("ETag", etag))
+                await self.send_body(method, writer, livereload.inject_script(f.read()), response_headers, keep_alive)
+                return
+
+            byte_range = requested_range(headers, st.st_size, etag, st.st_mtime)
+            if byte_range and byte_range[0] >= st.st_size:
+                self.write_head(writer, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                                [("Content-Range", f"bytes */{st.st_size}"), ("Content-Length", "0")], keep_alive)
+                await writer.drain()
+                return
+
+            response_headers = []
+            if byte_range:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+                response_headers.append(("Content-Range", f"bytes {start}-{end}/{st.st_size}"))
+            else:
+                start, end = 0, st.st_size - 1
+                status = HTTPStatus.OK
+            response_headers += [("Content-Length", str(end - start + 1)),
+                                 ("Content-Type", content_type),
+                                 ("Accept-Ranges", "bytes"),
+                                 ("Last-Modified", last_modified)]
+            if not self.no_store:
+                response_headers.append(("ETag", etag))
+            self.write_head(writer, status, response_headers, keep_alive)
+            await writer.drain()
+
+            if method == "GET" and end >= start:
+                await asyncio.get_running_loop().sendfile(writer.transport, f, start, end - start + 1)
+
+
+async def serve_async(directory, port=8080, no_store=False, max_connections=256, reuse_port=False,
+                      live_reload=None):
+    """Run an AsyncStaticServer until cancelled."""
+    server = await AsyncStaticServer(directory, no_store=no_store, max_connections=max_connections,
+                                     live_reload=live_reload).start(port=port, reuse_port=reuse_port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,285 @@
+"""
+End-to-end build benchmark on synthetic sites.
+
+    python -m bestatic.benchmark --sizes 1000 10000 100000 --tags 3 --code-density 0.3
+
+Each size is scaffolded in a temporary directory and built in a fresh
+process, which reports wall time, time per build phase, peak RSS and the
+bytes written to _output.
+"""
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+TIME_FORMAT = "%B %d, %Y"
+THEME = "Benchmark"
+
+THEME_TEMPLATES = {
+    "layout.html.jinja2": """<!DOCTYPE html>
+<html>
+<head><title>{{ title }}</title><link rel="stylesheet" href="/static/css/style.css"></head>
+<body>
+<nav>{% for item in nav or [] %}<a href="{{ item }}">{{ item }}</a>{% endfor %}</nav>
+{% block content %}{% endblock %}
+</body>
+</html>""",
+    "home.html.jinja2": """{% extends "layout.html.jinja2" %}
+{% block content %}<h1>{{ title }}</h1><p>{{ description }}</p>{% endblock %}""",
+    "post.html.jinja2": """{% extends "layout.html.jinja2" %}
+{% block content %}
+<article>
+<h1>{{ post.title }}</h1>
+<p>{{ post.metadata.date }}</p>
+<ul>{% for tag in post.tags or [] %}<li><a href="/{{ post_directory_singular }}/tags/{{ tag }}">{{ tag }}</a></li>{% endfor %}</ul>
+<div>{{ post.content|safe }}</div>
+{% if prev_slug %}<a href="/{{ post_directory_singular }}/{{ prev_slug }}">{{ prev_title }}</a>{% endif %}
+{% if next_slug %}<a href="/{{ post_directory_singular }}/{{ next_slug }}">{{ next_title }}</a>{% endif %}
+</article>
+{% endblock %}""",
+    "list.html.jinja2": """{% extends "layout.html.jinja2" %}
+{% block content %}
+<ul>{% for key, item in post.items() %}<li><a href="/{{ post_directory_singular }}/{{ item.slug }}">{{ item.title }}</a> {{ item.summary }}</li>{% endfor %}</ul>
+{% if page_index > 0 %}<a href="/{{ post_directory_plural }}{{ page_index if page_index > 1 else '' }}">Newer</a>{% endif %}
+{% if page_index + 1 < page_range %}<a href="/{{ post_directory_plural }}{{ page_index + 2 }}">Older</a>{% endif %}
+{% endblock %}""",
+    "taglist.html.jinja2": """{% extends "layout.html.jinja2" %}
+{% block content %}
+<h1>{{ taxonomy_name }}: {{ taxonomy_term }}</h1>
+<ul>{% for key, item in post.items() %}<li><a href="/{{ post_directory_singular }}/{{ item.slug }}">{{ item.title }}</a></li>{% endfor %}</ul>
+{% endblock %}""",
+    "page.html.jinja2": """{% extends "layout.html.jinja2" %}
+{% block content %}<article><h1>{{ page.title }}</h1><div>{{ page.content|safe }}</div></article>{% endblock %}""",
+}
+
+SHORTCODE = '''def render(attrs):
+    return f'<aside class="note note-{attrs.get("type", "info")}">{attrs.get("content", "")}</aside>'
+'''
+
+WORDS = ("static site generator markdown template build output page post tag theme python "
+         "feed sitemap image asset render parse cache server reload benchmark corpus").split()
+
+CODE_BLOCK = '''```python
+def handler(request):
+    """Return a response for request."""
+    items = [item for item in request.items if item.visible]
+    return {"count": len(items), "items": items}
+```'''
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _post_body(rng: random.Random, paragraphs: int, code_density: float, shortcode: bool) -> str:
+    blocks = []
+    for index in range(paragraphs):
+        if rng.random() < code_density:
+            blocks.append(CODE_BLOCK)
+        else:
+            blocks.append(" ".join(_sentence(rng) for _ in range(4)))
+        if index == 0:
+            blocks.append(f"## {_sentence(rng, 4)}")
+    if shortcode:
+        blocks.append('{!!{ note type=tip Remember to run the benchmark twice }!!}')
+    return "\n\n".join(blocks)
+
+
+def scaffold_site(root: str, posts: int = 1000, tags_per_post: int = 3, tag_pool: int = 100,
+                  code_density: float = 0.2, shortcode_density: float = 0.0, images: int = 0,
+                  taxonomies: Sequence[str] = ("tags",), pages: int = 5, paragraphs: int = 6,
+                  seed: int = 0) -> Dict:
+    """
+    Write a synthetic site under root.
+
+    Args:
+        root: Directory to create the site in
+        posts: Number of posts
+        tags_per_post: Terms per post in each taxonomy
+        tag_pool: Distinct terms per taxonomy
+        code_density: Fraction of paragraphs that are fenced code blocks
+        shortcode_density: Fraction of posts that use a shortcode
+        images: Number of PNG images under static-content (needs Pillow)
+        taxonomies: Taxonomy names, e.g. ("tags", "categories")
+        pages: Number of pages
+        paragraphs: Paragraphs per post
+        seed: Random seed, so the same parameters give the same site
+
+    Returns:
+        The site configuration to pass to generator()
+    """
+    from bestatic.newcontent import newpost, newpage
+
+    rng = random.Random(seed)
+    templates = os.path.join(root, "themes", THEME, "templates")
+    os.makedirs(templates, exist_ok=True)
+    for name, source in THEME_TEMPLATES.items():
+        with open(os.path.join(templates, name), "w", encoding="utf-8") as f:
+            f.write(source)
+    css_dir = os.path.join(root, "themes", THEME, "static", "css")
+    os.makedirs(css_dir, exist_ok=True)
+    with open(os.path.join(css_dir, "style.css"), "w", encoding="utf-8") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+
+    if shortcode_density > 0:
+        os.makedirs(os.path.join(root, "_shortcodes"), exist_ok=True)
+        with open(os.path.join(root, "_shortcodes", "note.py"), "w", encoding="utf-8") as f:
+            f.write(SHORTCODE)
+
+    start = time.mktime((2020, 1, 1, 0, 0, 0, 0, 0, -1))
+    previous_cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        for index in range(posts):
+            metadata = {'title': f"Post {index}: {_sentence(rng, 5)[:-1]}",
+                        'date': time.strftime(TIME_FORMAT, time.localtime(start + index * 3600)),
+                        'description': _sentence(rng)}
+            for taxonomy in taxonomies:
+                terms = rng.sample(range(tag_pool), min(tags_per_post, tag_pool))
+                metadata[taxonomy] = ", ".join(f"{taxonomy[:3]}{term}" for term in terms)
+            body = _post_body(rng, paragraphs, code_density, rng.random() < shortcode_density)
+            newpost(f"{index // 1000:03d}/post-{index}", TIME_FORMAT, metadata=metadata, content=body)
+        for index in range(pages):
+            newpage(f"page-{index}", metadata={'title': f"Page {index}"},
+                    content=_post_body(rng, paragraphs, code_density, False))
+    finally:
+        os.chdir(previous_cwd)
+
+    if images:
+        from PIL import Image
+        image_dir = os.path.join(root, "static-content", "images")
+        os.makedirs(image_dir, exist_ok=True)
+        for index in range(images):
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            Image.new("RGB", (800, 600), color).save(os.path.join(image_dir, f"image-{index}.png"))
+
+    return {
+        "siteURL": "http://example.org",
+        "title": "Benchmark Site",
+        "description": "A synthetic site for benchmarking Bestatic",
+        "theme": THEME,
+        "time_format": TIME_FORMAT,
+        "number_of_pages": max(posts // 10, 1),
+        "nav": {"Home": "/", "Posts": "/posts"},
+        "SHORTCODES": shortcode_density > 0,
+        "taxonomies": {name: {"taxonomy_template": "taglist.html.jinja2", "taxonomy_directory": name}
+                       for name in taxonomies},
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, or None where unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def directory_bytes(path: str) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for filename in files:
+            total += os.path.getsize(os.path.join(root, filename))
+    return total
+
+
+def measure_build(root: str, config: Dict) -> Dict:
+    """Build the site in root once (in this process) and measure it."""
+    from bestatic.generator import generator
+    from bestatic.tracing import PhaseTracer
+
+    tracer = PhaseTracer()
+    previous_cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator(tracer=tracer, **config)
+        wall = time.perf_counter() - started
+    finally:
+        os.chdir(previous_cwd)
+    return {"wall": wall, "phases": tracer.totals(), "peak_rss_mb": peak_rss_mb(),
+            "output_bytes": directory_bytes(os.path.join(root, "_output"))}
+
+
+def run_benchmark(sizes: Sequence[int] = DEFAULT_SIZES, isolate: bool = True, low_memory: bool = False,
+                  **site_options) -> List[Dict]:
+    """
+    Scaffold and build one site per size.
+
+    Args:
+        sizes: Post counts to benchmark
+        isolate: Build in a fresh process per size, so peak RSS and import
+                 time are not carried over from earlier builds
+        low_memory: Build in low-memory (streaming) mode
+        **site_options: Further scaffold_site() parameters
+
+    Returns:
+        One result per size: posts, scaffold, wall, phases (seconds per
+        phase), peak_rss_mb and output_bytes
+    """
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="bestatic-bench-") as root:
+            started = time.perf_counter()
+            config = scaffold_site(root, posts=size, **site_options)
+            config["low_memory"] = low_memory
+            scaffold = time.perf_counter() - started
+            if isolate:
+                with multiprocessing.get_context("spawn").Pool(1) as pool:
+                    result = pool.apply(measure_build, (root, config))
+            else:
+                result = measure_build(root, config)
+        results.append({"posts": size, "scaffold": scaffold, **result})
+    return results
+
+
+def format_report(results: List[Dict]) -> str:
+    """Plain-text table of run_benchmark() results."""
+    phases = []
+    for result in results:
+        phases += [name for name in result["phases"] if name not in phases]
+    header = ["posts", "wall s"] + [f"{name} s" for name in phases] + ["peak RSS MB", "output MB"]
+    rows = [header]
+    for result in results:
+        rss = result["peak_rss_mb"]
+        rows.append([str(result["posts"]), f"{result['wall']:.2f}"]
+                    + [f"{result['phases'].get(name, 0.0):.2f}" for name in phases]
+                    + ["n/a" if rss is None else f"{rss:.0f}", f"{result['output_bytes'] / (1024 * 1024):.1f}"])
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark full Bestatic builds on synthetic sites")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Post counts to build")
+    parser.add_argument("--tags", type=int, default=3, help="Terms per post in each taxonomy")
+    parser.add_argument("--tag-pool", type=int, default=100, help="Distinct terms per taxonomy")
+    parser.add_argument("--taxonomies", nargs="+", default=["tags"], help="Taxonomy names")
+    parser.add_argument("--code-density", type=float, default=0.2, help="Fraction of paragraphs that are code blocks")
+    parser.add_argument("--shortcode-density", type=float, default=0.0, help="Fraction of posts using a shortcode")
+    parser.add_argument("--images", type=int, default=0, help="Number of images in static-content")
+    parser.add_argument("--pages", type=int, default=5, help="Number of pages")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated content")
+    parser.add_argument("--low-memory", action="store_true", help="Build in low-memory (streaming) mode")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, tags_per_post=args.tags, tag_pool=args.tag_pool,
+                            taxonomies=args.taxonomies, code_density=args.code_density,
+                            shortcode_density=args.shortcode_density, images=args.images,
+                            pages=args.pages, seed=args.seed, low_memory=args.low_memory)
+    print(format_report(results))
+
+
+if __name__ == '__main__':
+    main()
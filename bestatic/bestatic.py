@@ -1,15 +1,10 @@
+# Only what every subcommand needs is imported here; actions import their
+# own dependencies so e.g. 'bestatic version' does not load the site builder
 import argparse
 import os
-import datetime
 import sys
 import time
-import frontmatter
-import yaml
-import shutil
-import multiprocessing
-import watchdog.events
-import watchdog.observers
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
 
 # --- CRITICAL FIX START ---
@@ -76,24 +71,46 @@ def suppress_stderr():
 if __name__ == '__main__' and __package__ is None:
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from bestatic.generator import generator
-from bestatic.httpserver import bestatic_serv
-from bestatic.quickstart import quickstart
-from bestatic.newcontent import newpost, newpage
 import bestatic
 
 
-def run_server(directory, port):
-    bestatic_serv(directory, port=port) if directory else bestatic_serv(port=port)
+def bestatic_serv(*directory, **serve_options):
+    """Start the HTTP server (imported on first use; see httpserver.bestatic_serv)."""
+    from bestatic.httpserver import bestatic_serv as serve
+    return serve(*directory, **serve_options)
 
 
-def run_watcher(config, port, *directoryname):
+def apply_dev_asset_mode(config):
+    """For autoreload builds, sync static assets with 'assets: dev_mode' (e.g. hardlink) if set."""
+    assets = config.get("assets") or {}
+    if assets.get("dev_mode"):
+        config["assets"] = {**assets, "mode": assets["dev_mode"]}
+    return config
+
+
+def run_server(directory, port, **serve_options):
+    bestatic_serv(directory, port=port, **serve_options) if directory else bestatic_serv(port=port, **serve_options)
+
+
+def run_watcher(config, port, *directoryname, invalidations=None, debounce=0.3, session=None):
+    import yaml
+    import watchdog.events
+    import watchdog.observers
+    from bestatic import changeset
+    from bestatic.generator import generator
+    from bestatic.publish import StagedOutput
+    from bestatic.rebuild import RebuildScheduler
+    from bestatic.session import BuildSession
+
     class RebuildEventHandler(watchdog.events.PatternMatchingEventHandler):
-        # last_rebuild_time = datetime.datetime.now()
-        # delay = datetime.timedelta(seconds=1)
         def __init__(self):
             self.config = config
             self.port = port
+            # Parsed documents, converters and templates kept warm between rebuilds
+            self.session = session or BuildSession()
+            self.scheduler = RebuildScheduler(self.rebuild, debounce=debounce)
+            # Snapshot of the served output after the last rebuild (reuses content hashes)
+            self.output_state = None
             dir_ignore = os.path.join(os.getcwd(), directoryname[0]) if directoryname[0] else None
             if directoryname[0]:
                 super().__init__(patterns=['*'], ignore_patterns=['*~', '.*', os.path.join(os.getcwd(), "_output"),
@@ -104,33 +121,58 @@ def run_watcher(config, port, *directoryname):
 
         def on_any_event(self, event):
             if not event.is_directory and event.event_type in ["modified", "created", "moved", "deleted"]:
-                print(f"Event type: File {event.event_type}")
-                print(f"File Path: {event.src_path}")
-                # current_time = datetime.datetime.now()
-                # if (current_time - RebuildEventHandler.last_rebuild_time) > self.delay:
-                print("Triggering rebuild...")
-                
-                if event.src_path.endswith(("bestatic.yaml", "config.yaml")):
-                    print("Detected configuration change...")
-                    config_file = "bestatic.yaml"
-                    if not os.path.isfile(config_file):
-                        config_file = "config.yaml"
-                    with open(config_file, mode="rb") as ft:
-                        self.config = yaml.load(ft, Loader=yaml.Loader)
-                    if not os.path.exists(os.path.join(os.getcwd(), "themes", self.config["theme"])):
-                        raise FileNotFoundError(
-                            f"Theme directory does not exist! Please make sure a proper theme is present inside "
-                            f"the 'themes' directory")
-                generator(**self.config)
-
-                if directoryname[0] and os.path.exists(directoryname[0]):
-                    shutil.rmtree(directoryname[0])
-                    os.rename("_output", directoryname[0])
-                else:
-                    pass
-                print(f"Rebuild is successful!!\nClick http://localhost:{self.port} to visit "
-                        "the live website again.\nMonitoring files again...\n"
-                        "Press Ctrl+C to stop anytime...")
+                paths = [event.src_path]
+                if event.event_type == "moved":
+                    paths.append(event.dest_path)
+                # Editors often produce several events per save; the scheduler
+                # drops no-op changes and coalesces the rest into one rebuild
+                if any([self.scheduler.notify(path) for path in paths]):
+                    print(f"Event type: File {event.event_type}")
+                    print(f"File Path: {event.src_path}")
+
+        def rebuild(self, changed_paths):
+            """Rebuild the site once for a batch of changed files (runs on the scheduler thread)."""
+            print("Triggering rebuild...")
+
+            if any(path.endswith(("bestatic.yaml", "config.yaml")) for path in changed_paths):
+                print("Detected configuration change...")
+                config_file = "bestatic.yaml"
+                if not os.path.isfile(config_file):
+                    config_file = "config.yaml"
+                with open(config_file, mode="rb") as ft:
+                    self.config = apply_dev_asset_mode(yaml.load(ft, Loader=yaml.Loader))
+                if not os.path.exists(os.path.join(os.getcwd(), "themes", self.config["theme"])):
+                    raise FileNotFoundError(
+                        f"Theme directory does not exist! Please make sure a proper theme is present inside "
+                        f"the 'themes' directory")
+                self.session = BuildSession()
+            else:
+                self.session.apply_changes(changed_paths)
+            served_directory = directoryname[0] or "_output"
+            before = None
+            if invalidations is not None:
+                before = changeset.snapshot(served_directory, previous=self.output_state)
+
+            # Build next to the served site and swap it in once complete, so
+            # the server never sees a half-built site
+            publisher = StagedOutput(served_directory)
+            staging = publisher.begin()
+            try:
+                generator(output_dir=staging, previous_output=publisher.current(), session=self.session,
+                          **self.config)
+            except BaseException:
+                publisher.discard(staging)
+                raise
+            publisher.publish(staging)
+
+            if invalidations is not None:
+                # Tell the server exactly which files changed (memory cache, live reload);
+                # compared by content, as every rebuild writes a whole new generation
+                self.output_state = changeset.snapshot(served_directory, previous=before)
+                invalidations.put(sorted(changeset.changed_paths(before, self.output_state)))
+            print(f"Rebuild is successful!!\nClick http://localhost:{self.port} to visit "
+                    "the live website again.\nMonitoring files again...\n"
+                    "Press Ctrl+C to stop anytime...")
 
     event_handler = RebuildEventHandler()
     observer = watchdog.observers.Observer()
@@ -145,15 +187,21 @@ def run_watcher(config, port, *directoryname):
         "_shortcodes"
     ]
 
+    watched_paths = []
     for directory in directories_to_watch:
         directory_path = os.path.join(os.getcwd(), directory)
         if os.path.exists(directory_path):
             observer.schedule(event_handler, directory_path, recursive=True)
+            watched_paths.append(directory_path)
         else:
             pass
 
     observer.schedule(event_handler, os.getcwd(), recursive=False)
 
+    event_handler.scheduler.prime(watched_paths)
+    event_handler.scheduler.prime_files(
+        entry.path for entry in os.scandir(os.getcwd()) if entry.is_file())
+    event_handler.scheduler.start()
     observer.start()
 
     try:
@@ -163,10 +211,13 @@ def run_watcher(config, port, *directoryname):
     except KeyboardInterrupt:
         observer.stop()
         observer.join()
+        event_handler.scheduler.stop(timeout=1)
     return None
 
 
 def main():
+    from bestatic.tracing import PHASES
+
     parser = argparse.ArgumentParser(description="Program to accept command-line inputs in Bestatic...")
     parser.add_argument("action", nargs="?", choices=["generator", "quickstart", "version", "newpage", "newpost"],
                         default="generator",
@@ -210,9 +261,77 @@ def main():
 
     parser.add_argument("--portnumber", "-n", type=int, default=8080, help="Specify the port number for the local server. For example: bestatic --serve --portnumber 9999 or bestatic -sn 9999. By default (i.e., if -n or --portnumber flag is absent), Bestatic uses port number 8080. ")
 
+    parser.add_argument("--no-store", action="store_true", help="Make the local server send 'Cache-Control: no-store' "
+                                                               "so the browser re-downloads every file on every reload, instead of "
+                                                               "revalidating cached files with ETag/Last-Modified.")
+
+    parser.add_argument("--memory-cache", type=int, metavar="MB", help="Keep up to MB megabytes of served files, "
+                                                                      "with precomputed headers and gzip variants, in memory. "
+                                                                      "With --autoreload, files changed by a rebuild are dropped "
+                                                                      "from the cache.")
+
+    parser.add_argument("--backend", choices=["threaded", "asyncio"], default="threaded",
+                        help="Local server implementation. 'threaded' (default) uses one thread per connection; "
+                             "'asyncio' serves all connections from one event loop with zero-copy sendfile and "
+                             "a cap on concurrent connections (see --max-connections).")
+    parser.add_argument("--max-connections", type=int, default=256,
+                        help="With --backend asyncio, the number of connections served at once; further "
+                             "clients wait. Defaults to 256.")
+
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Serve from N pre-forked processes sharing the port (SO_REUSEPORT, e.g. Linux), so the "
+                             "local server can use several CPU cores. Crashed workers are restarted. Defaults to 1.")
+
+    parser.add_argument("--no-live-reload", action="store_true",
+                        help="With -sa, do not push rebuilds to open browser tabs. By default the local server injects "
+                             "a small script into pages that reloads the page when it changed and swaps stylesheets "
+                             "in place when only CSS changed.")
+
+    parser.add_argument("--debounce", type=int, default=300, metavar="MS",
+                        help="With --autoreload, wait until files have been quiet for MS milliseconds and then "
+                             "rebuild once for all changes. Defaults to 300.")
+
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record how long each build phase and each post/page took and write it to FILE in the "
+                             "Chrome trace-event format (open it in https://ui.perfetto.dev). The slowest files are "
+                             "also printed.")
+    parser.add_argument("--trace-top", type=int, default=10, metavar="N",
+                        help="With --trace, the number of slowest files to print. Defaults to 10.")
+
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="Profile the build and write PREFIX.pstats (cProfile; view with snakeviz or pstats) and "
+                             "PREFIX.collapsed (sampled stacks for flamegraph.pl, speedscope or inferno).")
+    parser.add_argument("--profile-phase", choices=PHASES,
+                        help="With --profile, only profile this build phase, e.g. parse or render.")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="Report peak and retained memory per build phase, the allocation sites holding the most "
+                             "memory and the memory held by each post/page. Tracing allocations slows the build down.")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Build with a flat memory profile for very large sites: only a compact record per "
+                             "post/page stays in memory and the rendered HTML and text are kept in a scratch file "
+                             "under .bestatic-cache. Same as 'low_memory: true' in bestatic.yaml. Watch-mode "
+                             "rebuilds then parse every post/page again.")
+    parser.add_argument("--report", metavar="FILE",
+                        help="Write a JSON report of the build to FILE (document and output file counts, bytes per "
+                             "file type, cache hit rates, phase durations, image savings, warnings and the slowest "
+                             "posts/pages), e.g. to chart build performance in CI.")
+
     args = parser.parse_args()
+    serve_options = {"no_store": True} if args.no_store else {}
+    if args.memory_cache:
+        serve_options["cache_mb"] = args.memory_cache
+    if args.workers > 1:
+        serve_options["workers"] = args.workers
+    if args.backend != "threaded":
+        serve_options["backend"] = args.backend
+        serve_options["max_connections"] = args.max_connections
+
+    session = None  # Warm build state for watch mode, created by the first build
 
     if args.action == "quickstart":
+        from bestatic.quickstart import quickstart
+        from bestatic.generator import generator
+
         if args.theme:
             config = quickstart(args.theme)
         else:
@@ -228,6 +347,9 @@ def main():
         if not args.filepath:
             raise ValueError("Please specify filepath to use 'newpost' function.")
         else:
+            import yaml
+            from bestatic.newcontent import newpost
+
             os.chdir(os.getcwd())
             try:
                 # Try bestatic.yaml first, then config.yaml as fallback (Introduced in v 0.0.29)
@@ -245,9 +367,16 @@ def main():
         if not args.filepath:
             raise ValueError("Please specify filepath to use 'newpage' function.")
         else:
+            from bestatic.newcontent import newpage
+
             os.chdir(os.getcwd())
             newpage(args.filepath)
     else:
+        import yaml
+        from bestatic.generator import generator
+        from bestatic.publish import StagedOutput
+        from bestatic.session import BuildSession
+
         current_directory = os.getcwd()
         config_file = os.path.join(current_directory, "bestatic.yaml")
         if not os.path.isfile(config_file):
@@ -281,22 +410,102 @@ def main():
 
         if args.projectsite:
             config["projectsite"] = args.projectsite
-
-        generator(**config)
+        if args.low_memory:
+            config["low_memory"] = True
+
+        tracer = None
+        profiler = None
+        memory_report = None
+        report = None
+        if args.trace or args.profile or args.memory_report:
+            from bestatic.tracing import PhaseTracer
+            tracer = PhaseTracer()
+        if args.autoreload or args.memory_report:
+            session = BuildSession()
+        if args.memory_report:
+            from bestatic.memory import MemoryReport
+            memory_report = MemoryReport()
+            tracer.add_listener(memory_report.on_phase)
+            memory_report.start()
+        if args.profile:
+            from bestatic.profiling import BuildProfiler
+            profiler = BuildProfiler(phase=args.profile_phase)
+            tracer.add_listener(profiler.on_phase)
+            profiler.start()
+        if args.report:
+            from bestatic.report import BuildReport
+            report = BuildReport()
+
+        capture_warnings = report.capture() if report is not None else nullcontext()
+        if args.autoreload:
+            apply_dev_asset_mode(config)
+            # Watch mode publishes every build atomically (see run_watcher)
+            publisher = StagedOutput(args.directory or "_output")
+            staging = publisher.begin()
+            try:
+                with capture_warnings:
+                    generator(output_dir=staging, previous_output=publisher.current(), session=session,
+                              tracer=tracer, report=report, **config)
+            except BaseException:
+                publisher.discard(staging)
+                raise
+            publisher.publish(staging)
+        else:
+            StagedOutput().unpublish()
+            with capture_warnings:
+                generator(tracer=tracer, session=session, report=report, **config)
+        if memory_report is not None:
+            memory_report.stop()
+            if config.get("low_memory"):
+                # Low-memory builds release each document's record with the build
+                memory_report.documents_unavailable = "low-memory builds do not keep parsed documents"
+            else:
+                memory_report.add_documents((os.path.relpath(path), document)
+                                            for path, document in session.documents())
+            print(memory_report.format())
+        if profiler is not None:
+            profiler.stop()
+            pstats_path, collapsed_path = profiler.write(args.profile)
+            if pstats_path is None:
+                print(f"Nothing was profiled: the '{args.profile_phase}' phase did not run in this build")
+            else:
+                print(f"Profile written to {pstats_path} and {collapsed_path} ({profiler.samples} stack samples)")
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+            print(tracer.format_slowest(args.trace_top))
+            print(f"Build trace written to {args.trace}")
+        if report is not None:
+            report.write(args.report)
+            print(f"Build report written to {args.report}")
         print("Bestatic has completed execution...")
         time.sleep(1)
 
-    if args.directory:
+    if args.directory and not args.autoreload:
+        import shutil
+        from bestatic.publish import StagedOutput
+
+        StagedOutput(args.directory).unpublish()
         shutil.rmtree(args.directory) if os.path.exists(args.directory) else None
         os.rename("_output", args.directory)
 
     if args.autoreload and args.serve:
+        import multiprocessing
+
+        if not args.no_live_reload:
+            serve_options["live_reload"] = True
+        # Changed output paths after each rebuild, for the memory cache and live reload
+        invalidations = multiprocessing.Queue() if args.memory_cache or not args.no_live_reload else None
+        if invalidations is not None:
+            serve_options["invalidations"] = invalidations
+
         # Start server in a separate process
-        server_process = multiprocessing.Process(target=run_server, args=(args.directory, args.portnumber))
+        server_process = multiprocessing.Process(target=run_server, args=(args.directory, args.portnumber),
+                                                 kwargs=serve_options)
         server_process.start()
 
         try:
-            run_watcher(config, args.portnumber, args.directory)
+            run_watcher(config, args.portnumber, args.directory, invalidations=invalidations,
+                        debounce=args.debounce / 1000, session=session)
         except KeyboardInterrupt:
             server_process.terminate()  # Terminate the server process
             server_process.join()  # Wait for the process to finish
@@ -304,10 +513,11 @@ def main():
             print("Bestatic will now stop watching files...")
 
     elif args.serve and not args.autoreload:
-        bestatic_serv(args.directory, port=args.portnumber) if args.directory else bestatic_serv(port=args.portnumber)
+        run_server(args.directory, args.portnumber, **serve_options)
     return None
 
 
 if __name__ == '__main__':
+    import multiprocessing
     multiprocessing.freeze_support()
     main()
@@ -1,6 +1,10 @@
 import os
+import gzip
 import datetime
-import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+MAX_URLS_PER_SITEMAP = 50000  # Limit set by the sitemap protocol
 
 
 def get_last_modified_time(file_path):
@@ -22,26 +26,130 @@ def find_single_index_folders(root_folder):
     return matching_folders
 
 
-def generate_sitemap(base_url, folder_path):
-    root = ET.Element("urlset")
-    root.set("xmlns", "http://www.sitemaps.org/schemas/sitemap/0.9")
+def format_lastmod(value):
+    """Format a date, datetime or POSIX timestamp as a W3C datetime for <lastmod>."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = datetime.datetime.fromtimestamp(value)
+    return value.isoformat()
 
-    all_links = find_single_index_folders(folder_path)
 
-    for items in all_links:
-        url = ET.SubElement(root, "url")
-        loc = ET.SubElement(url, "loc")
-        loc.text = f"{base_url}/{items}"
-        loc.text = f"{loc.text.replace(chr(92), '/')}"
-        lastmod = ET.SubElement(url, "lastmod")
-        lastmod.text = get_last_modified_time(items) + "\n"
+class SitemapWriter:
+    """
+    Write sitemap XML incrementally, one <url> at a time.
+
+    URLs go to sitemap.xml until max_urls is reached; after that the site is
+    split into sitemap-1.xml, sitemap-2.xml, ... and sitemap.xml becomes a
+    sitemap index pointing to them. With gzip, the URL sets are written as
+    sitemap-N.xml.gz and sitemap.xml is always an index.
+    """
+
+    def __init__(self, base_url, output_dir="_output", max_urls=MAX_URLS_PER_SITEMAP, gzip=False):
+        self.base_url = base_url.rstrip("/")
+        self.output_dir = output_dir
+        self.max_urls = max_urls
+        self.gzip = gzip
+        self.files = []          # URL set files written so far
+        self.lastmods = []       # Newest lastmod per URL set file
+        self.url_count = 0
+        self._handle = None
+        self._count_in_file = 0
+
+    def _part_name(self, number):
+        return f"sitemap-{number}.xml.gz" if self.gzip else f"sitemap-{number}.xml"
+
+    def _open_part(self):
+        if self.gzip or self.files:
+            name = self._part_name(len(self.files) + 1)
+        else:
+            name = "sitemap.xml"
+        path = os.path.join(self.output_dir, name)
+        opener = gzip.open if self.gzip else open
+        self._handle = opener(path, "wt", encoding="utf-8")
+        self._handle.write(f"<?xml version='1.0' encoding='utf-8'?>\n<urlset xmlns=\"{SITEMAP_NS}\">")
+        self.files.append(name)
+        self.lastmods.append(None)
+        self._count_in_file = 0
+
+    def _close_part(self):
+        if self._handle:
+            self._handle.write("</urlset>")
+            self._handle.close()
+            self._handle = None
+
+    def add(self, path, lastmod=None):
+        """
+        Add one URL.
+
+        Args:
+            path: Site path relative to the base URL (e.g. 'blog/my-post')
+            lastmod: date, datetime or timestamp of the last change, if known
+        """
+        if self._handle is None or self._count_in_file >= self.max_urls:
+            self._close_part()
+            if len(self.files) == 1 and not self.gzip:
+                # Splitting: the first URL set moves out of the way of the index
+                os.replace(os.path.join(self.output_dir, "sitemap.xml"),
+                           os.path.join(self.output_dir, self._part_name(1)))
+                self.files[0] = self._part_name(1)
+            self._open_part()
+
+        loc = f"{self.base_url}/{path}".replace(chr(92), "/")
+        self._handle.write(f"<url><loc>{escape(loc)}</loc>")
+        lastmod_text = format_lastmod(lastmod)
+        if lastmod_text:
+            self._handle.write(f"<lastmod>{lastmod_text}</lastmod>")
+            if self.lastmods[-1] is None or lastmod_text > self.lastmods[-1]:
+                self.lastmods[-1] = lastmod_text
+        self._handle.write("</url>")
+        self._count_in_file += 1
+        self.url_count += 1
 
-    tree = ET.ElementTree(root)
-    tree.write("_output/sitemap.xml", encoding="utf-8", xml_declaration=True)
+    def close(self):
+        """Finish the last URL set and write the sitemap index if the site was split."""
+        if self._handle is None and not self.files:
+            self._open_part()
+        self._close_part()
+
+        if len(self.files) > 1 or self.gzip:
+            with open(os.path.join(self.output_dir, "sitemap.xml"), "w", encoding="utf-8") as index:
+                index.write(f"<?xml version='1.0' encoding='utf-8'?>\n<sitemapindex xmlns=\"{SITEMAP_NS}\">")
+                for name, lastmod in zip(self.files, self.lastmods):
+                    index.write(f"<sitemap><loc>{escape(self.base_url)}/{name}</loc>")
+                    if lastmod:
+                        index.write(f"<lastmod>{lastmod}</lastmod>")
+                    index.write("</sitemap>")
+                index.write("</sitemapindex>")
+        return self.files
+
+
+def write_sitemap(base_url, entries, output_dir="_output", max_urls=MAX_URLS_PER_SITEMAP, gzip=False):
+    """
+    Write the sitemap for a build from the pages it rendered.
+
+    Args:
+        base_url: Site URL
+        entries: Iterable of (site path, lastmod) pairs
+        output_dir: Directory the sitemap files go to
+        max_urls: URLs per sitemap file before splitting into an index
+        gzip: Compress the URL set files
+
+    Returns:
+        Names of the URL set files written
+    """
+    writer = SitemapWriter(base_url, output_dir, max_urls=max_urls, gzip=gzip)
+    for path, lastmod in entries:
+        writer.add(path, lastmod)
+    return writer.close()
+
+
+def generate_sitemap(base_url, folder_path):
+    all_links = find_single_index_folders(folder_path)
+    write_sitemap(base_url, ((items, get_last_modified_time(items)) for items in all_links), folder_path)
 
 
 if __name__ == "__main__":
     base_url = "https://example.org"
     folder_path = "_output"
     generate_sitemap(base_url, folder_path)
-
@@ -0,0 +1,61 @@
+import os
+import hashlib
+from typing import Dict, Optional, Set, Tuple
+
+# (size, mtime_ns, inode, sha256 of the content)
+FileState = Tuple[int, int, int, str]
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot(root: str, previous: Optional[Dict[str, FileState]] = None) -> Dict[str, FileState]:
+    """
+    Record the state of every file under root.
+
+    Args:
+        root: Directory to scan (e.g. _output)
+        previous: An earlier snapshot of root; files whose size, mtime and
+                  inode are unchanged reuse its content hash instead of
+                  being read again
+
+    Returns:
+        Mapping of '/'-separated path relative to root -> (size, mtime_ns, inode, content hash)
+    """
+    state = {}
+    if not os.path.isdir(root):
+        return state
+    previous = previous or {}
+    for dirpath, dirs, files in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        for filename in files:
+            path = os.path.join(dirpath, filename)
+            rel_path = (filename if rel_dir == '.' else os.path.join(rel_dir, filename)).replace(os.sep, '/')
+            try:
+                stat = os.stat(path)
+                signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                known = previous.get(rel_path)
+                digest = known[3] if known is not None and known[:3] == signature else _file_digest(path)
+            except OSError:
+                continue
+            state[rel_path] = signature + (digest,)
+    return state
+
+
+def changed_paths(before: Dict[str, FileState], after: Dict[str, FileState]) -> Set[str]:
+    """
+    Paths added, removed or modified between two snapshots.
+
+    Files are compared by content, so a rebuild that rewrites a file with
+    the same bytes (e.g. into a fresh staged generation) does not count
+    as a change.
+    """
+    changed = {path for path, state in after.items()
+               if path not in before or before[path][3] != state[3]}
+    changed.update(path for path in before if path not in after)
+    return changed
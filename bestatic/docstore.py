@@ -0,0 +1,124 @@
+import os
+import json
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+class SpillStore:
+    """
+    Append-only scratch file for large document fields.
+
+    put() writes a string and returns a reference to it, get() reads it
+    back. The file is anonymous (deleted once closed) and should live on
+    disk, not on a tmpfs /tmp, or spilling would not save any memory.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: Where to create the scratch file (created if missing);
+                       defaults to the system temporary directory
+        """
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.TemporaryFile(prefix="bestatic-spill-", dir=directory)
+        self.bytes = 0
+
+    def put(self, text: str) -> Tuple[int, int]:
+        """Store text; returns its (offset, length) reference."""
+        data = text.encode("utf-8")
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(data)
+        self.bytes += len(data)
+        return offset, len(data)
+
+    def get(self, reference: Tuple[int, int]) -> str:
+        offset, length = reference
+        self._file.seek(offset)
+        return self._file.read(length).decode("utf-8")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DocumentRecord:
+    """
+    Compact stand-in for a parsed post or page.
+
+    Keeps the metadata, title, slug, tags and paths resident. The first
+    time the body is used, the rendered HTML (content), plain text (text)
+    and sections are spilled to a SpillStore, only the summary is kept,
+    and the original document is released. The spilled fields are then
+    read back from disk on every access, so templates, the search index
+    and feeds can use a record like the original document without all
+    documents' HTML staying in memory.
+    """
+
+    __slots__ = ('path_of_md', 'metadata', 'tags', 'katex', 'title', 'slug', 'path_info',
+                 '_store', '_usage', '_document', '_summary', '_content', '_text', '_sections')
+
+    RESIDENT = ('path_of_md', 'metadata', 'tags', 'katex', 'title', 'slug', 'path_info')
+
+    def __init__(self, document, store: SpillStore, usage=None):
+        """
+        Args:
+            document: The parsed post or page
+            store: Where to spill the body
+            usage: FieldUsage that counts reads of the record's fields, if any
+        """
+        self._usage = usage
+        for name in self.RESIDENT:
+            setattr(self, name, getattr(document, name))
+        self._store = store
+        # Held until the body is first used, as documents may render it lazily
+        self._document = document
+        self._summary = None
+        self._content = None
+        self._text = None
+        self._sections = None
+
+    def __getattribute__(self, name):
+        if name[0] != '_':
+            usage = object.__getattribute__(self, '_usage')
+            if usage is not None and name in usage.FIELDS:
+                usage.record(name)
+        return object.__getattribute__(self, name)
+
+    def _spill(self):
+        document, self._document = self._document, None
+        self._summary = document.summary
+        self._content = None if document.content is None else self._store.put(document.content)
+        self._text = None if document.text is None else self._store.put(document.text)
+        sections = getattr(document, 'sections', None)
+        self._sections = None if sections is None else self._store.put(json.dumps(sections))
+
+    @property
+    def summary(self) -> Optional[str]:
+        if self._document is not None:
+            self._spill()
+        return self._summary
+
+    @property
+    def content(self) -> Optional[str]:
+        if self._document is not None:
+            self._spill()
+        return None if self._content is None else self._store.get(self._content)
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._document is not None:
+            self._spill()
+        return None if self._text is None else self._store.get(self._text)
+
+    @property
+    def sections(self) -> Optional[List[Dict]]:
+        if self._document is not None:
+            self._spill()
+        return None if self._sections is None else json.loads(self._store.get(self._sections))
@@ -0,0 +1,131 @@
+import os
+import shutil
+import filecmp
+from email.utils import format_datetime
+from itertools import islice
+from xml.sax.saxutils import XMLGenerator
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+class _XMLStream:
+    """Thin wrapper around XMLGenerator for writing simple elements."""
+
+    def __init__(self, handle):
+        self.xml = XMLGenerator(handle, encoding="utf-8", short_empty_elements=True)
+
+    def start(self, name, attrs=None):
+        self.xml.startElement(name, attrs or {})
+
+    def end(self, name):
+        self.xml.endElement(name)
+
+    def element(self, name, text=None, attrs=None):
+        self.start(name, attrs)
+        if text:
+            self.xml.characters(text)
+        self.end(name)
+
+    def newline(self):
+        self.xml.ignorableWhitespace("\n")
+
+
+def _write_rss(handle, channel, items):
+    out = _XMLStream(handle)
+    out.xml.startDocument()
+    out.start("rss", {"version": "2.0", "xmlns:atom": ATOM_NS})
+    out.start("channel")
+    out.newline()
+    out.element("title", channel["title"])
+    out.element("link", channel["link"])
+    out.element("description", channel["description"])
+    if channel.get("feed_url"):
+        out.element("atom:link", attrs={"href": channel["feed_url"], "rel": "self",
+                                        "type": "application/rss+xml"})
+    out.element("generator", "Bestatic")
+    if channel.get("updated"):
+        # Newest item date rather than "now", so unchanged feeds keep the same bytes
+        out.element("lastBuildDate", format_datetime(channel["updated"]))
+    out.newline()
+    for item in items:
+        out.start("item")
+        out.element("title", item["title"])
+        out.element("link", item["link"])
+        out.element("description", item["description"])
+        out.element("guid", item["link"], {"isPermaLink": "true"})
+        out.element("pubDate", format_datetime(item["date"]))
+        out.end("item")
+        out.newline()
+    out.end("channel")
+    out.end("rss")
+    out.xml.endDocument()
+
+
+def _write_atom(handle, channel, items):
+    out = _XMLStream(handle)
+    out.xml.startDocument()
+    out.start("feed", {"xmlns": ATOM_NS})
+    out.newline()
+    out.element("id", channel.get("feed_url") or channel["link"])
+    out.element("title", channel["title"])
+    out.element("subtitle", channel["description"])
+    out.element("link", attrs={"href": channel["link"], "rel": "alternate"})
+    if channel.get("feed_url"):
+        out.element("link", attrs={"href": channel["feed_url"], "rel": "self"})
+    out.element("generator", "Bestatic")
+    if channel.get("updated"):
+        out.element("updated", channel["updated"].isoformat())
+    out.newline()
+    for item in items:
+        out.start("entry")
+        out.element("id", item["link"])
+        out.element("title", item["title"])
+        out.element("link", attrs={"href": item["link"], "rel": "alternate"})
+        out.element("updated", item["date"].isoformat())
+        out.element("summary", item["description"])
+        out.end("entry")
+        out.newline()
+    out.end("feed")
+    out.xml.endDocument()
+
+
+FEED_WRITERS = {"rss": _write_rss, "atom": _write_atom}
+
+
+def write_feed(path, channel, items, feed_format="rss", limit=None, cache_path=None):
+    """
+    Stream a feed to disk.
+
+    Args:
+        path: Output file (e.g. _output/index.rss)
+        channel: Dict with title, link, description and optionally feed_url
+                 and updated (timezone-aware datetime of the newest item)
+        items: Iterable of dicts with title, link, description and date
+               (timezone-aware datetime), newest first; consumed lazily
+        feed_format: 'rss' or 'atom'
+        limit: Maximum number of items, or None for all
+        cache_path: Copy of this feed from the previous build; when the new
+                    feed has identical bytes, that copy (and its mtime) is
+                    restored so ETag/Last-Modified validators stay the same
+
+    Returns:
+        True if the feed changed since the previous build
+    """
+    if limit is not None:
+        items = islice(items, limit)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as handle:
+        FEED_WRITERS[feed_format](handle, channel, items)
+
+    if cache_path and os.path.exists(cache_path) and filecmp.cmp(temp_path, cache_path, shallow=False):
+        os.remove(temp_path)
+        shutil.copy2(cache_path, path)
+        return False
+
+    os.replace(temp_path, path)
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        shutil.copy2(path, cache_path)
+    return True
@@ -0,0 +1,168 @@
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Callable, Dict, Iterable, Optional, Set
+
+# Content types worth compressing; everything else (images, video, fonts) already is
+COMPRESSIBLE_TYPES = {'application/javascript', 'application/x-javascript', 'application/json',
+                      'application/xml', 'image/svg+xml', 'application/rss+xml', 'application/atom+xml',
+                      'application/wasm', 'text/cache-manifest'}
+
+
+class CachedFile:
+    """Bytes and precomputed response headers of one served file."""
+
+    __slots__ = ('rel_path', 'body', 'gzip_body', 'content_type', 'etag', 'gzip_etag',
+                 'mtime', 'last_modified', 'size')
+
+    def __init__(self, rel_path: str, body: bytes, content_type: str, stat, gzip_min_size: int):
+        self.rel_path = rel_path
+        self.body = body
+        self.content_type = content_type
+        self.size = len(body)
+        self.mtime = stat.st_mtime
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.gzip_body = None
+        self.gzip_etag = None
+        if self.size >= gzip_min_size and is_compressible(content_type):
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+            if len(compressed) < self.size:
+                self.gzip_body = compressed
+                self.gzip_etag = f'{self.etag[:-1]}-gz"'
+
+    def memory(self) -> int:
+        return self.size + (len(self.gzip_body) if self.gzip_body else 0)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith('text/') or content_type.split(';')[0] in COMPRESSIBLE_TYPES
+
+
+class FileCache:
+    """
+    Thread-safe LRU cache of served files, keyed by URL path.
+
+    Entries are trusted until invalidate() is called with the output paths a
+    rebuild changed, so cache hits do not touch the filesystem at all.
+    """
+
+    def __init__(self, max_size_mb: float = 64, gzip_min_size: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size_mb: Memory cap for file bytes and gzip variants
+            gzip_min_size: Smallest compressible file that gets a gzip variant
+        """
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        # Files larger than this are served from disk rather than flushing the cache
+        self.max_entry_bytes = self.max_bytes // 4
+        self.gzip_min_size = gzip_min_size
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._keys_by_path: Dict[str, Set[str]] = {}
+        # Bumped by invalidate() (per path, or _epoch for everything), so a
+        # load() that read a file before it was invalidated does not cache it
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedFile]:
+        """Return the entry for a URL path, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def load(self, key: str, file_path: str, rel_path: str, content_type: str,
+             transform: Optional[Callable[[bytes], bytes]] = None) -> Optional[CachedFile]:
+        """
+        Read a file and cache it under key.
+
+        Args:
+            key: URL path the file is served at
+            file_path: Path of the file on disk
+            rel_path: Path relative to the served directory, as used by invalidate()
+            content_type: Content-Type to send
+            transform: Applied to the file bytes before caching (e.g. script injection)
+
+        Returns:
+            The new entry (not cached if the file was invalidated while it
+            was being read), or None if the file is too large to cache
+        """
+        with self._lock:
+            generation = (self._epoch, self._generations.get(rel_path, 0))
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size > self.max_entry_bytes:
+                return None
+            body = f.read()
+        if transform is not None:
+            body = transform(body)
+        entry = CachedFile(rel_path, body, content_type, stat, self.gzip_min_size)
+
+        with self._lock:
+            if generation != (self._epoch, self._generations.get(rel_path, 0)):
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_path.setdefault(rel_path, set()).add(key)
+            self._bytes += entry.memory()
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.memory()
+        keys = self._keys_by_path.get(entry.rel_path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_path[entry.rel_path]
+
+    def invalidate(self, rel_paths: Optional[Iterable[str]]) -> int:
+        """
+        Drop the entries for changed files.
+
+        Args:
+            rel_paths: Paths relative to the served directory ('/'-separated),
+                       or None to drop everything
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if rel_paths is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._keys_by_path.clear()
+                self._bytes = 0
+                self._epoch += 1
+                return removed
+            removed = 0
+            for rel_path in rel_paths:
+                self._generations[rel_path] = self._generations.get(rel_path, 0) + 1
+                for key in list(self._keys_by_path.get(rel_path, ())):
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the cache."""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,39 +1,36 @@
-def generator(**config):
+def generator(output_dir="_output", previous_output=None, session=None, tracer=None, report=None, **config):
     import os
     from datetime import datetime
     from pathlib import Path
     from jinja2 import Environment, PackageLoader
-    from markdown import markdown
+    from markdown import Markdown
     from markdown.extensions.toc import slugify
     from pymdownx import emoji
     import frontmatter
     import yaml 
     import shutil
-    import copy
     import re
     import warnings
-    import chardet
     from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
-    from feedgen.feed import FeedGenerator
-    import pytz
     import json
     import csv
     from bestatic import bestaticSitemap
     from bestatic.shortcodes import ShortcodeProcessor
-    from bestatic.imageprocessor import ImageProcessor
-
-
-    def copy_if_exists(source, destination):
-        if os.path.exists(source):
-            try:
-                shutil.copytree(source, destination, dirs_exist_ok=True)
-            except shutil.SameFileError:
-                print("Source and destination represent the same file.")
-            except PermissionError:
-                print("Permission denied.")
-        else:
-            pass
-        return None
+    from bestatic.responsiveimages import make_srcset_helper
+    from bestatic.assets import build_asset_plan, AssetSync
+    from bestatic.docstore import SpillStore, DocumentRecord
+    from bestatic.mdcache import HighlightCache, IncludeCache
+    from bestatic.session import BuildSession
+    from bestatic.tracing import PhaseTracer
+    # Optional subsystems (feeds, image processing, project-site URL
+    # rewriting) import their dependencies only when enabled
+
+
+    def warn(message):
+        """Print a build warning (and record it in the build report, if any)"""
+        print(f"Warning: {message}")
+        if report is not None:
+            report.warning("generator", message)
 
     def isolate_tags(taglist):
         """Split taxonomy terms into list"""
@@ -76,8 +73,19 @@ def generator(**config):
             filej.write(json_data_temp)
         return None
 
+    def stream_json_array(items, json_path):
+        """Write items as a JSON array formatted like json_data_processing(), one item at a time"""
+        with open(json_path, "w") as filej:
+            first = True
+            for item in items:
+                filej.write("[\n  " if first else ",\n  ")
+                filej.write(json.dumps(item, indent=2).replace("\n", "\n  "))
+                first = False
+            filej.write("[]" if first else "\n]")
+
     def process_directory(directory, sitename):
         """Recursively processes files in a directory, replacing href, src, and url attributes."""
+        import chardet
         
         # Process HTML files
         for path in Path(directory).rglob('*.html'):
@@ -89,12 +97,22 @@ def generator(**config):
             pattern_search = r'b-search-file-index\s*=\s*"/'
             replacement_search = rf'b-search-file-index="{sitename}/'
 
+            # srcset lists several URLs; prefix each root-relative one
+            pattern_srcset = r'(srcset\s*=\s*")([^"]*)"'
+
+            def replace_srcset(match):
+                candidates = [candidate.strip() for candidate in match.group(2).split(',')]
+                prefixed = [f"{sitename}{candidate}" if candidate.startswith('/') else candidate
+                            for candidate in candidates]
+                return f'{match.group(1)}{", ".join(prefixed)}"'
+
             with open(path, 'r', encoding='utf-8') as f:
                 content = f.read()
 
             # Apply both replacements
             new_content = re.sub(pattern, replacement, content)
             new_content = re.sub(pattern_search, replacement_search, new_content)
+            new_content = re.sub(pattern_srcset, replace_srcset, new_content)
 
             with open(path, 'w', encoding="utf-8") as f:
                 f.write(new_content)
@@ -144,6 +162,41 @@ def generator(**config):
         replacement_2 = rf'{sitename}/index.json'
 
 
+    def add_to_sitemap(output_file, lastmod=None):
+        """Record a rendered page (by its output file) for the sitemap"""
+        site_path = os.path.relpath(os.path.dirname(output_file), output_dir).replace(os.sep, "/")
+        sitemap_entries[site_path if site_path != "." else ""] = lastmod
+
+    def document_lastmod(document):
+        """Last change of a post/page: frontmatter 'lastmod'/'updated', then 'date', then the source file"""
+        for key in ("lastmod", "updated", "date"):
+            value = document.metadata.get(key)
+            if isinstance(value, datetime):
+                return value
+            if isinstance(value, str):
+                try:
+                    return datetime.strptime(value, time_format).date()
+                except ValueError:
+                    try:
+                        return datetime.fromisoformat(value)
+                    except ValueError:
+                        continue
+            elif value is not None and hasattr(value, "isoformat"):
+                return value
+        return os.path.getmtime(document.path_of_md)
+
+    def newest_lastmod(documents):
+        """Most recent document_lastmod() of a collection of documents, or None"""
+        stamps = [document_lastmod(document) for document in documents]
+        return max(stamps, key=_lastmod_sort_key) if stamps else None
+
+    def _lastmod_sort_key(value):
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value).replace(tzinfo=None)
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None)
+        return datetime(value.year, value.month, value.day)
+
     def parse_sections(html_content):
         """Parse HTML content into sections based on headings with class 'splitsection'"""
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -171,6 +224,14 @@ def generator(**config):
             
         return sections    
 
+    def read_yaml(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=yaml.Loader)
+
+    def read_csv(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
     def load_all_taxonomy_yaml():
         """Load all taxonomy YAML files from _includes/yamls directory"""
         taxonomy_yamls = {}
@@ -180,8 +241,7 @@ def generator(**config):
                 if yaml_file.endswith('.yaml'):
                     taxonomy_name = os.path.splitext(yaml_file)[0]
                     yaml_path = os.path.join(yaml_dir, yaml_file)
-                    with open(yaml_path, 'r', encoding='utf-8') as f:
-                        taxonomy_yamls[taxonomy_name] = yaml.load(f, Loader=yaml.Loader)
+                    taxonomy_yamls[taxonomy_name] = session.load_file(yaml_path, read_yaml)
         return taxonomy_yamls
 
     def load_data_files():
@@ -200,14 +260,11 @@ def generator(**config):
             try:
                 if file_ext == '.yaml' or file_ext == '.yml':
                     # Load YAML file
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data_files[file_name] = yaml.load(f, Loader=yaml.Loader)
+                    data_files[file_name] = session.load_file(file_path, read_yaml)
                 
                 elif file_ext == '.csv':
                     # Load CSV file as list of dictionaries
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        csv_reader = csv.DictReader(f)
-                        data_files[file_name] = list(csv_reader)
+                    data_files[file_name] = session.load_file(file_path, read_csv)
                         
             except Exception as e:
                 warnings.warn(f"Error loading data file {data_file}: {str(e)}")
@@ -215,52 +272,144 @@ def generator(**config):
         return data_files
 
 
+    # Opening/closing line of a YAML frontmatter block (as in python-frontmatter)
+    FRONTMATTER_BOUNDARY = re.compile(r"^-{3,}\s*$")
+
+    def read_frontmatter(path):
+        """Metadata of a Markdown file, reading no further than the end of its YAML frontmatter"""
+        with open(path, 'r', encoding='utf-8') as f:
+            line = f.readline()
+            while line and not line.strip():
+                line = f.readline()
+            if not FRONTMATTER_BOUNDARY.match(line):
+                # No (or non-YAML) frontmatter: let python-frontmatter decide
+                f.seek(0)
+                return frontmatter.load(f).metadata
+            header = [line]
+            for line in f:
+                header.append(line)
+                if FRONTMATTER_BOUNDARY.match(line):
+                    break
+        return frontmatter.parse("".join(header))[0]
+
     class Parsing:
+        """
+        A post or page. Creating one only reads the frontmatter, which is all
+        sorting, prev/next links, pagination, taxonomies and the sitemap need.
+        content (the rendered Markdown body), text (its plain text), summary
+        and sections are lazy: each is computed the first time it is used
+        (by its own page, a template, the search index or a feed) and kept.
+        """
+
         def __init__(self, path_of_md):
             self.path_of_md = path_of_md
             self.metadata = None
-            self.content = None
-            self.summary = None
             self.tags = None
             self.katex = None
-            self.text = None
             self.title = None
             self.slug = None
             self.path_info = None
-            self.shortcode_processor = ShortcodeProcessor() if enable_shortcodes else None
+            self.shortcode_processor = session.shortcodes(ShortcodeProcessor) if enable_shortcodes else None
+            self._source = path_of_md
+            self._has_sections = False
+            self._content = None
+            self._text = None
+            self._summary = None
+            self._sections = None
             self.parse_data()
             self.path_data()
 
         def parse_data(self):
+            metadata = read_frontmatter(self._source)
+            self.metadata = metadata
+            self.title = metadata["title"]
+            self.slug = metadata["slug"] if "slug" in metadata else slugify(metadata["title"], separator="-")
+            if "tags" in metadata and metadata["tags"] is not None:
+                self.tags = isolate_tags(metadata["tags"])
+            if "katex" in metadata and "katex":
+                self.katex = True
+            self._has_sections = "section" in metadata and metadata["section"] is True
 
-            warnings.filterwarnings('ignore', category=MarkupResemblesLocatorWarning)
+        def path_data(self):
+            parts = os.path.dirname(self._source).split(os.path.sep)
+            filtered_parts = parts[1:]
+            self.path_info = os.path.sep.join(filtered_parts)
 
-            with open(self.path_of_md, 'r', encoding='utf-8') as f:
-                content = f.read()
+        # Methods never read the public fields (path_of_md is kept as _source),
+        # and the properties below use these helpers rather than each other,
+        # so the build report shows just the fields a template reads itself
+
+        def _html(self):
+            if self._content is None:
+                warnings.filterwarnings('ignore', category=MarkupResemblesLocatorWarning)
+
+                with open(self._source, 'r', encoding='utf-8') as f:
+                    content = f.read()
                 # Only process shortcodes if enabled
                 if self.shortcode_processor:
                     content = self.shortcode_processor.process_content(content)
-                self.content = markdown(content, extensions=markdown_extensions, extension_configs=markdown_configs)
-                f.seek(0)
-                self.metadata = frontmatter.load(f).metadata
-                initial_clean = BeautifulSoup(self.content, 'html.parser').get_text()
-                plain_text = BeautifulSoup(initial_clean, 'html.parser').get_text(separator=' ').strip()
-                self.text = plain_text
-                self.summary = plain_text[:summary_length] + "..." if len(plain_text) > summary_length else plain_text
-                self.title = self.metadata["title"]
-                self.slug = self.metadata["slug"] if "slug" in self.metadata else slugify(self.title, separator="-")
-                if "tags" in self.metadata and self.metadata["tags"] is not None:
-                    self.tags = isolate_tags(self.metadata["tags"])
-                else:
-                    None
-                if "katex" in self.metadata and "katex":
-                    self.katex = True
-
-        def path_data(self):
-            self.path_info = os.path.dirname(self.path_of_md)
-            parts = self.path_info.split(os.path.sep)
-            filtered_parts = parts[1:]
-            self.path_info = os.path.sep.join(filtered_parts)
+                self._content = render_markdown(content)
+                if field_usage is not None:
+                    field_usage.computed("content")
+            return self._content
+
+        def _plain_text(self):
+            if self._text is None:
+                initial_clean = BeautifulSoup(self._html(), 'html.parser').get_text()
+                self._text = BeautifulSoup(initial_clean, 'html.parser').get_text(separator=' ').strip()
+                if field_usage is not None:
+                    field_usage.computed("text")
+            return self._text
+
+        @property
+        def content(self):
+            return self._html()
+
+        @property
+        def text(self):
+            return self._plain_text()
+
+        @property
+        def summary(self):
+            if self._summary is None:
+                plain_text = self._plain_text()
+                self._summary = plain_text[:summary_length] + "..." if len(plain_text) > summary_length else plain_text
+                if field_usage is not None:
+                    field_usage.computed("summary")
+            return self._summary
+
+        @property
+        def sections(self):
+            """The content split at 'splitsection' headings, for pages with 'section: true' (else None)"""
+            if self._sections is None and self._has_sections:
+                self._sections = parse_sections(self._html())
+                if field_usage is not None:
+                    field_usage.computed("sections")
+            return self._sections
+
+    class TrackedParsing(Parsing):
+        """Parsing that counts reads of its fields in the build report"""
+
+        def __getattribute__(self, name):
+            if name in field_usage.FIELDS:
+                field_usage.record(name)
+            return object.__getattribute__(self, name)
+
+    # Warm state from earlier builds of a watch session; a one-off build
+    # still shares converters and the shortcode registry across documents
+    if session is None:
+        session = BuildSession()
+    session.begin_build()
+
+    # Per-phase timings, for benchmarks and build reports
+    if tracer is None:
+        tracer = PhaseTracer()
+
+    # Which document fields templates read, for the build report
+    field_usage = report.fields if report is not None else None
+    if field_usage is not None:
+        tracer.add_listener(field_usage.on_phase)
+    tracer.mark("setup")
 
     siteURL = config["siteURL"] if config and "siteURL" in config else "https://example.org"
     site_title = config["title"] if config and "title" in config else "A Demo Site for Bestatic"
@@ -280,6 +429,10 @@ def generator(**config):
     posts_in_page = config['include_post_in_pages'] if config and "include_post_in_pages" in config else False
     enable_shortcodes = config["SHORTCODES"] if config and "SHORTCODES" in config else False
     extra_data = config["extra_data"] if config and "extra_data" in config else {}
+    assets_config = config["assets"] if config and "assets" in config and config["assets"] else {}
+    sitemap_config = config["sitemap"] if config and "sitemap" in config and config["sitemap"] else {}
+    feeds_config = config["feeds"] if config and "feeds" in config and config["feeds"] else {}
+    low_memory = config["low_memory"] if config and "low_memory" in config else False
     
 
     default_extensions = [
@@ -337,52 +490,83 @@ def generator(**config):
 
     current_directory = os.getcwd()
 
-    shutil.rmtree(os.path.join(current_directory, "_output")) if os.path.exists(
-        os.path.join(current_directory, "_output")) else None
-
     working_directory = os.path.join(current_directory, "themes", theme_name)
 
+    output_root = os.path.join(current_directory, output_dir)
+
     source_theme = os.path.join(working_directory, "static")
-    destination_theme = os.path.join(current_directory, "_output", "static")
+    destination_theme = os.path.join(output_root, "static")
 
     source = os.path.join(current_directory, "static-content")
-    destination = os.path.join(current_directory, "_output", "static-content")
+    destination = os.path.join(output_root, "static-content")
 
     source_root_import = os.path.join(current_directory, "root-import")
-    destination_root_import = os.path.join(current_directory, "_output")
-
-    copy_if_exists(source_theme, destination_theme)
-    copy_if_exists(source, destination)
-    copy_if_exists(source_root_import, destination_root_import)
+    destination_root_import = output_root
 
     # Image processing - convert and optimize images if enabled
+    image_processor = None
     image_conversion_map = {}
+    image_variants = {}
+    image_sizes = "100vw"
     if config and "image_processing" in config and config["image_processing"].get("enabled", False):
         try:
+            from bestatic.imageprocessor import ImageProcessor
             image_processor = ImageProcessor(config["image_processing"])
-            
-            # Process images in static-content folder
-            map1 = image_processor.process_static_content(source, destination)
-            image_conversion_map.update(map1)
-            
-            # Process images in static folder (from theme)
-            map2 = image_processor.process_static_content(source_theme, destination_theme)
-            image_conversion_map.update(map2)
-            
-            # Remove original files if keep_original is False
-            if not image_processor.keep_original:
-                import glob
-                # Remove original image files from both directories
-                for base_dir in [destination, destination_theme]:
-                    for original_path in glob.glob(os.path.join(base_dir, "**", "*"), recursive=True):
-                        if os.path.isfile(original_path):
-                            ext = os.path.splitext(original_path)[1].lower()
-                            if ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                os.remove(original_path)
         except ImportError:
-            print("Warning: Pillow not installed. Image processing disabled. Install with: pip install Pillow")
+            warn("Pillow not installed. Image processing disabled. Install with: pip install Pillow")
+
+    tracer.mark("assets")
+
+    # Plan every static file once: images scheduled for conversion are not
+    # copied first (and deleted again afterwards), everything else is copied
+    asset_plan = build_asset_plan([
+        (source_theme, destination_theme, True),
+        (source, destination, True),
+        (source_root_import, destination_root_import, False),
+    ], image_processor)
+
+    # Sync static files into the output: with incremental sync the previous
+    # output is pruned instead of wiped (or, when building into a fresh
+    # staging directory, unchanged assets are linked from the previous
+    # build), so unchanged assets are not copied again
+    asset_sync = AssetSync(mode=assets_config.get("mode", "copy"), use_hash=assets_config.get("hash", False))
+    if assets_config.get("incremental", True) and previous_output:
+        asset_sync.seed_from(previous_output, output_root, asset_plan)
+    elif assets_config.get("incremental", True):
+        asset_sync.prune_output(output_root, asset_plan)
+    elif os.path.exists(output_root):
+        shutil.rmtree(output_root)
+    asset_sync.sync(asset_plan)
+    print(asset_sync.summary())
+
+    def publish_originals(jobs):
+        """Copy images that were not converted into the output unchanged"""
+        for input_path, job_output_dir in jobs:
+            try:
+                os.makedirs(job_output_dir, exist_ok=True)
+                shutil.copy2(input_path, job_output_dir)
+            except OSError as e:
+                warn(f"Could not publish original image {input_path}: {e}")
+
+    tracer.mark("images")
+    if image_processor and asset_plan.conversions:
+        try:
+            image_conversion_map = image_processor.process_planned(asset_plan.conversions)
+            print(image_processor.summary())
+
+            # Responsive variants (if widths are configured)
+            image_variants = image_processor.variant_manifest
+            image_sizes = image_processor.sizes
         except Exception as e:
-            print(f"Warning: Image processing failed: {e}")
+            warn(f"Image processing failed: {e}")
+            # Fall back to publishing the original images unchanged
+            publish_originals(job for _, _, jobs in asset_plan.conversions for job in jobs)
+        else:
+            # Images that failed individually are published unchanged as well
+            if image_processor.failed:
+                failed = set(image_processor.failed)
+                warn(f"{len(failed)} image(s) could not be converted; publishing the originals")
+                publish_originals(job for _, _, jobs in asset_plan.conversions for job in jobs if job[0] in failed)
 
 
     if config and "comments" in config and config["comments"]["enabled"] is True:
@@ -399,31 +583,109 @@ def generator(**config):
         giscus = False
         disqus = False    
 
-
-
+    if image_variants:
+        from bestatic.responsiveimages import ResponsiveImagesExtension
+        json_data_processing(image_variants, f"{output_dir}/image-variants.json")
+        markdown_extensions = markdown_extensions + [
+            ResponsiveImagesExtension(manifest=image_variants, sizes=image_sizes, site_url=siteURL)]
+
+    tracer.mark("markdown")
+    # Everything a Markdown conversion depends on: documents parsed with the
+    # same settings earlier in the session are reused if their file is unchanged
+    markdown_key = json.dumps([[ext if isinstance(ext, str) else type(ext).__name__ for ext in markdown_extensions],
+                               markdown_configs, image_variants, image_sizes, siteURL],
+                              sort_keys=True, default=repr)
+    document_key = (markdown_key, summary_length, enable_shortcodes)
+    # Highlighted code blocks and included fragments are cached on disk, so
+    # Pygments and markdown_include only run again for code, included files
+    # or settings that changed since an earlier build
+    markdown_caches = {}
+    markdown_cache_keys = []
+    if not config or "markdown" not in config or config["markdown"].get("cache", True):
+        markdown_cache_dir = os.path.join(current_directory, ".bestatic-cache", "markdown")
+        markdown_cache_mb = config["markdown"].get("cache_max_size_mb", 64) if config and "markdown" in config else 64
+        extension_names = {ext if isinstance(ext, str) else type(ext).__module__ for ext in markdown_extensions}
+        for name, cache_class, extensions in (
+                ("highlight", HighlightCache, {"codehilite", "markdown.extensions.codehilite"}),
+                ("includes", IncludeCache, {"markdown_include.include"})):
+            if extension_names & extensions:
+                cache_key = (name, os.path.join(markdown_cache_dir, name), markdown_cache_mb)
+                markdown_caches[name] = session.render_cache(
+                    cache_key, lambda: cache_class(cache_key[1], max_size_mb=markdown_cache_mb))
+                markdown_cache_keys.append(cache_key)
+    for markdown_cache in markdown_caches.values():
+        markdown_cache.reset_stats()
+
+    def create_converter():
+        converter = Markdown(extensions=markdown_extensions, extension_configs=markdown_configs)
+        # The caches hook into this converter's own processors only
+        for markdown_cache in markdown_caches.values():
+            markdown_cache.install(converter)
+        return converter
+
+    markdown_converter = session.converter((markdown_key, tuple(markdown_cache_keys)), create_converter)
+
+    def render_markdown(text):
+        markdown_converter.reset()
+        return markdown_converter.convert(text)
+
+
+    tracer.mark("parse")
     POSTS = {}
     PAGES = {}
+    sitemap_entries = {}  # site path -> lastmod, in render order
+
+    # Low-memory builds keep a compact record per document and spill its
+    # HTML and plain text to a scratch file under .bestatic-cache (on disk,
+    # unlike a tmpfs /tmp); documents are then not kept in the session
+    spill_store = SpillStore(os.path.join(current_directory, ".bestatic-cache")) if low_memory else None
+
+    def load_document(path):
+        if spill_store is None:
+            return session.document(path, document_key, Parsing if field_usage is None else TrackedParsing)
+        return DocumentRecord(Parsing(path), spill_store, usage=field_usage)
 
     if os.path.isdir('posts') and len(os.listdir('posts')):
         for root, directories, files in os.walk('posts'):
             for filename in files:
                 input_post_path = os.path.join(root, filename)
-                POSTS[filename] = Parsing(input_post_path)
+                started = tracer.now()
+                POSTS[filename] = load_document(input_post_path)
+                tracer.item("parse", input_post_path, started)
 
     if os.path.isdir('pages') and len(os.listdir('pages')):
         for root, directories, files in os.walk('pages'):
             for filename in files:
                 input_page_path = os.path.join(root, filename)
-                PAGES[filename] = Parsing(input_page_path)
+                started = tracer.now()
+                PAGES[filename] = load_document(input_page_path)
+                tracer.item("parse", input_page_path, started)
+
+    tracer.mark("render")
 
-    env = Environment(loader=PackageLoader("bestatic.generator", os.path.join(working_directory, "templates")))
+    def create_environment():
+        environment = Environment(loader=PackageLoader("bestatic.generator", template_directory))
+        environment.trim_blocks = True
+        environment.lstrip_blocks = True
+        return environment
+
+    # Reused across a watch session; Jinja reloads templates whose files changed
+    template_directory = os.path.join(working_directory, "templates")
+    env = session.environment(template_directory, create_environment)
     
+    def render(template, **context):
+        """Render a template, counting the document fields it reads (for the build report)"""
+        if field_usage is None:
+            return template.render(**context)
+        with field_usage.template(template.name):
+            return template.render(**context)
+
     def md_filter(text):
-        return markdown(text, extensions=markdown_extensions, extension_configs=markdown_configs)
+        return render_markdown(text)
     
     env.filters['markdown'] = md_filter
-    env.trim_blocks = True
-    env.lstrip_blocks = True
+    env.globals['srcset'] = make_srcset_helper(image_variants, siteURL)
+    env.globals['image_sizes'] = image_sizes
 
     # Load all data files from _includes/datafiles
     data_files = load_data_files()
@@ -437,9 +699,10 @@ def generator(**config):
 
     if os.path.exists(os.path.join(working_directory, "templates", "home.html.jinja2")):
         home_template = env.get_template('home.html.jinja2')
-        home_final = home_template.render(title=site_title, description=site_description, nav=nav, extra_data=extra_data, data_files=data_files, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural)
-        with open(f"_output/index.html", "w", encoding="utf-8") as file:
+        home_final = render(home_template, title=site_title, description=site_description, nav=nav, extra_data=extra_data, data_files=data_files, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural)
+        with open(f"{output_dir}/index.html", "w", encoding="utf-8") as file:
             file.write(home_final)
+        add_to_sitemap(f"{output_dir}/index.html", newest_lastmod(POSTS.values()))
 
     if os.path.isdir('pages') and len(os.listdir('pages')):
         try:
@@ -471,8 +734,8 @@ def generator(**config):
         POSTS_SORTED = {item: POSTS[item] for item in POSTS_SORTED_LIST}
 
 
-        POSTS_SORTED_temp = copy.deepcopy(POSTS_SORTED)
-        POSTS_SORTED_temp.pop(next(iter(POSTS_SORTED_temp)))
+        # Every post but the newest (only read, so no need to copy the documents)
+        POSTS_SORTED_temp = dict(list(POSTS_SORTED.items())[1:])
 
         next_slugs_list = []
         next_titles_list = []
@@ -483,14 +746,16 @@ def generator(**config):
         prev_slug = None
         prev_title = None
 
+        tracer.mark("render posts")
         for ii, (post, value) in enumerate(POSTS_SORTED.items()):
-            output_post_path = f"_output/{post_directory_singular}/{POSTS[post].path_info}/{POSTS_SORTED[post].slug}"
+            started = tracer.now()
+            output_post_path = f"{output_dir}/{post_directory_singular}/{POSTS[post].path_info}/{POSTS_SORTED[post].slug}"
 
             tags_in_post_individual = POSTS_SORTED[post].tags
             next_slug = next_slugs_list[ii] if ii < len(next_slugs_list) else None
             next_title = next_titles_list[ii] if ii < len(next_titles_list) else None
 
-            post_final = post_template.render(title=site_title, description=site_description, 
+            post_final = render(post_template, title=site_title, description=site_description, 
                                            post=POSTS_SORTED[post], 
                                            next_slug=next_slug, prev_slug=prev_slug,
                                            next_title=next_title, prev_title=prev_title,
@@ -504,31 +769,38 @@ def generator(**config):
 
 
             if "slug" in POSTS_SORTED[post].metadata and POSTS_SORTED[post].metadata["slug"] == "index.html":
-                with open(f"_output/index.html", "w", encoding="utf-8") as file:
+                with open(f"{output_dir}/index.html", "w", encoding="utf-8") as file:
                     file.write(post_final)
+                add_to_sitemap(f"{output_dir}/index.html", document_lastmod(POSTS_SORTED[post]))
             else:
                 if not os.path.exists(output_post_path):
                     os.makedirs(output_post_path, exist_ok=True)
                 with open(f"{output_post_path}/index.html", 'w', encoding="utf-8") as file:
                     file.write(post_final)
+                add_to_sitemap(f"{output_post_path}/index.html", document_lastmod(POSTS_SORTED[post]))
+            tracer.item("render", POSTS[post].path_of_md, started)
 
 
+        tracer.mark("render lists")
         split_dicts = split_dict_into_n(POSTS_SORTED, user_input_n)
 
         for jj in range(len(split_dicts)):
 
-            list_final = list_template.render(title=site_title, description=site_description, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural, post=split_dicts[jj], page_index=jj, page_range=len(split_dicts), taxonomy_yamls=all_taxonomy_yamls, nav=nav, extra_data=extra_data, data_files=data_files)
+            list_final = render(list_template, title=site_title, description=site_description, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural, post=split_dicts[jj], page_index=jj, page_range=len(split_dicts), taxonomy_yamls=all_taxonomy_yamls, nav=nav, extra_data=extra_data, data_files=data_files)
 
-            paginator = f"_output/{post_directory_plural}{jj + 1}" if jj != 0 else f"_output/{post_directory_plural}"
+            paginator = f"{output_dir}/{post_directory_plural}{jj + 1}" if jj != 0 else f"{output_dir}/{post_directory_plural}"
 
             if not os.path.exists(paginator):
                 os.makedirs(paginator, exist_ok=True)
             with open(f"{paginator}/index.html", 'w', encoding="utf-8") as file:
                 file.write(list_final)
+            add_to_sitemap(f"{paginator}/index.html", newest_lastmod(split_dicts[jj].values()))
 
         if homepage_type == "list":
-            shutil.move(f"_output/{post_directory_plural}/index.html", "_output/index.html")
+            shutil.move(f"{output_dir}/{post_directory_plural}/index.html", f"{output_dir}/index.html")
+            sitemap_entries[""] = sitemap_entries.pop(post_directory_plural, None)
 
+        tracer.mark("taxonomies")
         taxonomies = config["taxonomies"] if config and "taxonomies" in config else {
             "tags": {
                 "taxonomy_template": "taglist.html.jinja2", 
@@ -536,37 +808,34 @@ def generator(**config):
             }
         }
 
-        def process_taxonomy_terms(items_dict, taxonomy_name, taxonomy_config):
+        def build_taxonomy_index(items_dict, taxonomy_names):
+            """Map taxonomy -> term -> {item key: item} in one pass over the items, keeping their order"""
+            index = {taxonomy_name: {} for taxonomy_name in taxonomy_names}
+            for key, item in items_dict.items():
+                for taxonomy_name in taxonomy_names:
+                    item_terms = item.metadata.get(taxonomy_name)
+                    if not item_terms:
+                        continue
+                    for term in isolate_tags(item_terms if isinstance(item_terms, list) else str(item_terms)):
+                        index[taxonomy_name].setdefault(str(term), {})[key] = item
+            return index
+
+        taxonomy_index = build_taxonomy_index(POSTS_SORTED, list(taxonomies))
+
+        def process_taxonomy_terms(taxonomy_name, taxonomy_config):
             """Process items for a given taxonomy (tags, categories, authors etc)"""
             # Try to load corresponding taxonomy YAML file if it exists
             taxonomy_yaml = None
             yaml_path = os.path.join(current_directory, '_includes', 'yamls', f'{taxonomy_name}.yaml')
             if os.path.exists(yaml_path):
-                with open(yaml_path, 'r', encoding='utf-8') as yaml_file:
-                    taxonomy_yaml = yaml.load(yaml_file, Loader=yaml.Loader)
+                taxonomy_yaml = session.load_file(yaml_path, read_yaml)
 
-            terms_list = [items_dict[item].metadata[taxonomy_name] 
-                        for item in items_dict 
-                        if taxonomy_name in items_dict[item].metadata 
-                        and items_dict[item].metadata[taxonomy_name] is not None]
-            
-            terms_list_temp = " ".join(str(t) for t in terms_list)
-            terms_list_final = isolate_tags(terms_list_temp)
-            
             template = env.get_template(taxonomy_config['taxonomy_template'])
             
-            for term in terms_list_final:
-                output_path = f'_output/{post_directory_singular}/{taxonomy_config["taxonomy_directory"]}/{term}'
-                filtered_items = {}
+            for term, filtered_items in taxonomy_index[taxonomy_name].items():
+                output_path = f'{output_dir}/{post_directory_singular}/{taxonomy_config["taxonomy_directory"]}/{term}'
                 
-                for item in items_dict:
-                    item_terms = items_dict[item].metadata.get(taxonomy_name, [])
-                    if item_terms:
-                        terms = isolate_tags(item_terms)
-                        if term in terms:
-                            filtered_items[item] = items_dict[item]
-                
-                page_content = template.render(
+                page_content = render(template,
                     title=site_title, 
                     description=site_description, 
                     post=filtered_items,
@@ -584,123 +853,134 @@ def generator(**config):
                     os.makedirs(output_path, exist_ok=True)
                 with open(f"{output_path}/index.html", 'w', encoding="utf-8") as file:
                     file.write(page_content)
+                add_to_sitemap(f"{output_path}/index.html", newest_lastmod(filtered_items.values()))
 
         for taxonomy_name, taxonomy_config in taxonomies.items():
-            process_taxonomy_terms(POSTS_SORTED, taxonomy_name, taxonomy_config)
+            process_taxonomy_terms(taxonomy_name, taxonomy_config)
 
     
+    tracer.mark("render pages")
     if page_template:
         for page in PAGES:
+            started = tracer.now()
 
-            output_page_path = f"_output/{PAGES[page].path_info}/{PAGES[page].slug}"
+            output_page_path = f"{output_dir}/{PAGES[page].path_info}/{PAGES[page].slug}"
 
-            sections = None
-            if "section" in PAGES[page].metadata and PAGES[page].metadata['section'] is True:
-                sections = parse_sections(PAGES[page].content)
+            sections = PAGES[page].sections
 
             if "slug" in PAGES[page].metadata and PAGES[page].metadata['slug'] == 404 and error_template:
-                page_final = error_template.render(title=site_title, description=site_description, nav=nav, extra_data=extra_data, data_files=data_files, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural)
+                page_final = render(error_template, title=site_title, description=site_description, nav=nav, extra_data=extra_data, data_files=data_files, post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural)
             else:
                 POSTS_SORTED_in_page = POSTS_SORTED if posts_in_page else None                
                 if "template" in PAGES[page].metadata:
                     page_template = env.get_template(PAGES[page].metadata['template'])
-                    page_final = page_template.render(title=site_title, description=site_description, page=PAGES[page],  sections=sections, post_list = POSTS_SORTED_in_page,post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural, disqus=disqus, giscus=giscus, nav=nav, extra_data=extra_data, data_files=data_files)
+                    page_final = render(page_template, title=site_title, description=site_description, page=PAGES[page],  sections=sections, post_list = POSTS_SORTED_in_page,post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural, disqus=disqus, giscus=giscus, nav=nav, extra_data=extra_data, data_files=data_files)
                 else:
                     page_template = env.get_template('page.html.jinja2')
-                    page_final = page_template.render(title=site_title, description=site_description, page=PAGES[page],  sections=sections, post_list = POSTS_SORTED_in_page,
+                    page_final = render(page_template, title=site_title, description=site_description, page=PAGES[page],  sections=sections, post_list = POSTS_SORTED_in_page,
                     post_directory_singular=post_directory_singular, post_directory_plural=post_directory_plural, disqus=disqus, giscus=giscus, nav=nav, extra_data=extra_data, data_files=data_files)
 
+            is_error_page = "slug" in PAGES[page].metadata and PAGES[page].metadata['slug'] == 404
             if "slug" in PAGES[page].metadata and PAGES[page].metadata['slug'] == "index.html":
-                with open(f"_output/index.html", "w", encoding="utf-8") as file:
+                with open(f"{output_dir}/index.html", "w", encoding="utf-8") as file:
                     file.write(page_final)
+                add_to_sitemap(f"{output_dir}/index.html", document_lastmod(PAGES[page]))
             else:
                 if not os.path.exists(output_page_path):
                     os.makedirs(output_page_path, exist_ok=True)
                 with open(f"{output_page_path}/index.html", 'w', encoding="utf-8") as file:
                     file.write(page_final)
+                if not is_error_page:
+                    add_to_sitemap(f"{output_page_path}/index.html", document_lastmod(PAGES[page]))
+            tracer.item("render", PAGES[page].path_of_md, started)
     
     
-    json_combined_dict = {}
-
-    json_dict_post = {key: {'title': value.title, 'text': value.text,
-                            'slug': f"{post_directory_singular}/{value.path_info}/{value.slug}" if value.path_info else f"{post_directory_singular}/{value.slug}"} for
-                      key, value in
-                      POSTS.items()} if post_template else {}
-
-    json_dict_page = {key: {'title': value.title, 'text': value.text,
-                            'slug': f"{value.path_info}/{value.slug}" if value.path_info else f"{value.slug}"} for
-                      key, value in
-                      PAGES.items() if key != "404.md"} if page_template else {}
-
-    json_combined_dict = {**json_dict_post, **json_dict_page}
-
-    if json_combined_dict:
-        result_dict = [{'uri': f"/{value['slug']}", 'title': value['title'] if value['title'] else "Homepage", 'content': value['text']}
-                   for
-                   value
-                   in
-                   json_combined_dict.values()]
-
-        result_dict_post = [
-            {'uri': f"/{value['slug']}", 'title': value['title'], 'content': value['text']} for
-            value in
-            json_combined_dict.values()]
-
-        result_dict_tags = [
-            {'uri': f"/{value['slug']}", 'title': value['title'], 'content': value['text']} for
-            value in
-            json_combined_dict.values()]
-
-        json_data_processing(result_dict, f'_output/index.json')
-
-        if post_template:
-            json_data_processing(result_dict_post, f'_output/index.json')
-
-    bestaticSitemap.generate_sitemap(siteURL, "_output")
-
-    timezone = pytz.timezone(timezone_name)
-
+    tracer.mark("search")
+    # Documents by source file name (a page replaces a post of the same
+    # name); the text is only read while its entry is written
+    search_documents = {}
+    if post_template:
+        for key, value in POSTS.items():
+            search_documents[key] = (value, f"{post_directory_singular}/{value.path_info}/{value.slug}"
+                                     if value.path_info else f"{post_directory_singular}/{value.slug}")
+    if page_template:
+        for key, value in PAGES.items():
+            if key != "404.md":
+                search_documents[key] = (value, f"{value.path_info}/{value.slug}" if value.path_info else f"{value.slug}")
+
+    def search_entries():
+        for value, slug in search_documents.values():
+            # Untitled documents are listed as "Homepage" unless the site has posts
+            title = value.title if value.title or post_template else "Homepage"
+            yield {'uri': f"/{slug}", 'title': title, 'content': value.text}
+
+    if search_documents:
+        stream_json_array(search_entries(), f'{output_dir}/index.json')
+
+    tracer.mark("sitemap")
+    # Hand-written pages shipped as static files (e.g. via root-import)
+    for destination_file, source_file in asset_plan.copies.items():
+        if os.path.basename(destination_file).lower() == "index.html":
+            site_path = os.path.relpath(os.path.dirname(destination_file), output_root).replace(os.sep, "/")
+            sitemap_entries.setdefault(site_path if site_path != "." else "", os.path.getmtime(source_file))
+
+    bestaticSitemap.write_sitemap(siteURL, sitemap_entries.items(), output_dir,
+                                  max_urls=sitemap_config.get("max_urls", bestaticSitemap.MAX_URLS_PER_SITEMAP),
+                                  gzip=sitemap_config.get("gzip", False))
+
+    tracer.mark("feeds")
+    feed_stats = None
     if post_template and rss_feed is True:
-        rss_dict_post = {
-            key: {'title': value.title, 'text': value.text,
-                  'slug': f"{post_directory_singular}/{value.path_info}/{value.slug}" if value.path_info else f"{value.slug}",
-                  'date': datetime.strptime(value.metadata["date"], time_format)} for
-            key, value in
-            reversed(POSTS_SORTED.items())} if post_template else {}
-
-        posts_dict = [
-            {'uri': f"{siteURL}/{value['slug']}", 'title': value['title'], 'content': value['text'],
-             'date': timezone.localize(value['date'])} for
-            value
-            in
-            rss_dict_post.values()]
-
-        fg = FeedGenerator()
-        fg.title(site_title)
-        fg.link(href=f"{siteURL}/{post_directory_plural}", rel='alternate')
-        fg.description(site_description)
-
-        # Add entries from the dictionary
-        for entry_data in posts_dict:
-            entry = fg.add_entry()
-            entry.title(entry_data['title'])
-            entry.description(entry_data['content'])
-            entry.link(href=entry_data['uri'])
-            entry.pubDate(entry_data['date'])
-
-        # Generate the RSS feed
-        rss_feed = fg.rss_str(pretty=True)
-
-        with open('_output/index.rss', 'wb') as rss_file:
-            rss_file.write(rss_feed)
-
+        import pytz
+        from bestatic import feeds
+        timezone = pytz.timezone(timezone_name)
+        feed_formats = ["rss", "atom"] if feeds_config.get("atom", False) else ["rss"]
+        feed_cache_dir = os.path.join(current_directory, ".bestatic-cache", "feeds")
+        feed_stats = {'written': 0, 'unchanged': 0}
+
+        def post_date(post):
+            return timezone.localize(datetime.strptime(post.metadata["date"], time_format))
+
+        def feed_items(posts):
+            """Feed entries for posts (newest first), built as the feed writer consumes them"""
+            for post in posts:
+                post_path = "/".join(part for part in (post_directory_singular, post.path_info.replace(os.sep, "/"), post.slug) if part)
+                yield {'title': post.title,
+                       'link': f"{siteURL}/{post_path}",
+                       'description': post.summary if feeds_config.get("summary_only", False) else post.text,
+                       'date': post_date(post)}
+
+        def write_feeds(feed_dir, title, link, posts):
+            """Write index.rss (and index.atom) for posts into feed_dir"""
+            posts = list(posts)
+            for feed_format in feed_formats:
+                feed_path = os.path.join(feed_dir, f"index.{feed_format}")
+                feed_site_path = os.path.relpath(feed_path, output_dir).replace(os.sep, "/")
+                channel = {'title': title, 'link': link, 'description': site_description,
+                           'feed_url': f"{siteURL}/{feed_site_path}",
+                           'updated': post_date(posts[0]) if posts else None}
+                changed = feeds.write_feed(feed_path, channel, feed_items(posts), feed_format,
+                                           limit=feeds_config.get("limit"),
+                                           cache_path=os.path.join(feed_cache_dir, feed_site_path))
+                feed_stats['written' if changed else 'unchanged'] += 1
+
+        write_feeds(output_dir, site_title, f"{siteURL}/{post_directory_plural}", POSTS_SORTED.values())
+
+        if feeds_config.get("taxonomies", False):
+            for taxonomy_name, taxonomy_config in taxonomies.items():
+                for term, term_posts in taxonomy_index[taxonomy_name].items():
+                    term_path = f'{post_directory_singular}/{taxonomy_config["taxonomy_directory"]}/{term}'
+                    write_feeds(f"{output_dir}/{term_path}", f"{site_title} - {term}", f"{siteURL}/{term_path}",
+                                term_posts.values())
+
+    tracer.mark("postprocess")
     if project_site is not None:
-        process_directory('_output', project_site)
-        searchindex_path = os.path.join(current_directory, "_output", "index.json")
+        process_directory(output_dir, project_site)
+        searchindex_path = os.path.join(output_root, "index.json")
         process_searchindex(searchindex_path, project_site)
 
     if enable_inject_tag == True:
-        with open("_output/index.html", 'r', encoding="utf-8") as fi:
+        with open(f"{output_dir}/index.html", 'r', encoding="utf-8") as fi:
             content = fi.read()
 
         if re.search(r'<meta name="generator" content="Bestatic" />', content):
@@ -712,20 +992,32 @@ def generator(**config):
             else:
                 new_content = re.sub(head_start_pattern, head_start_pattern + '\n\t\t<meta name="generator" content="Bestatic" />', content)
 
-                with open("_output/index.html", 'w', encoding="utf-8") as file:
+                with open(f"{output_dir}/index.html", 'w', encoding="utf-8") as file:
                     file.write(new_content)
     else:
         pass
 
     # Update image references in HTML/CSS/JS files if images were processed
-    if image_conversion_map and config and "image_processing" in config:
+    if image_conversion_map and image_processor:
         try:
-            image_processor = ImageProcessor(config["image_processing"])
-            output_dir = os.path.join(current_directory, "_output")
-            image_processor.scan_and_update_output(output_dir, image_conversion_map)
+            image_processor.scan_and_update_output(output_root, image_conversion_map)
         except Exception as e:
-            print(f"Warning: Failed to update image references: {e}")
+            warn(f"Failed to update image references: {e}")
+
+    if spill_store is not None:
+        spill_store.close()
+
+    for markdown_cache in markdown_caches.values():
+        markdown_cache.evict()
+
+    tracer.finish()
 
+    if report is not None:
+        report.collect(output_root, len(POSTS) if post_template else 0, len(PAGES) if page_template else 0,
+                       tracer, session=session, asset_sync=asset_sync,
+                       image_processor=image_processor if asset_plan.conversions else None,
+                       feeds=feed_stats,
+                       markdown_caches={name: cache.stats() for name, cache in markdown_caches.items()})
     return None
 
 
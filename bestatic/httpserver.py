@@ -1,62 +1,433 @@
 import http.server
+import io
 import os
-from datetime import datetime, timedelta
+import queue
+import socket
+import threading
+import email.utils
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from http import HTTPStatus
 from socketserver import ThreadingMixIn, TCPServer
+from urllib.parse import urlsplit, urlunsplit, unquote
+
+from bestatic.filecache import FileCache, CachedFile
+from bestatic import livereload
+
+EXTENSIONS_MAP = {
+    '': 'text/html',
+    '.manifest': 'text/cache-manifest',
+    '.html': 'text/html',
+    '.png': 'image/png',
+    '.jpg': 'image/jpg',
+    '.svg': 'image/svg+xml',
+    '.css': 'text/css',
+    '.js': 'application/x-javascript',
+    '.wasm': 'application/wasm',
+    '.json': 'application/json',
+    '.xml': 'application/xml',
+}
+
 
 class ThreadedHTTPServer(ThreadingMixIn, TCPServer):
     daemon_threads = True
     allow_reuse_address = True
 
-def bestatic_serv(*directory, port=8080):
-    PORT = port
-    DIRECTORY = directory[0] if directory else "_output"
 
-    class Handler(http.server.SimpleHTTPRequestHandler):
-        protocol_version = 'HTTP/1.0'  
-
-        extensions_map = {
-            '': 'text/html',
-            '.manifest': 'text/cache-manifest',
-            '.html': 'text/html',
-            '.png': 'image/png',
-            '.jpg': 'image/jpg',
-            '.svg': 'image/svg+xml',
-            '.css': 'text/css',
-            '.js': 'application/x-javascript',
-            '.wasm': 'application/wasm',
-            '.json': 'application/json',
-            '.xml': 'application/xml',
-        }        
-        
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=DIRECTORY, **kwargs)
-
-        def end_headers(self):
-            self.send_my_headers()
-            http.server.SimpleHTTPRequestHandler.end_headers(self)
-
-        def send_my_headers(self):
-            self.send_header("Connection", "close")
+def parse_byte_range(header, size):
+    """
+    Parse a single-range 'Range: bytes=...' header.
+
+    Args:
+        header: Value of the Range header
+        size: Size of the file in bytes
+
+    Returns:
+        (start, end) with end inclusive, or None to send the whole file
+        (missing, malformed or multi-range headers). start >= size means
+        the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None  # Multipart ranges are not supported; the whole file is valid too
+    start_text, sep, end_text = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if not start_text:
+            suffix_length = int(end_text)
+            if suffix_length <= 0:
+                return size, size - 1
+            return max(size - suffix_length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if end < start and start < size:
+        return None
+    return start, min(end, size - 1)
+
+
+def file_etag(stat):
+    """Strong validator built from a file's mtime and size."""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def is_not_modified(headers, etag, mtime):
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent."""
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def requested_range(headers, size, etag, mtime):
+    """Byte range to send, or None when Range is absent or If-Range does not match."""
+    if_range = headers.get("If-Range")
+    if if_range and if_range.strip() not in (etag, email.utils.formatdate(mtime, usegmt=True)):
+        return None
+    return parse_byte_range(headers.get("Range"), size)
+
+
+class BestaticHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Static file handler for the local server.
+
+    Uses HTTP/1.1 persistent connections and sends ETag/Last-Modified
+    validators, so reloads revalidate with 304 instead of re-downloading,
+    and honours single byte ranges so media can be seeked. With no_store,
+    every response tells the browser not to cache at all. With a
+    file_cache, file bodies and headers are served from memory. With a
+    live_reload hub, HTML pages get the live reload client script and
+    browsers are told about rebuilds over Server-Sent Events.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    extensions_map = EXTENSIONS_MAP
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 15
+
+    def __init__(self, *args, no_store=False, file_cache=None, live_reload=None, **kwargs):
+        self.no_store = no_store
+        self.file_cache = file_cache
+        self.live_reload = live_reload
+        self.byte_range = None
+        super().__init__(*args, **kwargs)
+
+    def end_headers(self):
+        self.send_my_headers()
+        http.server.SimpleHTTPRequestHandler.end_headers(self)
+
+    def send_my_headers(self):
+        if self.no_store:
             self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
             self.send_header("Pragma", "no-cache")
             self.send_header("Expires", "0")
-            
-        
-        def handle_one_request(self):
-            try:
-                super().handle_one_request()
-            except ConnectionResetError:
-                pass  # Ignore client disconnects
-
-    with ThreadedHTTPServer(("", PORT), Handler) as httpd:
+        else:
+            # Cache, but revalidate on every use so edits show up immediately
+            self.send_header("Cache-Control", "no-cache")
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (ConnectionResetError, BrokenPipeError):
+            self.close_connection = True  # Ignore client disconnects
+
+    def etag_for(self, stat):
+        return file_etag(stat)
+
+    def not_modified(self, etag, mtime):
+        return is_not_modified(self.headers, etag, mtime)
+
+    def requested_range(self, size, etag, mtime):
+        return requested_range(self.headers, size, etag, mtime)
+
+    def do_GET(self):
+        if self.live_reload is not None and urlsplit(self.path).path == livereload.EVENTS_PATH:
+            self.stream_events()
+        else:
+            super().do_GET()
+
+    def stream_events(self):
+        """Hold the connection open and push rebuild events to the browser."""
+        events = queue.Queue()
+        self.live_reload.subscribe(events.put)
+        self.close_connection = True
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"retry: 1000\n\n")
+            while True:
+                try:
+                    event = events.get(timeout=livereload.PING_INTERVAL)
+                except queue.Empty:
+                    event = b": ping\n\n"  # Detects browsers that went away
+                self.wfile.write(event)
+        except OSError:
+            pass
+        finally:
+            self.live_reload.unsubscribe(events.put)
+
+    def inject_live_reload(self, content_type):
+        """Script injection for HTML pages when live reload is on, else None."""
+        if self.live_reload is not None and content_type.startswith("text/html"):
+            return livereload.inject_script
+        return None
+
+    def send_script(self):
+        body = livereload.CLIENT_SCRIPT.encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", "text/javascript")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def cached_entry(self):
+        """Look up (or load) the requested file in the memory cache; None means serve from disk."""
+        key = unquote(urlsplit(self.path).path)
+        entry = self.file_cache.get(key)
+        if entry is not None:
+            return entry
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not key.endswith('/'):
+                return None  # Redirect
+            path = next((os.path.join(path, index) for index in ("index.html", "index.htm")
+                         if os.path.isfile(os.path.join(path, index))), None)
+        if not path or not os.path.isfile(path):
+            return None  # Listings and errors are not cached
+        rel_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+        content_type = self.guess_type(path)
+        try:
+            return self.file_cache.load(key, path, rel_path, content_type, self.inject_live_reload(content_type))
+        except OSError:
+            return None
+
+    def send_cached(self, entry):
+        """Send headers for a cached file and return its body as a stream."""
+        use_gzip = (entry.gzip_body is not None and not self.headers.get("Range")
+                    and "gzip" in self.headers.get("Accept-Encoding", ""))
+        etag = entry.gzip_etag if use_gzip else entry.etag
+
+        if not self.no_store and self.not_modified(etag, entry.mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", entry.last_modified)
+            self.end_headers()
+            return None
+
+        body = entry.gzip_body if use_gzip else entry.body
+        byte_range = None if use_gzip else self.requested_range(entry.size, etag, entry.mtime)
+        if byte_range and byte_range[0] >= entry.size:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{entry.size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        if byte_range:
+            start, end = byte_range
+            body = body[start:end + 1]
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{entry.size}")
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-type", entry.content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Last-Modified", entry.last_modified)
+        if entry.gzip_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        if not self.no_store:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def send_head(self):
+        self.byte_range = None
+        if self.live_reload is not None and urlsplit(self.path).path == livereload.SCRIPT_PATH:
+            return self.send_script()
+        if self.file_cache is not None:
+            entry = self.cached_entry()
+            if entry is not None:
+                return self.send_cached(entry)
+
+        path = self.translate_path(self.path)
+
+        if os.path.isdir(path):
+            parts = urlsplit(self.path)
+            if not parts.path.endswith('/'):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", urlunsplit((parts[0], parts[1], parts[2] + '/', parts[3], parts[4])))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            for index in ("index.html", "index.htm"):
+                index_path = os.path.join(path, index)
+                if os.path.isfile(index_path):
+                    path = index_path
+                    break
+            else:
+                return self.list_directory(path)
+
+        if path.endswith("/"):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            stat = os.fstat(f.fileno())
+            inject = self.inject_live_reload(self.guess_type(path))
+            if inject is not None:
+                # Pages are small: serve the modified copy like a cache entry
+                rel_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with f:
+                    entry = CachedFile(rel_path, inject(f.read()), self.guess_type(path), stat, float("inf"))
+                return self.send_cached(entry)
+            etag = self.etag_for(stat)
+            last_modified = self.date_time_string(stat.st_mtime)
+
+            if not self.no_store and self.not_modified(etag, stat.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                f.close()
+                return None
+
+            byte_range = self.requested_range(stat.st_size, etag, stat.st_mtime)
+            if byte_range and byte_range[0] >= stat.st_size:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{stat.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                f.close()
+                return None
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{stat.st_size}")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.byte_range = byte_range
+            else:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Length", str(stat.st_size))
+            self.send_header("Content-type", self.guess_type(path))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Last-Modified", last_modified)
+            if not self.no_store:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            return f
+        except:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, io.BytesIO):
+            # Cached files and directory listings are in-memory buffers
+            return super().copyfile(source, outputfile)
+        start, end = self.byte_range or (0, os.fstat(source.fileno()).st_size - 1)
+        # Headers are already on the wire (wfile is unbuffered), so the body
+        # can go straight from the file to the socket
+        if end >= start:
+            self.connection.sendfile(source, offset=start, count=end - start + 1)
+
+
+def watch_rebuilds(invalidations, file_cache=None, live_reload=None):
+    """
+    Apply changed-path lists from the rebuild watcher (runs in a thread).
+
+    Stale entries leave the memory cache first, then browsers are notified.
+    """
+    while True:
+        rel_paths = invalidations.get()
+        if file_cache is not None:
+            file_cache.invalidate(rel_paths)
+        if live_reload is not None and rel_paths:
+            live_reload.publish(rel_paths)
+
+
+class ReusePortHTTPServer(ThreadedHTTPServer):
+    """ThreadedHTTPServer whose port can be shared with other server processes (SO_REUSEPORT)."""
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def bestatic_serv(*directory, port=8080, no_store=False, cache_mb=None, invalidations=None, live_reload=False,
+                  backend="threaded", max_connections=256, workers=1, reuse_port=False, announce=True):
+    PORT = port
+    DIRECTORY = directory[0] if directory else "_output"
+
+    if workers > 1:
+        from bestatic.prefork import serve_workers
+        return serve_workers(DIRECTORY, port=PORT, workers=workers, no_store=no_store, cache_mb=cache_mb,
+                             invalidations=invalidations, live_reload=live_reload, backend=backend,
+                             max_connections=max_connections)
+
+    def print_banner():
+        if announce:
+            print("Serving at port", PORT)
+            print(f"Click http://localhost:{PORT} to visit the live website")
+            print("Click Ctrl+C to shut down the server")
+
+    hub = livereload.LiveReloadHub() if live_reload else None
+    file_cache = FileCache(cache_mb) if cache_mb and backend != "asyncio" else None
+    if invalidations is not None and (file_cache is not None or hub is not None):
+        threading.Thread(target=watch_rebuilds, args=(invalidations, file_cache, hub), daemon=True).start()
+
+    if backend == "asyncio":
+        import asyncio
+        from bestatic.asyncserver import serve_async
+
+        if cache_mb and announce:
+            print("Note: --memory-cache is only used by the threaded server backend")
+        print_banner()
+        try:
+            asyncio.run(serve_async(DIRECTORY, PORT, no_store=no_store, max_connections=max_connections,
+                                    reuse_port=reuse_port, live_reload=hub))
+        except KeyboardInterrupt:
+            if announce:
+                print("\nServer shutting down ...")
+        return
+
+    Handler = partial(BestaticHandler, directory=DIRECTORY, no_store=no_store, file_cache=file_cache,
+                      live_reload=hub)
+    server_class = ReusePortHTTPServer if reuse_port else ThreadedHTTPServer
+
+    with server_class(("", PORT), Handler) as httpd:
         httpd.timeout = 1
-        print("Serving at port", PORT)
-        print(f"Click http://localhost:{PORT} to visit the live website")
-        print("Click Ctrl+C to shut down the server")
+        print_banner()
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
-            print("\nServer shutting down ...")
+            if announce:
+                print("\nServer shutting down ...")
         finally:
             httpd.shutdown()
 
@@ -0,0 +1,143 @@
+import os
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Content-addressed on-disk cache of encoded images."""
+
+    # Bump when the encoder output changes in a way the key does not capture
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir: str, max_size_mb: Optional[float] = 1024, link: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory where encoded images are stored
+            max_size_mb: Size limit enforced by evict(); None disables eviction
+            link: Hard-link cached files into the output instead of copying them
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None
+        self.link = link
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Return the SHA-256 hex digest of a file's bytes."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key_for(self, source_path: str, settings: Dict, source_digest: Optional[str] = None) -> str:
+        """
+        Build the cache key for a source image and its encoder settings.
+
+        Args:
+            source_path: Path to the source image
+            settings: Encoder settings (quality, method, max dimension, ...)
+            source_digest: Precomputed hash_file() of the source, if known
+
+        Returns:
+            Hex digest identifying the encoded output
+        """
+        parts = [f"v{self.CACHE_VERSION}", source_digest or self.hash_file(source_path)]
+        parts.extend(f"{name}={settings[name]}" for name in sorted(settings))
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{suffix}"
+
+    def _place(self, source: Path, destination: Path):
+        """Hard-link (or copy) source to destination, replacing it atomically."""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        temp = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+        if temp.exists():
+            temp.unlink()
+        try:
+            if not self.link:
+                raise OSError("linking disabled")
+            os.link(source, temp)
+        except OSError:
+            shutil.copy2(source, temp)
+        os.replace(temp, destination)
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """
+        Place a cached entry at destination.
+
+        Args:
+            key: Cache key from key_for()
+            destination: Output path to create
+
+        Returns:
+            True on a cache hit, False on a miss
+        """
+        entry = self._entry_path(key, Path(destination).suffix)
+        if not entry.is_file():
+            return False
+        try:
+            os.utime(entry)  # Mark as recently used for eviction
+            self._place(entry, Path(destination))
+        except OSError as e:
+            logger.warning(f"Could not use cached image for {destination}: {e}")
+            return False
+        return True
+
+    def store(self, key: str, encoded_path: str):
+        """
+        Add a freshly encoded file to the cache.
+
+        Args:
+            key: Cache key from key_for()
+            encoded_path: Path of the encoded output file
+        """
+        try:
+            self._place(Path(encoded_path), self._entry_path(key, Path(encoded_path).suffix))
+        except OSError as e:
+            logger.warning(f"Could not cache encoded image {encoded_path}: {e}")
+
+    def size(self) -> int:
+        """Return the total size of the cache in bytes."""
+        if not self.cache_dir.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.cache_dir.rglob('*') if path.is_file())
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_size_mb.
+
+        Returns:
+            Number of bytes removed
+        """
+        if self.max_bytes is None or not self.cache_dir.exists():
+            return 0
+
+        entries = []
+        total = 0
+        for path in self.cache_dir.rglob('*'):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total - removed <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += size
+            except OSError:
+                pass
+
+        if removed:
+            logger.info(f"Evicted {removed} bytes from image cache {self.cache_dir}")
+        return removed
@@ -1,9 +1,16 @@
 import os
 import re
+import time
+import shutil
 import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from bestatic.imagecache import ImageCache
+
 try:
     from PIL import Image
 except ImportError:
@@ -11,12 +18,31 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Per-process ImageProcessor used by pool workers (set by _init_worker)
+_worker_processor = None
+
+
+def _init_worker(config: Dict):
+    """Create the ImageProcessor instance used inside a pool worker."""
+    global _worker_processor
+    _worker_processor = ImageProcessor(config)
+
+
+def _process_image_job(input_path: str, output_dir: str) -> Tuple[str, Dict[str, str], float]:
+    """Convert one image inside a pool worker and time it."""
+    start = time.perf_counter()
+    results = _worker_processor.process_image(input_path, output_dir)
+    return input_path, results, time.perf_counter() - start
+
 
 class ImageProcessor:
     """Process images for optimization and format conversion to WebP."""
     
     # Supported input formats
     PROCESSABLE_FORMATS = {'.jpg', '.jpeg', '.png', '.gif'}
+
+    # Images above this many pixels count as "large" for decode throttling
+    LARGE_IMAGE_PIXELS = 10_000_000
     
     def __init__(self, config: Dict):
         """
@@ -24,7 +50,9 @@ class ImageProcessor:
         
         Args:
             config: Image processing configuration dictionary
-                   Expected keys: enabled, quality, keep_original
+                   Expected keys: enabled, quality, keep_original, workers,
+                   max_large_decodes, max_dimension, method, widths,
+                   sizes, cache, cache_dir, cache_max_size_mb, cache_link
         """
         if Image is None:
             raise ImportError("Pillow is required for image processing. Install with: pip install Pillow")
@@ -33,6 +61,43 @@ class ImageProcessor:
         self.enabled = config.get('enabled', False)
         self.quality = config.get('quality', 80)
         self.keep_original = config.get('keep_original', False)
+
+        # Parallel conversion: number of worker processes and how many large
+        # images may be decoded at the same time (bounds peak memory)
+        self.workers = max(1, int(config.get('workers') or os.cpu_count() or 1))
+        self.max_large_decodes = max(1, int(config.get('max_large_decodes', 2)))
+
+        # Encoder settings; method None picks a speed based on image size
+        self.max_dimension = int(config.get('max_dimension', 2400))
+        self.method = config.get('method')
+
+        # Responsive variants: extra widths generated from the same decode,
+        # and the default 'sizes' attribute used with the resulting srcset
+        self.widths = [int(w) for w in config.get('widths', [])]
+        self.sizes = config.get('sizes', '100vw')
+        self.variant_manifest: Dict[str, List[Dict]] = {}
+
+        # Persistent cache of encoded outputs
+        self.cache = None
+        if config.get('cache', True):
+            self.cache = ImageCache(
+                config.get('cache_dir', os.path.join('.bestatic-cache', 'images')),
+                max_size_mb=config.get('cache_max_size_mb', 1024),
+                link=config.get('cache_link', True),
+            )
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Images encoded during the last run (cache hits excluded) and the bytes
+        # of their sources and main WebP outputs (responsive variants are not counted)
+        self.converted = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        # Seconds spent converting each image during the last run
+        self.timings: Dict[str, float] = {}
+        # Input paths of the last batch that produced no WebP
+        self.failed: List[str] = []
         
         # File inclusion/exclusion
         self.include_formats = set(
@@ -60,6 +125,9 @@ class ImageProcessor:
         """
         Process a single image: convert to WebP, optimize, and save.
         
+        When responsive widths are configured, smaller variants are produced
+        from the same decode, downscaling progressively from the largest.
+        
         Args:
             input_path: Path to input image
             output_dir: Directory where processed images should be saved
@@ -67,6 +135,8 @@ class ImageProcessor:
         Returns:
             Dictionary with 'webp' key mapping to output path
             Example: {'webp': 'output/images/photo.webp'}
+            With widths configured, 'variants' lists every output as
+            {'path', 'width', 'height'} dicts, largest first.
         """
         results = {}
         input_path_obj = Path(input_path)
@@ -81,7 +151,7 @@ class ImageProcessor:
             if file_size_mb > 10:
                 logger.warning(f"Large image detected ({file_size_mb:.1f}MB): {input_path} - this may take a while...")
             
-            # Open and process image
+            # Open image (only the header is read until pixel data is needed)
             with Image.open(input_path) as img:
                 # Check image dimensions
                 width, height = img.size
@@ -89,75 +159,141 @@ class ImageProcessor:
                 if total_pixels > 10_000_000:  # 10 megapixels
                     logger.warning(f"Large image dimensions ({width}x{height}): {input_path} - processing...")
                 
-                # Downscale very large images for faster processing
-                max_dimension = 2400  # Maximum width or height
-                if width > max_dimension or height > max_dimension:
-                    # Calculate new dimensions maintaining aspect ratio
-                    if width > height:
-                        new_width = max_dimension
-                        new_height = int((max_dimension / width) * height)
-                    else:
-                        new_height = max_dimension
-                        new_width = int((max_dimension / height) * width)
-                    
-                    logger.info(f"Resizing large image from {width}x{height} to {new_width}x{new_height}: {input_path}")
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    width, height = new_width, new_height
-                    total_pixels = width * height
-                
-                # Convert RGBA to RGB for formats that don't support transparency
-                # WebP supports transparency, so we can keep RGBA/P modes
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # WebP handles transparency well, keep as-is
-                    pass
-                elif img.mode != 'RGB' and img.mode not in ('RGBA', 'LA', 'P'):
-                    # Convert other modes to RGB
-                    img = img.convert('RGB')
+                # Plan every output: the main WebP capped at max_dimension,
+                # then one variant per configured width below that size
+                main_width, main_height = self._fit(width, height)
+                planned = [(output_dir_obj / f"{input_path_obj.stem}.webp", main_width, main_height, None)]
+                for variant_width in sorted(set(self.widths), reverse=True):
+                    if variant_width < main_width:
+                        variant_height = max(1, round(main_height * variant_width / main_width))
+                        planned.append((output_dir_obj / f"{input_path_obj.stem}-{variant_width}w.webp",
+                                        variant_width, variant_height, variant_width))
                 
-                # Save in requested formats
-                base_name = input_path_obj.stem
+                # Reuse cached encodings; only decode if something is missing
+                source_digest = self._source_digest(input_path)
+                missing = []
+                for output_path, out_width, out_height, variant_width in planned:
+                    cache_key = self._cache_key(input_path, source_digest, variant_width)
+                    if cache_key and self.cache.fetch(cache_key, str(output_path)):
+                        continue
+                    missing.append(output_path)
                 
-                # Convert to WebP
-                output_path = output_dir_obj / f"{base_name}.webp"
+                if self.cache:
+                    results['cache'] = 'miss' if missing else 'hit'
                 
-                # WebP save options
-                save_kwargs = {'quality': self.quality}
-                
-                # Use fastest method for large images
-                if total_pixels > 4_000_000:  # 4 megapixels
-                    save_kwargs['method'] = 1  # Very fast encoding (0-6, lower = faster)
-                    logger.info(f"Using very fast WebP encoding for large image: {input_path}")
-                elif total_pixels > 2_000_000:  # 2 megapixels
-                    save_kwargs['method'] = 3  # Fast encoding
+                if missing:
+                    # Let JPEG decode at a reduced scale when we only need a smaller image
+                    if img.format == 'JPEG' and (main_width, main_height) != (width, height):
+                        img.draft(img.mode, (main_width, main_height))
+                    
+                    # Convert RGBA to RGB for formats that don't support transparency
+                    # WebP supports transparency, so we can keep RGBA/P modes
+                    if img.mode not in ('RGB', 'RGBA', 'LA', 'P'):
+                        # Convert other modes to RGB
+                        img = img.convert('RGB')
+                    
+                    current = img
+                    for output_path, out_width, out_height, variant_width in planned:
+                        if current.size != (out_width, out_height):
+                            logger.info(f"Resizing image from {current.size[0]}x{current.size[1]} "
+                                        f"to {out_width}x{out_height}: {input_path}")
+                            # Downscale from the previous (larger) output, not the source
+                            current = current.resize((out_width, out_height), Image.Resampling.LANCZOS,
+                                                     reducing_gap=3.0)
+                        if output_path not in missing:
+                            continue
+                        
+                        logger.info(f"Converting {input_path} to WebP...")
+                        # Encode to a temporary file and rename it into place: the
+                        # output may be a hard link to a cache entry, which must not
+                        # be overwritten through the shared inode
+                        temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+                        try:
+                            current.save(str(temp_path), format='WEBP', **self._save_kwargs(out_width * out_height))
+                            os.replace(temp_path, output_path)
+                        finally:
+                            if temp_path.exists():
+                                temp_path.unlink()
+                        logger.info(f"✓ Converted {input_path} to {output_path}")
+                        cache_key = self._cache_key(input_path, source_digest, variant_width)
+                        if cache_key:
+                            self.cache.store(cache_key, str(output_path))
                 else:
-                    save_kwargs['method'] = 6  # Better compression for smaller images
+                    logger.info(f"✓ Reused cached WebP for {input_path}")
                 
-                logger.info(f"Converting {input_path} to WebP...")
-                img.save(str(output_path), format='WEBP', **save_kwargs)
-                results['webp'] = str(output_path)
-                logger.info(f"✓ Converted {input_path} to {output_path}")
-                
-                # Keep original if configured
-                if self.keep_original:
-                    original_output = output_dir_obj / input_path_obj.name
-                    if str(original_output) != input_path:
-                        # Use the already open image
-                        img.save(str(original_output))
-                        results['original'] = str(original_output)
-                        logger.info(f"Kept original: {original_output}")
+                results['webp'] = str(planned[0][0])
+                if len(planned) > 1:
+                    results['variants'] = [
+                        {'path': str(output_path), 'width': out_width, 'height': out_height}
+                        for output_path, out_width, out_height, _ in planned
+                    ]
         
         except Exception as e:
             logger.error(f"Error processing image {input_path}: {e}")
-            # Only copy original on error if we want to keep originals
-            if self.keep_original:
-                original_output = output_dir_obj / input_path_obj.name
-                if str(original_output) != input_path:
-                    import shutil
+        
+        # Keep original if configured (copy the bytes rather than re-encoding)
+        if self.keep_original:
+            original_output = output_dir_obj / input_path_obj.name
+            if str(original_output) != input_path:
                 shutil.copy2(input_path, original_output)
                 results['original'] = str(original_output)
+                logger.info(f"Kept original: {original_output}")
         
         return results
     
+    def _fit(self, width: int, height: int) -> Tuple[int, int]:
+        """Scale dimensions down to fit max_dimension, keeping the aspect ratio."""
+        max_dimension = self.max_dimension
+        if width <= max_dimension and height <= max_dimension:
+            return width, height
+        if width > height:
+            return max_dimension, int((max_dimension / width) * height)
+        return int((max_dimension / height) * width), max_dimension
+    
+    def _save_kwargs(self, total_pixels: int) -> Dict:
+        """WebP save options for an output of the given pixel count."""
+        save_kwargs = {'quality': self.quality}
+        
+        # Use fastest method for large images
+        if self.method is not None:
+            save_kwargs['method'] = int(self.method)
+        elif total_pixels > 4_000_000:  # 4 megapixels
+            save_kwargs['method'] = 1  # Very fast encoding (0-6, lower = faster)
+        elif total_pixels > 2_000_000:  # 2 megapixels
+            save_kwargs['method'] = 3  # Fast encoding
+        else:
+            save_kwargs['method'] = 6  # Better compression for smaller images
+        return save_kwargs
+    
+    def _source_digest(self, input_path: str) -> Optional[str]:
+        """Hash the source image once for all of its cache keys."""
+        if not self.cache:
+            return None
+        try:
+            return ImageCache.hash_file(input_path)
+        except OSError as e:
+            logger.warning(f"Could not hash {input_path} for image cache: {e}")
+            return None
+    
+    def _cache_key(self, input_path: str, source_digest: Optional[str],
+                   variant_width: Optional[int] = None) -> Optional[str]:
+        """Cache key for the main output (variant_width None) or a width variant."""
+        if not source_digest:
+            return None
+        settings = self._encode_settings()
+        if variant_width is not None:
+            settings['width'] = variant_width
+        return self.cache.key_for(input_path, settings, source_digest=source_digest)
+    
+    def _encode_settings(self) -> Dict:
+        """Return the settings that determine the encoded output (used as cache key)."""
+        return {
+            'format': 'webp',
+            'quality': self.quality,
+            'method': self.method if self.method is not None else 'auto',
+            'max_dimension': self.max_dimension,
+        }
+
     def _normalize_path(self, path: str) -> str:
         """
         Normalize path for comparison (handle backslashes, etc.).
@@ -193,6 +329,40 @@ class ImageProcessor:
         
         return conversion_map
     
+    def _build_variant_manifest(self, processed_files: Dict[str, Dict], static_dir: str,
+                                output_static_dir: str, url_prefix: str) -> Dict[str, List[Dict]]:
+        """
+        Build a mapping of image site paths to their responsive variants.
+        
+        Args:
+            processed_files: Dict mapping input paths to result dicts
+            static_dir: Source directory the input paths live in
+            output_static_dir: Output directory the variants were written to
+            url_prefix: Site path of output_static_dir
+            
+        Returns:
+            Dict mapping both the original and the WebP site path (without a
+            leading slash) to a list of {'url', 'width', 'height'} dicts
+        """
+        manifest = {}
+        prefix = url_prefix.strip('/')
+        
+        for input_path, results in processed_files.items():
+            if 'variants' not in results:
+                continue
+            entries = []
+            for variant in results['variants']:
+                rel = self._normalize_path(os.path.relpath(variant['path'], output_static_dir))
+                entries.append({'url': f"/{prefix}/{rel}" if prefix else f"/{rel}",
+                                'width': variant['width'], 'height': variant['height']})
+            
+            original_rel = self._normalize_path(os.path.relpath(input_path, static_dir))
+            webp_rel = self._normalize_path(os.path.relpath(results['webp'], output_static_dir))
+            for rel in (original_rel, webp_rel):
+                manifest[f"{prefix}/{rel}" if prefix else rel] = entries
+        
+        return manifest
+    
     def update_references_in_file(self, filepath: str, conversion_map: Dict[str, str]) -> int:
         """
         Update image references in HTML, CSS, or JS file.
@@ -314,13 +484,16 @@ class ImageProcessor:
         logger.info(f"Total image reference updates: {total_replacements}")
         return total_replacements
     
-    def process_static_content(self, static_dir: str, output_static_dir: str) -> Dict[str, str]:
+    def process_static_content(self, static_dir: str, output_static_dir: str,
+                               url_prefix: Optional[str] = None) -> Dict[str, str]:
         """
         Process all images in static content directory.
         
         Args:
             static_dir: Source static-content directory
             output_static_dir: Destination static-content directory in _output
+            url_prefix: Site path of output_static_dir, used for the variant
+                        manifest (defaults to its directory name)
             
         Returns:
             Conversion map (original filename -> converted filename)
@@ -333,11 +506,11 @@ class ImageProcessor:
             logger.warning(f"Static content directory not found: {static_dir}")
             return {}
         
-        processed_files = {}
-        
-        # Walk through all files in static-content
+        # Collect jobs in a stable order so the conversion map is deterministic
+        jobs = []
         for root, dirs, files in os.walk(static_dir):
-            for filename in files:
+            dirs.sort()
+            for filename in sorted(files):
                 input_path = os.path.join(root, filename)
                 
                 if not self.should_process(input_path):
@@ -346,14 +519,161 @@ class ImageProcessor:
                 # Calculate relative path from static_dir
                 rel_path = os.path.relpath(root, static_dir)
                 output_dir = os.path.join(output_static_dir, rel_path) if rel_path != '.' else output_static_dir
-                
-                # Process the image
-                results = self.process_image(input_path, output_dir)
-                if results:
-                    processed_files[input_path] = results
+                jobs.append((input_path, output_dir))
+        
+        return self.process_planned([(static_dir, output_static_dir, jobs)], url_prefix)
+
+    def process_planned(self, conversions: List[Tuple[str, str, List[Tuple[str, str]]]],
+                        url_prefix: Optional[str] = None) -> Dict[str, str]:
+        """
+        Convert images from one or more static trees in a single batch.
+        
+        Args:
+            conversions: (source root, destination root, jobs) tuples, as in
+                         AssetPlan.conversions
+            url_prefix: Site path of the destination roots for the variant
+                        manifest (defaults to each root's directory name)
+            
+        Returns:
+            Conversion map (original filename -> converted filename)
+        """
+        all_jobs = [job for _, _, jobs in conversions for job in jobs]
+        processed_files = self.process_jobs(all_jobs)
+        
+        for static_dir, output_static_dir, jobs in conversions:
+            prefix = url_prefix if url_prefix is not None else Path(output_static_dir).name
+            processed_here = {input_path: processed_files[input_path]
+                              for input_path, _ in jobs if input_path in processed_files}
+            self.variant_manifest.update(
+                self._build_variant_manifest(processed_here, static_dir, output_static_dir, prefix))
         
         # Build conversion map
         conversion_map = self._build_conversion_map(processed_files)
         
         logger.info(f"Processed {len(processed_files)} images")
         return conversion_map
+
+    def _is_large(self, input_path: str) -> bool:
+        """Check image dimensions from the header without decoding pixel data."""
+        try:
+            with Image.open(input_path) as img:
+                width, height = img.size
+            return width * height > self.LARGE_IMAGE_PIXELS
+        except Exception:
+            return False
+
+    def process_jobs(self, jobs: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Convert a batch of images, in parallel when more than one worker is configured.
+        
+        Args:
+            jobs: List of (input_path, output_dir) tuples
+            
+        Returns:
+            Dict mapping input paths to result dicts, in the order of ``jobs``
+        """
+        self.timings = {}
+        self.failed = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.converted = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if not jobs:
+            return {}
+
+        total = len(jobs)
+        results_by_path: Dict[str, Dict[str, str]] = {}
+
+        def record(input_path, results, elapsed):
+            results_by_path[input_path] = results
+            self.timings[input_path] = elapsed
+            if results.get('cache') == 'hit':
+                self.cache_hits += 1
+            elif results.get('cache') == 'miss':
+                self.cache_misses += 1
+            if not results.get('webp'):
+                self.failed.append(input_path)
+            elif results.get('cache') != 'hit' and os.path.exists(results['webp']):
+                # Only images encoded in this batch; cache hits are counted above
+                self.converted += 1
+                self.bytes_in += os.path.getsize(input_path)
+                self.bytes_out += os.path.getsize(results['webp'])
+            logger.info(f"[{len(results_by_path)}/{total}] {input_path} ({elapsed:.2f}s)")
+
+        pending = list(jobs)
+        if self.workers > 1 and total > 1:
+            pending = self._run_pool(jobs, record)
+
+        # Serial path, also used to finish up if the pool broke down
+        for input_path, output_dir in pending:
+            start = time.perf_counter()
+            try:
+                results = self.process_image(input_path, output_dir)
+            except Exception as e:
+                logger.error(f"Error processing image {input_path}: {e}")
+                results = {}
+            record(input_path, results, time.perf_counter() - start)
+
+        if self.cache:
+            logger.info(f"Image cache: {self.cache_hits} hits, {self.cache_misses} misses")
+            self.cache.evict()
+
+        return {input_path: results_by_path[input_path]
+                for input_path, _ in jobs if results_by_path.get(input_path)}
+
+    def summary(self) -> str:
+        """One-line report of the last process_jobs() batch."""
+        line = f"Images: {len(self.timings)} processed"
+        if self.cache:
+            line += f", cache: {self.cache_hits} hits, {self.cache_misses} misses"
+        return line
+
+    def _run_pool(self, jobs: List[Tuple[str, str]], record) -> List[Tuple[str, str]]:
+        """
+        Run jobs on a process pool, keeping at most ``max_large_decodes`` large
+        images in flight. Returns the jobs that did not complete.
+        """
+        small, large = deque(), deque()
+        for job in jobs:
+            (large if self._is_large(job[0]) else small).append(job)
+        window = self.workers * 2
+        inflight = {}
+        large_inflight = 0
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                     initializer=_init_worker, initargs=(self.config,)) as pool:
+                while small or large or inflight:
+                    while len(inflight) < window:
+                        if large and large_inflight < self.max_large_decodes:
+                            job, is_large = large.popleft(), True
+                            large_inflight += 1
+                        elif small:
+                            job, is_large = small.popleft(), False
+                        else:
+                            break
+                        inflight[pool.submit(_process_image_job, *job)] = (job, is_large)
+
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            outcome = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            # One failing image must not abort the batch
+                            input_path = inflight[future][0][0]
+                            logger.error(f"Error processing image {input_path}: {e}")
+                            outcome = (input_path, {}, 0.0)
+                        job, is_large = inflight.pop(future)
+                        if is_large:
+                            large_inflight -= 1
+                        record(*outcome)
+        except BrokenProcessPool as e:
+            logger.warning(f"Image worker pool failed ({e}), continuing serially")
+            order = {job: index for index, job in enumerate(jobs)}
+            remaining = [job for job, _ in inflight.values()] + list(large) + list(small)
+            return sorted(remaining, key=order.__getitem__)
+
+        return []
@@ -0,0 +1,101 @@
+import json
+import threading
+from typing import Callable, Iterable, List
+
+EVENTS_PATH = "/__bestatic/events"
+SCRIPT_PATH = "/__bestatic/livereload.js"
+SCRIPT_TAG = f'<script src="{SCRIPT_PATH}"></script>'.encode("utf-8")
+
+# Seconds between keep-alive comments on idle event streams
+PING_INTERVAL = 15
+
+CLIENT_SCRIPT = """(function () {
+  if (!window.EventSource) { return; }
+  var source = new EventSource("%(events)s");
+
+  function normalize(path) {
+    return path.replace(/\\/index\\.html?$/, "/");
+  }
+
+  function swapStylesheets(cssUrls) {
+    var links = document.querySelectorAll('link[rel="stylesheet"]');
+    var matched = Array.prototype.filter.call(links, function (link) {
+      return cssUrls.indexOf(new URL(link.href, location.href).pathname) !== -1;
+    });
+    // A changed stylesheet nobody links directly (e.g. via @import): refresh them all
+    (matched.length ? matched : Array.prototype.slice.call(links)).forEach(function (link) {
+      var url = new URL(link.href, location.href);
+      url.searchParams.set("bestatic-reload", Date.now());
+      var fresh = link.cloneNode();
+      fresh.href = url.href;
+      fresh.onload = function () { link.remove(); };
+      link.parentNode.insertBefore(fresh, link.nextSibling);
+    });
+  }
+
+  source.addEventListener("rebuild", function (event) {
+    var urls = JSON.parse(event.data).urls;
+    var here = normalize(location.pathname);
+    if (urls.some(function (url) { return normalize(url) === here; })) {
+      location.reload();
+      return;
+    }
+    var css = urls.filter(function (url) { return /\\.css$/.test(url); });
+    if (css.length) { swapStylesheets(css); }
+  });
+})();
+""" % {"events": EVENTS_PATH}
+
+
+def paths_to_urls(rel_paths: Iterable[str]) -> List[str]:
+    """Turn '/'-separated output paths into the URL paths they are served at."""
+    urls = []
+    for rel_path in rel_paths:
+        urls.append(f"/{rel_path}")
+        if rel_path == "index.html" or rel_path.endswith("/index.html"):
+            urls.append(f"/{rel_path[:-len('index.html')]}")
+    return urls
+
+
+def inject_script(body: bytes) -> bytes:
+    """Add the live reload script tag before </body> (or at the end of the page)."""
+    position = body.lower().rfind(b"</body>")
+    if position == -1:
+        return body + SCRIPT_TAG
+    return body[:position] + SCRIPT_TAG + body[position:]
+
+
+def format_event(rel_paths: Iterable[str]) -> bytes:
+    """Server-Sent Events message announcing a rebuild."""
+    return f"event: rebuild\ndata: {json.dumps({'urls': paths_to_urls(rel_paths)})}\n\n".encode("utf-8")
+
+
+class LiveReloadHub:
+    """Fan out rebuild notifications to connected browsers."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[bytes], None]):
+        """Register callback(event bytes); it is called from the publishing thread."""
+        with self._lock:
+            self._subscribers.add(callback)
+
+    def unsubscribe(self, callback: Callable[[bytes], None]):
+        with self._lock:
+            self._subscribers.discard(callback)
+
+    def publish(self, rel_paths: Iterable[str]):
+        """Send the paths a rebuild changed to every connected browser."""
+        event = format_event(rel_paths)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except RuntimeError:
+                self.unsubscribe(callback)  # Its event loop has shut down
+
+    def __len__(self):
+        return len(self._subscribers)
@@ -0,0 +1,310 @@
+import os
+import json
+import types
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class _DiskCache:
+    """
+    Content-addressed entries under cache_dir, the recently used ones also
+    kept in memory.
+
+    evict() trims the directory to max_size_mb, least recently used entries
+    first (reads refresh an entry's mtime, as in ImageCache).
+    """
+
+    def __init__(self, cache_dir: str, suffix: str, max_size_mb: Optional[float] = 64, memory_mb: float = 16):
+        """
+        Args:
+            cache_dir: Directory the entries are stored in
+            suffix: File suffix of the entries
+            max_size_mb: Size limit enforced by evict(); None disables eviction
+            memory_mb: Size limit of the in-memory copies
+        """
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None
+        self.memory_bytes = int(memory_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_size = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def _remember(self, key: str, value: str):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes and self._memory:
+            self._memory_size -= len(self._memory.popitem(last=False)[1])
+
+    def _get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            return value
+        path = self._entry_path(key)
+        try:
+            value = path.read_text(encoding='utf-8')
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            return None
+        self._remember(key, value)
+        return value
+
+    def _put(self, key: str, value: str):
+        self._remember(key, value)
+        path = self._entry_path(key)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(value, encoding='utf-8')
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not store Markdown cache entry {path}: {e}")
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_size_mb.
+
+        Entries held in memory were used by this process and are deleted last.
+
+        Returns:
+            Number of bytes removed
+        """
+        if self.max_bytes is None or not self.cache_dir.exists():
+            return 0
+
+        entries = []
+        total = 0
+        for path in self.cache_dir.rglob(f'*{self.suffix}'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            in_memory = path.name[:-len(self.suffix)] in self._memory
+            entries.append((in_memory, stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, _, size, path in sorted(entries):
+            if total - removed <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += size
+            except OSError:
+                pass
+
+        if removed:
+            logger.info(f"Evicted {removed} bytes from Markdown cache {self.cache_dir}")
+        return removed
+
+
+def _with_globals(function, **names):
+    """Copy of function that resolves the given global names to other objects."""
+    return types.FunctionType(function.__code__, {**function.__globals__, **names}, function.__name__,
+                              function.__defaults__, function.__closure__)
+
+
+class HighlightCache(_DiskCache):
+    """
+    On-disk cache of code blocks highlighted by codehilite.
+
+    Both indented blocks (the codehilite treeprocessor) and fenced blocks
+    (fenced_code with codehilite enabled) create a CodeHilite and call its
+    hilite(). install() makes one converter's processors create a subclass
+    instead, whose hilite() looks the result up by the language, a hash
+    of the code and the highlighter options, so Pygments only runs for
+    code it has not seen before.
+    """
+
+    # Bump when the cached HTML changes in a way the key does not capture
+    CACHE_VERSION = 1
+
+    # (registry, name) of the processors that create CodeHilite instances
+    PROCESSORS = (('treeprocessors', 'hilite'), ('preprocessors', 'fenced_code_block'))
+
+    def __init__(self, cache_dir: str, max_size_mb: Optional[float] = 64):
+        super().__init__(cache_dir, ".html", max_size_mb)
+        import markdown
+        try:
+            import pygments
+            pygments_version = pygments.__version__
+        except ImportError:
+            pygments_version = None
+        self._versions = [self.CACHE_VERSION, markdown.__version__, pygments_version]
+
+    def key_for(self, highlighter, shebang: bool) -> str:
+        """Cache key of a CodeHilite instance about to be highlighted."""
+        formatter = highlighter.pygments_formatter
+        if not isinstance(formatter, str):
+            formatter = f"{formatter.__module__}.{formatter.__qualname__}"
+        settings = [highlighter.lang, highlighter.guess_lang, highlighter.use_pygments, highlighter.lang_prefix,
+                    formatter, highlighter.options, shebang]
+        return _digest(json.dumps([self._versions, settings, _digest(highlighter.src)],
+                                  sort_keys=True, default=repr))
+
+    def highlight(self, highlighter, shebang: bool, hilite) -> str:
+        """HTML of a CodeHilite instance, from the cache or from hilite(shebang)."""
+        if not isinstance(highlighter.src, str):
+            return hilite(shebang)
+        key = self.key_for(highlighter, shebang)
+        html = self._get(key)
+        if html is not None:
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = hilite(shebang)
+        self._put(key, html)
+        return html
+
+    def install(self, md):
+        """Serve the highlighting done by converter md from the cache."""
+        from markdown.extensions.codehilite import CodeHilite
+        cache = self
+
+        class CachedCodeHilite(CodeHilite):
+            def hilite(self, shebang=True):
+                return cache.highlight(self, shebang, super().hilite)
+
+        for registry_name, name in self.PROCESSORS:
+            registry = getattr(md, registry_name)
+            if name not in registry:
+                continue
+            processor = registry[name]
+            run = type(processor).run
+            if 'CodeHilite' in run.__code__.co_names:
+                processor.run = types.MethodType(_with_globals(run, CodeHilite=CachedCodeHilite), processor)
+        return md
+
+
+class IncludeCache(_DiskCache):
+    """
+    On-disk cache of markdown_include fragments.
+
+    markdown_include reads every {!file!} and, recursively, the files it
+    includes, for each document that includes it. Once install()ed on a
+    converter, the expanded lines of an included file are looked up by a
+    hash of its content (and the extension settings). An entry records
+    every file it was expanded from, with their hashes, and is only used
+    while they all still match; file hashes are computed once per file
+    change. markdown_include still reads each directly included file to
+    pass its lines on; a hit saves expanding it, including reading the
+    files it includes in turn.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir: str, max_size_mb: Optional[float] = 64):
+        super().__init__(cache_dir, ".json", max_size_mb)
+        # path -> ((mtime_ns, size), digest or None)
+        self._file_digests: Dict[str, Tuple[Optional[Tuple[int, int]], Optional[str]]] = {}
+
+    def file_digest(self, path: str, encoding: str) -> Optional[str]:
+        """Hash of a file's text, or None if it cannot be read; recomputed only when the file changed."""
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        cached = self._file_digests.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                digest = _digest(f.read())
+        except (OSError, ValueError):
+            digest = None
+        self._file_digests[path] = (signature, digest)
+        return digest
+
+    def _settings(self, preprocessor) -> str:
+        return json.dumps([self.CACHE_VERSION, os.path.abspath(preprocessor.base_path), preprocessor.encoding,
+                           preprocessor.inheritHeadingDepth, preprocessor.headingOffset,
+                           preprocessor.throwException], default=repr)
+
+    def _included_paths(self, preprocessor, lines: List[str]) -> List[str]:
+        """Files the lines include directly, resolved like markdown_include does."""
+        from markdown_include.include import INC_SYNTAX
+        paths = []
+        for line in lines:
+            for match in INC_SYNTAX.finditer(line):
+                filename = os.path.expanduser(match.group(1))
+                if not os.path.isabs(filename):
+                    filename = os.path.normpath(os.path.join(preprocessor.base_path, filename))
+                paths.append(filename)
+        return paths
+
+    def _load(self, key: str) -> Optional[Dict]:
+        value = self._get(key)
+        return None if value is None else json.loads(value)
+
+    def _valid(self, entry: Dict, encoding: str) -> bool:
+        return all(self.file_digest(path, encoding) == digest for path, digest in entry['files'])
+
+    def expand(self, preprocessor, lines: List[str], run) -> List[str]:
+        """Expanded lines of an included file (what run(preprocessor, lines) returns for it)."""
+        settings = self._settings(preprocessor)
+        key = _digest(settings + _digest("".join(lines)))
+        entry = self._load(key)
+        if entry is not None and self._valid(entry, preprocessor.encoding):
+            self.hits += 1
+            return list(entry['lines'])
+
+        self.misses += 1
+        expanded = run(preprocessor, list(lines))
+        files = []
+        for path in self._included_paths(preprocessor, lines):
+            digest = self.file_digest(path, preprocessor.encoding)
+            files.append([path, digest])
+            nested = self._load(_digest(settings + digest)) if digest is not None else None
+            if nested is not None:
+                files.extend(nested['files'])
+        self._put(key, json.dumps({'lines': expanded, 'files': files}))
+        return list(expanded)
+
+    def install(self, md):
+        """Serve the included files expanded by converter md from the cache."""
+        if 'include' not in md.preprocessors:
+            return md
+        preprocessor = md.preprocessors['include']
+        run = type(preprocessor).run
+        cache = self
+        nested = False
+
+        def cached_run(lines):
+            # The outermost call gets the whole document; the recursive calls
+            # it makes (through preprocessor.run) get each included file's lines
+            nonlocal nested
+            if nested:
+                return cache.expand(preprocessor, lines, run)
+            nested = True
+            try:
+                return run(preprocessor, lines)
+            finally:
+                nested = False
+
+        preprocessor.run = cached_run
+        return md
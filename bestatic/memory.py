@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+import tracemalloc
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+# Attributes shared between documents rather than owned by one
+SHARED_ATTRIBUTES = {'shortcode_processor'}
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def deep_size(value, seen: Optional[set] = None) -> int:
+    """Bytes held by value and the containers, strings and objects it references."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        size += deep_size(vars(value), seen)
+    return size
+
+
+def document_bytes(document) -> int:
+    """Bytes retained by one parsed post or page (its HTML, text, metadata, ...)."""
+    seen = set()
+    return sum(deep_size(value, seen) for name, value in vars(document).items() if name not in SHARED_ATTRIBUTES)
+
+
+class MemoryReport:
+    """
+    Peak and retained memory per build phase.
+
+    Python allocations are traced with tracemalloc (which roughly doubles
+    build time, so this is opt-in) and the process RSS is sampled on a
+    background thread. Register on_phase() with the build's PhaseTracer;
+    after stop(), add the parsed documents with add_documents().
+    """
+
+    def __init__(self, top: int = 10, rss_interval: float = 0.05):
+        """
+        Initialize the report.
+
+        Args:
+            top: Number of allocation sites and documents to list
+            rss_interval: Seconds between RSS samples
+        """
+        self.top = top
+        self.rss_interval = rss_interval
+        # phase -> {'peak', 'retained', 'rss_peak'} in bytes, in build order
+        self.phases: Dict[str, Dict[str, Optional[int]]] = {}
+        self.sites: List[Tuple[str, int, int]] = []
+        self.documents: List[Tuple[str, int]] = []
+        # Why documents were not measured, if they could not be
+        self.documents_unavailable: Optional[str] = None
+        self._phase = None
+        self._rss_peak = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+
+    def _sample_rss(self):
+        while not self._stopped.wait(self.rss_interval):
+            self._note_rss()
+
+    def _note_rss(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            self._rss_peak = rss if self._rss_peak is None else max(self._rss_peak, rss)
+
+    def on_phase(self, name: Optional[str]):
+        """PhaseTracer callback: close the running phase's numbers and start the next."""
+        self._note_rss()
+        if self._phase is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                rss_peak, self._rss_peak = self._rss_peak, None
+            entry = self.phases.setdefault(self._phase, {'peak': 0, 'retained': 0, 'rss_peak': None})
+            entry['peak'] = max(entry['peak'], peak)
+            entry['retained'] = current
+            if rss_peak is not None:
+                entry['rss_peak'] = max(entry['rss_peak'] or 0, rss_peak)
+        self._phase = name
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        """Stop sampling and record the allocation sites still holding memory."""
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._phase is not None:
+            self.on_phase(None)
+        # Grouping first and skipping import machinery afterwards is much
+        # faster than Snapshot.filter_traces() on every trace
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        self.sites = [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size, stat.count)
+                      for stat in statistics
+                      if not stat.traceback[0].filename.startswith(("<frozen importlib", tracemalloc.__file__))
+                      ][:self.top]
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def add_documents(self, documents: Iterable[Tuple[str, object]]):
+        """Measure the parsed documents, as (source path, document) pairs."""
+        self.documents = sorted(((path, document_bytes(document)) for path, document in documents),
+                                key=lambda entry: entry[1], reverse=True)
+
+    def format(self) -> str:
+        """Console report."""
+        lines = ["Memory by phase (MB; traced Python allocations, RSS sampled):",
+                 f"  {'phase':<14} {'peak':>8} {'retained':>9} {'RSS peak':>9}"]
+        for name, entry in self.phases.items():
+            rss = "n/a" if entry['rss_peak'] is None else f"{entry['rss_peak'] / MB:.1f}"
+            lines.append(f"  {name:<14} {entry['peak'] / MB:>8.1f} {entry['retained'] / MB:>9.1f} {rss:>9}")
+        if self.sites:
+            lines.append(f"Top {len(self.sites)} allocation sites still held after the build:")
+            for site, size, count in self.sites:
+                lines.append(f"  {size / MB:8.2f} MB  {site} ({count} blocks)")
+        if self.documents:
+            total = sum(size for _, size in self.documents)
+            lines.append(f"Documents: {len(self.documents)} holding {total / MB:.1f} MB, "
+                         f"{total / len(self.documents) / 1024:.1f} KB each on average; largest:")
+            for path, size in self.documents[:self.top]:
+                lines.append(f"  {size / 1024:8.1f} KB  {path}")
+        elif self.documents_unavailable:
+            lines.append(f"Documents: not measured ({self.documents_unavailable})")
+        return "\n".join(lines)
@@ -3,7 +3,7 @@ import datetime
 import frontmatter
 
 
-def newpost(filepath, time_format):
+def newpost(filepath, time_format, metadata=None, content=None):
 
 
     # Split the pathname to get filename and directory path
@@ -17,9 +17,11 @@ def newpost(filepath, time_format):
                  'description': "This is sample description or summary of a post",
                  'slug': f"{filename}"
                  }
+    # Frontmatter and body overrides, e.g. for generated benchmark sites
+    post_dict.update(metadata or {})
 
-    markdown_content_post = ("This is an example post content in simple markdown. Please replace this with content of "
-                             "your choice. ")
+    markdown_content_post = content if content is not None else (
+        "This is an example post content in simple markdown. Please replace this with content of your choice. ")
 
     post = frontmatter.Post(markdown_content_post, **post_dict)
     os.makedirs("posts", exist_ok=True)
@@ -30,7 +32,7 @@ def newpost(filepath, time_format):
         f.write(frontmatter.dumps(post))
 
 
-def newpage(filepath):
+def newpage(filepath, metadata=None, content=None):
 
 
     # Split the pathname to get filename and directory path
@@ -42,9 +44,10 @@ def newpage(filepath):
                  'description': "This is sample description or summary of a page",
                  'slug': f"{filename}"
                  }
+    page_dict.update(metadata or {})
 
-    markdown_content_post = ("This is an example page content in simple markdown. Please replace this with content of "
-                             "your choice. ")
+    markdown_content_post = content if content is not None else (
+        "This is an example page content in simple markdown. Please replace this with content of your choice. ")
 
     page = frontmatter.Post(markdown_content_post, **page_dict)
     os.makedirs("pages", exist_ok=True)
@@ -0,0 +1,136 @@
+import sys
+import time
+import signal
+import socket
+import threading
+import multiprocessing
+from collections import deque
+
+from bestatic.httpserver import bestatic_serv
+
+
+def reuse_port_supported():
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+def _worker_main(directory, port, options):
+    # Ctrl+C is handled by the supervisor, which stops workers with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bestatic_serv(directory, port=port, reuse_port=True, announce=False, **options)
+
+
+def _fan_out(source, targets):
+    """Copy every message from the watcher's queue to each worker's queue."""
+    while True:
+        message = source.get()
+        for target in targets:
+            target.put(message)
+
+
+class WorkerSupervisor:
+    """
+    Keep N server processes running on one port.
+
+    Each worker binds the port itself with SO_REUSEPORT, so the kernel
+    spreads incoming connections across them. Workers that die are
+    restarted, unless they keep dying, which usually means the port is
+    taken or the configuration is broken.
+    """
+
+    def __init__(self, directory, port, workers, invalidations=None, max_restarts=10, restart_window=30, **options):
+        """
+        Initialize the supervisor.
+
+        Args:
+            directory: Directory to serve
+            port: Port all workers listen on
+            workers: Number of worker processes
+            invalidations: Memory cache invalidation queue from the watcher,
+                           broadcast to every worker
+            max_restarts: Restarts allowed within restart_window seconds
+            restart_window: Seconds over which restarts are counted
+            **options: Further bestatic_serv() options for the workers
+        """
+        self.directory = directory
+        self.port = port
+        self.workers = workers
+        self.options = options
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.processes = []
+        self._restarts = deque()
+        self._queues = [None] * workers
+        if invalidations is not None:
+            self._queues = [multiprocessing.Queue() for _ in range(workers)]
+            threading.Thread(target=_fan_out, args=(invalidations, self._queues), daemon=True).start()
+
+    def _spawn(self, slot):
+        options = dict(self.options)
+        if self._queues[slot] is not None:
+            options["invalidations"] = self._queues[slot]
+        process = multiprocessing.Process(target=_worker_main, args=(self.directory, self.port, options), daemon=True)
+        process.start()
+        return process
+
+    def start(self):
+        self.processes = [self._spawn(slot) for slot in range(self.workers)]
+
+    def check(self):
+        """
+        Restart workers that have exited.
+
+        Returns:
+            False if workers are crashing too often to keep going
+        """
+        for slot, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            now = time.monotonic()
+            self._restarts.append(now)
+            while self._restarts and now - self._restarts[0] > self.restart_window:
+                self._restarts.popleft()
+            if len(self._restarts) > self.max_restarts:
+                print("Server workers keep exiting; please check that the port is free. Stopping...")
+                return False
+            print(f"Server worker {process.pid} exited with code {process.exitcode}; restarting it")
+            self.processes[slot] = self._spawn(slot)
+        return True
+
+    def stop(self, timeout=5):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def serve_workers(directory, port=8080, workers=2, **options):
+    """
+    Serve directory from several pre-forked processes sharing one port.
+
+    Falls back to a single bestatic_serv() process where SO_REUSEPORT is
+    not available (e.g. Windows).
+    """
+    if not reuse_port_supported():
+        print("Multiple server workers need SO_REUSEPORT, which this platform does not support; "
+              "using a single server process")
+        return bestatic_serv(directory, port=port, **options)
+
+    # When the autoreload parent terminates this process, take the workers down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    supervisor = WorkerSupervisor(directory, port, workers, **options)
+    supervisor.start()
+    print(f"Serving at port {port} with {workers} worker processes")
+    print(f"Click http://localhost:{port} to visit the live website")
+    print("Click Ctrl+C to shut down the server")
+    try:
+        while supervisor.check():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nServer shutting down ...")
+    finally:
+        supervisor.stop()
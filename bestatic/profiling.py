@@ -0,0 +1,121 @@
+import os
+import sys
+import cProfile
+import threading
+from collections import Counter
+from typing import Optional, Tuple
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class BuildProfiler:
+    """
+    Profile a build with cProfile and a stack sampler at the same time.
+
+    cProfile gives exact call counts and per-function times (.pstats, for
+    snakeviz or pstats); the sampler records the whole Python stack of the
+    building thread every interval, which is what flame graphs need
+    (.collapsed, one 'outer;...;inner count' line per stack, for
+    flamegraph.pl, speedscope or inferno). With a phase, both only run
+    while generator() is in that phase; register on_phase() with the
+    PhaseTracer passed to generator().
+    """
+
+    def __init__(self, phase: Optional[str] = None, interval: float = 0.005):
+        """
+        Initialize the profiler.
+
+        Args:
+            phase: Only profile this build phase (a name prefix, so 'render'
+                   covers 'render posts', 'render lists' and 'render pages'),
+                   or None for the whole build
+            interval: Seconds between stack samples
+        """
+        self.phase = phase
+        self.interval = interval
+        self.profile = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._active = False
+        # Held while switching _active and while taking a sample, so no
+        # stack is recorded once the build thread has left the phase
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread_id = None
+        self._sampler = None
+
+    def start(self):
+        """Start profiling the calling thread (only its phase, if one was given)."""
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        if self.phase is None:
+            self._activate()
+
+    def stop(self):
+        self._deactivate()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def on_phase(self, name: Optional[str]):
+        """PhaseTracer callback: profile while the selected phase runs."""
+        if self.phase is None:
+            return
+        if name is not None and (name == self.phase or name.startswith(f"{self.phase} ")):
+            self._activate()
+        else:
+            self._deactivate()
+
+    def _activate(self):
+        with self._lock:
+            if not self._active:
+                self._active = True
+                self.profile.enable()
+
+    def _deactivate(self):
+        with self._lock:
+            if self._active:
+                self.profile.disable()
+                self._active = False
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                if not self._active:
+                    continue
+                frame = sys._current_frames().get(self._thread_id)
+                # Skip the build thread waiting in _deactivate() to leave the phase
+                if frame is None or frame.f_code.co_filename == __file__:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def write(self, prefix: str) -> Tuple[Optional[str], str]:
+        """
+        Write prefix.pstats and prefix.collapsed.
+
+        Returns:
+            The two paths; the first is None if nothing was profiled (e.g.
+            the chosen phase did not run)
+        """
+        pstats_path = f"{prefix}.pstats"
+        self.profile.create_stats()
+        if self.profile.stats:
+            self.profile.dump_stats(pstats_path)
+        else:
+            pstats_path = None
+        collapsed_path = f"{prefix}.collapsed"
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return pstats_path, collapsed_path
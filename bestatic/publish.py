@@ -0,0 +1,135 @@
+import os
+import time
+import shutil
+from typing import List, Optional
+
+
+class StagedOutput:
+    """
+    Build into a fresh directory and publish it in one step.
+
+    The published path (e.g. _output) is a symlink to the current
+    generation under builds_dir. Publishing a new generation replaces the
+    symlink with os.replace(), which is atomic, so a server reading from
+    the published path sees either the old site or the new one, never a
+    half-written one. Nothing tracks in-flight requests: a retired
+    generation is deleted once more than keep generations exist and it was
+    retired at least grace seconds ago, so a request that resolved a path
+    just before a swap finds its files as long as it finishes within that
+    time. Where symlinks are not available (e.g. Windows without developer
+    mode) the generation is renamed into place instead, which leaves a
+    short window without a site.
+    """
+
+    PREFIX = "gen-"
+
+    def __init__(self, output_path: str = "_output", builds_dir: Optional[str] = None, keep: int = 2,
+                 grace: float = 30.0):
+        """
+        Initialize the publisher.
+
+        Args:
+            output_path: Path the site is served from
+            builds_dir: Directory holding the generations; defaults to
+                        .<name>-builds next to output_path, so generations are
+                        on the same filesystem as the published path
+            keep: Generations kept on disk, including the published one
+            grace: Seconds a retired generation is kept even beyond keep
+        """
+        # No trailing separator: the published path is replaced by a symlink
+        self.output_path = os.path.normpath(output_path)
+        if builds_dir is None:
+            parent, name = os.path.split(self.output_path)
+            builds_dir = os.path.join(parent, f".{name}-builds")
+        self.builds_dir = builds_dir
+        self.keep = max(keep, 1)
+        self.grace = grace
+
+    def current(self) -> Optional[str]:
+        """Directory holding the published site, or None before the first build."""
+        if os.path.islink(self.output_path):
+            target = os.path.join(os.path.dirname(self.output_path), os.readlink(self.output_path))
+            return os.path.normpath(target) if os.path.isdir(target) else None
+        return self.output_path if os.path.isdir(self.output_path) else None
+
+    def begin(self) -> str:
+        """Create and return an empty staging directory for the next build."""
+        os.makedirs(self.builds_dir, exist_ok=True)
+        staging = os.path.join(self.builds_dir, f"{self.PREFIX}{time.time_ns()}")
+        os.mkdir(staging)
+        return staging
+
+    def publish(self, staging: str):
+        """Make a finished staging directory the published site."""
+        if os.path.isdir(self.output_path) and not os.path.islink(self.output_path):
+            # First publish over a plain output directory: move it aside as a generation
+            retired = os.path.join(self.builds_dir, f"{self.PREFIX}{time.time_ns()}")
+            os.rename(self.output_path, retired)
+            self._retire(retired)
+
+        previous = self.current()
+
+        link = os.path.join(self.builds_dir, ".publish-tmp")
+        if os.path.lexists(link):
+            os.remove(link)
+        target = os.path.relpath(staging, os.path.dirname(os.path.abspath(self.output_path)))
+        try:
+            os.symlink(target, link, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            self._publish_by_rename(staging)
+        else:
+            os.replace(link, self.output_path)
+            if previous is not None:
+                self._retire(previous)
+        self._cleanup()
+
+    def _publish_by_rename(self, staging: str):
+        if os.path.lexists(self.output_path):
+            retired = os.path.join(self.builds_dir, f"{self.PREFIX}{time.time_ns()}")
+            os.rename(self.output_path, retired)
+            self._retire(retired)
+        os.rename(staging, self.output_path)
+
+    def _retire(self, generation: str):
+        # The directory's mtime records when it stopped being published
+        os.utime(generation)
+
+    def discard(self, staging: str):
+        """Remove a staging directory whose build failed."""
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def unpublish(self):
+        """
+        Turn the published symlink back into a plain directory.
+
+        For one-off builds after watch mode: the current generation is moved
+        to output_path and the other generations are deleted.
+        """
+        if not os.path.islink(self.output_path):
+            return
+        current = self.current()
+        os.remove(self.output_path)
+        if current is not None:
+            os.rename(current, self.output_path)
+        shutil.rmtree(self.builds_dir, ignore_errors=True)
+
+    def generations(self) -> List[str]:
+        """Generation directories, oldest first."""
+        if not os.path.isdir(self.builds_dir):
+            return []
+        names = [name for name in os.listdir(self.builds_dir) if name.startswith(self.PREFIX)]
+        names.sort(key=lambda name: int(name[len(self.PREFIX):]))
+        return [os.path.join(self.builds_dir, name) for name in names]
+
+    def _cleanup(self):
+        current = self.current()
+        current = os.path.normpath(current) if current else None
+        old = [path for path in self.generations() if os.path.normpath(path) != current]
+        now = time.time()
+        for path in old[:max(len(old) - (self.keep - 1), 0)]:
+            try:
+                retired = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if now - retired >= self.grace:
+                shutil.rmtree(path, ignore_errors=True)
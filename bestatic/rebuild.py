@@ -0,0 +1,139 @@
+import os
+import time
+import hashlib
+import threading
+import traceback
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Files up to this size are content-hashed; larger ones are compared by size and mtime
+HASH_LIMIT = 1024 * 1024
+
+
+def file_signature(path: str) -> Optional[Tuple]:
+    """
+    Describe a file's content for change detection.
+
+    Returns:
+        ('hash', digest) for small files, ('stat', size, mtime_ns) for large
+        ones, or None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size > HASH_LIMIT:
+        return ('stat', stat.st_size, stat.st_mtime_ns)
+    try:
+        with open(path, 'rb') as f:
+            return ('hash', hashlib.sha1(f.read()).hexdigest())
+    except OSError:
+        return None
+
+
+class RebuildScheduler:
+    """
+    Turn a burst of file events into one rebuild on a worker thread.
+
+    Events are collected until none has arrived for the debounce window,
+    then the whole change set is handed to the rebuild callback. Events for
+    files whose content did not change (same hash as last seen) are dropped.
+    Events arriving during a build start the next batch, so there is never
+    more than one build queued.
+    """
+
+    def __init__(self, rebuild: Callable[[Set[str]], None], debounce: float = 0.3):
+        """
+        Initialize the scheduler.
+
+        Args:
+            rebuild: Called with the set of changed paths, on the worker thread
+            debounce: Seconds without new events before a rebuild starts
+        """
+        self.rebuild = rebuild
+        self.debounce = debounce
+        self.builds = 0
+        self._signatures: Dict[str, Optional[Tuple]] = {}
+        self._pending: Set[str] = set()
+        self._first_event = None
+        self._last_event = None
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def prime(self, directories: Iterable[str]):
+        """Record the current content of every file under directories, so no-op saves can be told apart."""
+        for directory in directories:
+            for root, dirs, files in os.walk(directory):
+                self.prime_files(os.path.join(root, filename) for filename in files)
+
+    def prime_files(self, paths: Iterable[str]):
+        """Record the current content of individual files."""
+        for path in paths:
+            self._signatures.setdefault(path, file_signature(path))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def notify(self, path: str) -> bool:
+        """
+        Report a file event.
+
+        Args:
+            path: File that was modified, created, moved or deleted
+
+        Returns:
+            False if the file's content is unchanged and the event was ignored
+        """
+        signature = file_signature(path)
+        with self._condition:
+            if path in self._signatures and self._signatures[path] == signature:
+                return False
+            self._signatures[path] = signature
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._pending.add(path)
+            self._last_event = now
+            self._condition.notify()
+        return True
+
+    def _next_batch(self):
+        """Wait for a quiet period after events; returns (paths, first event time) or None when stopped."""
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                remaining = self._last_event + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                batch, self._pending = self._pending, set()
+                return batch, self._first_event
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            paths, first_event = batch
+            started = time.monotonic()
+            try:
+                self.rebuild(paths)
+            except Exception:
+                print("Rebuild failed:")
+                traceback.print_exc()
+                print("Fix the error and save again; still watching for changes...")
+                continue
+            finished = time.monotonic()
+            self.builds += 1
+            print(f"Rebuilt {len(paths)} changed file(s) in {finished - started:.2f}s "
+                  f"({finished - first_event:.2f}s from first change to ready)")
@@ -0,0 +1,216 @@
+import os
+import json
+import logging
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Bumped whenever a field changes meaning, so dashboards can tell reports apart
+REPORT_VERSION = 1
+
+
+def _hit_rate(hits: int, misses: int) -> Optional[float]:
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def output_files_by_type(output_root: str) -> Dict[str, Dict[str, int]]:
+    """Number of files and bytes per extension ('' for none) under output_root."""
+    by_type: Dict[str, Dict[str, int]] = {}
+    for root, directories, files in os.walk(output_root):
+        for filename in files:
+            extension = os.path.splitext(filename)[1].lower()
+            entry = by_type.setdefault(extension, {'files': 0, 'bytes': 0})
+            entry['files'] += 1
+            entry['bytes'] += os.path.getsize(os.path.join(root, filename))
+    return dict(sorted(by_type.items(), key=lambda item: item[1]['bytes'], reverse=True))
+
+
+class FieldUsage:
+    """
+    Which fields of the parsed posts/pages were read, and by whom.
+
+    Reads inside a template (see template()) are counted per template
+    file, all others per build phase (register on_phase() with the
+    build's PhaseTracer). computed() counts how often an expensive lazy
+    field (content, text, summary, sections) was actually produced.
+    """
+
+    # Document fields that are tracked
+    FIELDS = frozenset(('title', 'slug', 'metadata', 'tags', 'katex', 'path_info', 'path_of_md',
+                        'content', 'text', 'summary', 'sections'))
+
+    def __init__(self):
+        self.templates: Dict[str, Dict[str, int]] = {}
+        self.phases: Dict[str, Dict[str, int]] = {}
+        self.computed_fields: Dict[str, int] = {}
+        self._phase = None
+        self._template = None
+
+    def on_phase(self, name: Optional[str]):
+        self._phase = name
+
+    @contextmanager
+    def template(self, name: str):
+        """Count the reads while the block runs against the template name."""
+        previous, self._template = self._template, name
+        try:
+            yield
+        finally:
+            self._template = previous
+
+    def record(self, field: str):
+        """Count one read of field."""
+        if self._template is not None:
+            fields = self.templates.setdefault(self._template, {})
+        else:
+            fields = self.phases.setdefault(self._phase or "build", {})
+        fields[field] = fields.get(field, 0) + 1
+
+    def computed(self, field: str):
+        """Count one computation of a lazy field."""
+        self.computed_fields[field] = self.computed_fields.get(field, 0) + 1
+
+    def to_dict(self) -> Dict:
+        def ordered(fields):
+            return dict(sorted(fields.items()))
+        return {'templates': {name: ordered(fields) for name, fields in sorted(self.templates.items())},
+                'phases': {name: ordered(fields) for name, fields in self.phases.items()},
+                'computed': ordered(self.computed_fields)}
+
+
+class _WarningHandler(logging.Handler):
+    def __init__(self, report):
+        super().__init__(logging.WARNING)
+        self.report = report
+
+    def emit(self, record):
+        self.report.warning(record.name, record.getMessage())
+
+
+class BuildReport:
+    """
+    Machine-readable summary of one build, for CI dashboards.
+
+    Pass it to generator(report=...), which fills in documents, output
+    files, cache counters, phase durations, image savings and the slowest
+    files at the end of the build, and fields records which document
+    fields each template read. Warnings are recorded while capture()
+    is active: warnings.warn() (shortcodes, data files), bestatic log
+    records of level WARNING and above (image processing in this process)
+    and the generator's own printed warnings.
+    """
+
+    def __init__(self, slowest: int = 10):
+        """
+        Args:
+            slowest: Number of slowest posts/pages to list
+        """
+        self.slowest = slowest
+        self.warnings: List[Dict[str, str]] = []
+        self.fields = FieldUsage()
+        self.data: Dict = {}
+
+    def warning(self, source: str, message: str):
+        """Record a warning raised by source (a module or subsystem name)."""
+        self.warnings.append({'source': source, 'message': str(message)})
+
+    @contextmanager
+    def capture(self):
+        """Record warnings raised while the block runs; they are still shown as usual."""
+        shown = set()
+        handler = _WarningHandler(self)
+        logger = logging.getLogger("bestatic")
+        with warnings.catch_warnings():
+            # Record repeats too (e.g. the same unknown shortcode in two posts),
+            # but only print each one once, like the default filter does
+            warnings.simplefilter("always")
+            show = warnings.showwarning
+
+            def record(message, category, filename, lineno, file=None, line=None):
+                self.warning(category.__name__, message)
+                key = (category, str(message), filename, lineno)
+                if key not in shown:
+                    shown.add(key)
+                    show(message, category, filename, lineno, file, line)
+
+            warnings.showwarning = record
+            logger.addHandler(handler)
+            try:
+                yield self
+            finally:
+                logger.removeHandler(handler)
+
+    def collect(self, output_root: str, posts: int, pages: int, tracer, session=None, asset_sync=None,
+                image_processor=None, feeds: Optional[Dict[str, int]] = None,
+                markdown_caches: Optional[Dict[str, Dict[str, int]]] = None):
+        """
+        Fill in the report once a build has finished (called by generator()).
+
+        Args:
+            output_root: Directory the site was built into
+            posts: Number of posts built
+            pages: Number of pages built
+            tracer: The build's PhaseTracer
+            session: The build's BuildSession (parsed/reused documents)
+            asset_sync: The AssetSync that placed the static files
+            image_processor: The ImageProcessor, if images were converted
+            feeds: Feed counters, {'written': n, 'unchanged': n}
+            markdown_caches: Markdown render cache counters by cache name
+                             ('highlight', 'includes'), {'hits': n, 'misses': n}
+        """
+        by_type = output_files_by_type(output_root)
+        starts = [start for _, start, _ in tracer.spans]
+        ends = [end for _, _, end in tracer.spans]
+
+        caches = {}
+        if session is not None:
+            caches['documents'] = {'hits': session.stats['reused'], 'misses': session.stats['parsed'],
+                                   'hit_rate': _hit_rate(session.stats['reused'], session.stats['parsed'])}
+        if asset_sync is not None:
+            stats = asset_sync.stats
+            placed = stats['copied'] + stats['linked']
+            caches['assets'] = {**stats, 'hit_rate': _hit_rate(stats['skipped'], placed)}
+        if feeds:
+            caches['feeds'] = {**feeds, 'hit_rate': _hit_rate(feeds['unchanged'], feeds['written'])}
+        for name, stats in (markdown_caches or {}).items():
+            caches[name] = {**stats, 'hit_rate': _hit_rate(stats['hits'], stats['misses'])}
+
+        images = None
+        if image_processor is not None:
+            images = {'converted': image_processor.converted,
+                      'reused': image_processor.cache_hits,
+                      'bytes_in': image_processor.bytes_in,
+                      'bytes_out': image_processor.bytes_out,
+                      'bytes_saved': image_processor.bytes_in - image_processor.bytes_out}
+            if image_processor.cache:
+                caches['images'] = {'hits': image_processor.cache_hits, 'misses': image_processor.cache_misses,
+                                    'hit_rate': _hit_rate(image_processor.cache_hits, image_processor.cache_misses)}
+
+        self.data = {
+            'version': REPORT_VERSION,
+            'finished': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'duration': round(max(ends) - min(starts), 6) if starts else 0.0,
+            'documents': {'posts': posts, 'pages': pages},
+            'output': {'files': sum(entry['files'] for entry in by_type.values()),
+                       'bytes': sum(entry['bytes'] for entry in by_type.values()),
+                       'by_type': by_type},
+            'caches': caches,
+            'phases': {name: round(seconds, 6) for name, seconds in tracer.totals().items()},
+            'images': images,
+            'slowest': [{'path': path, 'seconds': round(total, 6),
+                         'phases': {kind: round(seconds, 6) for kind, seconds in kinds.items()}}
+                        for path, total, kinds in tracer.slowest(self.slowest)],
+        }
+
+    def to_dict(self) -> Dict:
+        return {**self.data, 'fields': self.fields.to_dict(), 'warnings': self.warnings}
+
+    def write(self, path: str):
+        """Write the report to path as JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+
+def lookup_variants(manifest: Dict[str, List[Dict]], src: str, site_url: Optional[str] = None) -> Optional[List[Dict]]:
+    """
+    Find the responsive variants for an image reference.
+
+    Args:
+        manifest: Variant manifest built by ImageProcessor
+        src: Image URL as written in Markdown or a template
+        site_url: Site base URL; absolute URLs under it are treated as local
+
+    Returns:
+        List of {'url', 'width', 'height'} dicts, or None if src has no variants
+    """
+    if not src or not manifest:
+        return None
+    if site_url and src.startswith(site_url.rstrip('/') + '/'):
+        src = src[len(site_url.rstrip('/')):]
+    elif urlsplit(src).scheme or src.startswith('//'):
+        return None
+    path = urlsplit(src).path
+    while path.startswith(('./', '../')):
+        path = path.split('/', 1)[1]
+    return manifest.get(path.lstrip('/'))
+
+
+def srcset_value(variants: List[Dict]) -> str:
+    """Format variants as the value of a srcset attribute."""
+    return ", ".join(f"{variant['url']} {variant['width']}w" for variant in variants)
+
+
+def make_srcset_helper(manifest: Dict[str, List[Dict]], site_url: Optional[str] = None):
+    """
+    Build the 'srcset' Jinja global.
+
+    Usage in a template: <img src="{{ src }}" srcset="{{ srcset(src) }}" sizes="{{ image_sizes }}">
+    Returns an empty string for images without variants.
+    """
+    def srcset(src):
+        variants = lookup_variants(manifest, src, site_url)
+        return srcset_value(variants) if variants else ""
+    return srcset
+
+
+class ResponsiveImagesTreeprocessor(Treeprocessor):
+    """Add srcset/sizes attributes to <img> elements that have variants."""
+
+    def __init__(self, md, manifest, sizes, site_url):
+        super().__init__(md)
+        self.manifest = manifest
+        self.sizes = sizes
+        self.site_url = site_url
+
+    def run(self, root):
+        for img in root.iter('img'):
+            if img.get('srcset'):
+                continue
+            variants = lookup_variants(self.manifest, img.get('src'), self.site_url)
+            if variants:
+                img.set('srcset', srcset_value(variants))
+                if not img.get('sizes'):
+                    img.set('sizes', self.sizes)
+        return None
+
+
+class ResponsiveImagesExtension(Extension):
+    """Markdown extension emitting srcset/sizes from the image variant manifest."""
+
+    def __init__(self, **kwargs):
+        self.config = {
+            'manifest': [{}, 'Variant manifest from ImageProcessor'],
+            'sizes': ['100vw', 'Default value of the sizes attribute'],
+            'site_url': ['', 'Site base URL for absolute image references'],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        processor = ResponsiveImagesTreeprocessor(
+            md, self.getConfig('manifest'), self.getConfig('sizes'), self.getConfig('site_url'))
+        # Run after inline patterns have produced the <img> elements
+        md.treeprocessors.register(processor, 'bestatic_responsive_images', 5)
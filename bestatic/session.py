@@ -0,0 +1,124 @@
+import os
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class BuildSession:
+    """
+    State kept warm across the builds of one watch session.
+
+    A cold generator() call sets up Markdown converters, the shortcode
+    registry and the Jinja environment and parses every post and page.
+    Passing the same session to each rebuild reuses all of that: parsed
+    documents and data files are only re-read when their file changed
+    (size/mtime) or the settings they were produced with (key) differ,
+    converters and the environment are reused as long as their settings
+    match, and Jinja reloads individual templates whose files changed.
+    """
+
+    # Directories whose changes invalidate everything parsed from Markdown
+    SHORTCODE_DIRS = ('_shortcodes',)
+    # Fragments pulled into documents while they are rendered (markdown_include
+    # files and Markdown data): a change may affect any document
+    INCLUDE_DIRS = ('_includes', '_mddata')
+
+    def __init__(self):
+        self.builds = 0
+        self.stats = {'parsed': 0, 'reused': 0}
+        self._documents: Dict[str, Tuple[Optional[Tuple[int, int]], Hashable, Any]] = {}
+        self._files: Dict[str, Tuple[Optional[Tuple[int, int]], Any]] = {}
+        self._converters: Dict[Hashable, Any] = {}
+        self._render_caches: Dict[Hashable, Any] = {}
+        self._environment = None
+        self._environment_key = None
+        self._shortcodes = None
+
+    def begin_build(self):
+        """Reset the per-build counters."""
+        self.builds += 1
+        self.stats = {'parsed': 0, 'reused': 0}
+
+    def apply_changes(self, paths: Iterable[str]):
+        """
+        Forget what a batch of changed files invalidates.
+
+        Args:
+            paths: Changed, created or deleted files (as reported by the watcher)
+        """
+        for path in paths:
+            path = os.path.abspath(path)
+            parts = os.path.relpath(path).split(os.sep)
+            if parts[0] in self.SHORTCODE_DIRS:
+                self._shortcodes = None
+                self._documents.clear()
+            elif parts[0] in self.INCLUDE_DIRS:
+                self._documents.clear()
+            self._documents.pop(path, None)
+            self._files.pop(path, None)
+
+    def document(self, path: str, key: Hashable, parse: Callable[[str], Any]):
+        """
+        Parsed post or page at path, parsed again only if it changed.
+
+        Args:
+            path: Source file
+            key: Settings the parse depends on (e.g. Markdown configuration)
+            parse: Called with path to produce the document
+        """
+        abs_path = os.path.abspath(path)
+        signature = _signature(abs_path)
+        cached = self._documents.get(abs_path)
+        if cached is not None and cached[0] == signature and cached[1] == key:
+            self.stats['reused'] += 1
+            return cached[2]
+        document = parse(path)
+        self._documents[abs_path] = (signature, key, document)
+        self.stats['parsed'] += 1
+        return document
+
+    def documents(self) -> List[Tuple[str, Any]]:
+        """(absolute source path, parsed document) for every document held."""
+        return [(path, entry[2]) for path, entry in self._documents.items()]
+
+    def load_file(self, path: str, loader: Callable[[str], Any]):
+        """Result of loader(path) (e.g. a YAML data file), loaded again only if the file changed."""
+        abs_path = os.path.abspath(path)
+        signature = _signature(abs_path)
+        cached = self._files.get(abs_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = loader(path)
+        self._files[abs_path] = (signature, value)
+        return value
+
+    def converter(self, key: Hashable, factory: Callable[[], Any]):
+        """Markdown converter for a configuration, created on first use."""
+        if key not in self._converters:
+            self._converters[key] = factory()
+        return self._converters[key]
+
+    def render_cache(self, key: Hashable, factory: Callable[[], Any]):
+        """Markdown render cache (e.g. highlighted code) for a cache directory, created on first use."""
+        if key not in self._render_caches:
+            self._render_caches[key] = factory()
+        return self._render_caches[key]
+
+    def environment(self, key: Hashable, factory: Callable[[], Any]):
+        """Jinja environment for a template directory; replaced when key changes."""
+        if self._environment is None or self._environment_key != key:
+            self._environment = factory()
+            self._environment_key = key
+        return self._environment
+
+    def shortcodes(self, factory: Callable[[], Any]):
+        """Shortcode registry, loaded once until _shortcodes changes."""
+        if self._shortcodes is None:
+            self._shortcodes = factory()
+        return self._shortcodes
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Phases generator() marks, in build order ('render' also prefixes
+# 'render posts', 'render lists' and 'render pages')
+PHASES = ("setup", "assets", "images", "markdown", "parse", "render", "taxonomies",
+          "search", "sitemap", "feeds", "postprocess")
+
+
+class PhaseTracer:
+    """
+    Record how long each phase of a build takes.
+
+    generator() calls mark() where a new phase begins, which also ends the
+    previous one; phase() times a nested span. A phase name may occur more
+    than once (e.g. rendering resumes after taxonomies), totals() adds
+    those up. Work on individual source files (parse, render) is recorded
+    with item(), and everything can be written as a Chrome trace.
+    """
+
+    def __init__(self, on_phase: Optional[Callable[[Optional[str]], None]] = None):
+        """
+        Args:
+            on_phase: Called with each new phase name, and None when the
+                      build finishes (e.g. to profile a single phase);
+                      more callbacks can be added with add_listener()
+        """
+        self.listeners: List[Callable[[Optional[str]], None]] = [on_phase] if on_phase else []
+        # (name, start, end) in time.perf_counter() seconds, in start order
+        self.spans: List[Tuple[str, float, float]] = []
+        # (kind, source file, start, end) for per-file work
+        self.items: List[Tuple[str, str, float, float]] = []
+        self._current: Optional[Tuple[str, float]] = None
+
+    def add_listener(self, on_phase: Callable[[Optional[str]], None]):
+        """Also call on_phase at every phase change (see __init__)."""
+        self.listeners.append(on_phase)
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def mark(self, name: str):
+        """End the running phase (if any) and start the phase name."""
+        now = time.perf_counter()
+        self._close(now)
+        self._current = (name, now)
+        for listener in self.listeners:
+            listener(name)
+
+    def finish(self):
+        """End the running phase."""
+        self._close(time.perf_counter())
+        self._current = None
+        for listener in self.listeners:
+            listener(None)
+
+    def _close(self, now: float):
+        if self._current is not None:
+            name, start = self._current
+            self.spans.append((name, start, now))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a span inside the running phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.perf_counter()))
+
+    def item(self, kind: str, path: str, start: float):
+        """Record work of kind (e.g. 'parse') on the source file path, started at now()."""
+        self.items.append((kind, path, start, time.perf_counter()))
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per phase name, in order of first occurrence."""
+        totals: Dict[str, float] = {}
+        for name, start, end in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - start)
+        return totals
+
+    def slowest(self, count: int = 10) -> List[Tuple[str, float, Dict[str, float]]]:
+        """
+        Source files that took longest.
+
+        Returns:
+            (path, total seconds, {kind: seconds}) for the count slowest files
+        """
+        per_file: Dict[str, Dict[str, float]] = {}
+        for kind, path, start, end in self.items:
+            kinds = per_file.setdefault(path, {})
+            kinds[kind] = kinds.get(kind, 0.0) + (end - start)
+        ranked = sorted(per_file.items(), key=lambda entry: sum(entry[1].values()), reverse=True)
+        return [(path, sum(kinds.values()), kinds) for path, kinds in ranked[:count]]
+
+    def format_slowest(self, count: int = 10) -> str:
+        """Console report of the slowest source files."""
+        lines = [f"Slowest {count} files:"]
+        for path, total, kinds in self.slowest(count):
+            breakdown = ", ".join(f"{kind} {seconds * 1000:.1f} ms" for kind, seconds in kinds.items())
+            lines.append(f"  {total * 1000:8.1f} ms  {path}  ({breakdown})")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict:
+        """
+        The recorded spans in the Chrome trace-event format.
+
+        Phases and per-file items become complete ('X') events on one
+        thread, so Perfetto or chrome://tracing nests files inside phases.
+        """
+        origin = min([start for _, start, _ in self.spans] + [start for _, _, start, _ in self.items], default=0.0)
+        pid = os.getpid()
+        tid = 1
+
+        def event(name, category, start, end, args=None):
+            entry = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": round((start - origin) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+            if args:
+                entry["args"] = args
+            return entry
+
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": "bestatic build"}}]
+        events += [event(name, "phase", start, end) for name, start, end in self.spans]
+        events += [event(f"{kind} {os.path.basename(path)}", kind, start, end, {"file": path})
+                   for kind, path, start, end in self.items]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        """Write chrome_trace() to path (open it in https://ui.perfetto.dev)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
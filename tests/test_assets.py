@@ -0,0 +1,275 @@
+"""
+Tests for assets module (static asset planning and copying).
+"""
+
+import os
+import pytest
+from pathlib import Path
+from PIL import Image
+
+from bestatic.assets import build_asset_plan, AssetSync
+from bestatic.imageprocessor import ImageProcessor
+
+
+@pytest.fixture
+def static_trees(tmp_path):
+    """Create theme static, static-content and root-import trees"""
+    theme_static = tmp_path / "theme-static"
+    (theme_static / "css").mkdir(parents=True)
+    (theme_static / "css" / "style.css").write_text("body {}")
+    Image.new('RGB', (40, 40), color='red').save(str(theme_static / "logo.png"), 'PNG')
+    
+    content = tmp_path / "static-content"
+    (content / "images").mkdir(parents=True)
+    Image.new('RGB', (40, 40), color='blue').save(str(content / "images" / "photo.jpg"), 'JPEG')
+    (content / "doc.pdf").write_bytes(b"%PDF")
+    
+    root_import = tmp_path / "root-import"
+    root_import.mkdir()
+    (root_import / "CNAME").write_text("example.org")
+    Image.new('RGB', (40, 40), color='green').save(str(root_import / "favicon.png"), 'PNG')
+    
+    out = tmp_path / "_output"
+    return [
+        (str(theme_static), str(out / "static"), True),
+        (str(content), str(out / "static-content"), True),
+        (str(root_import), str(out), False),
+    ]
+
+
+class TestBuildAssetPlan:
+    """Test asset planning decisions."""
+    
+    def test_plan_without_image_processing(self, static_trees, tmp_path):
+        """Test that every file is copied when no processor is given"""
+        plan = build_asset_plan(static_trees)
+        
+        assert len(plan.copies) == 6
+        assert plan.conversions == []
+    
+    def test_convertible_images_are_not_copied(self, static_trees, tmp_path):
+        """Test that images scheduled for conversion are left out of the copies"""
+        processor = ImageProcessor({'enabled': True, 'cache': False})
+        plan = build_asset_plan(static_trees, processor)
+        
+        copied = {Path(dest).name for dest in plan.copies}
+        assert 'photo.jpg' not in copied
+        assert 'logo.png' not in copied
+        assert plan.conversion_count() == 2
+    
+    def test_root_import_never_converted(self, static_trees, tmp_path):
+        """Test that trees without conversion keep their images"""
+        processor = ImageProcessor({'enabled': True, 'cache': False})
+        plan = build_asset_plan(static_trees, processor)
+        
+        assert str(tmp_path / "_output" / "favicon.png") in plan.copies
+    
+    def test_excluded_formats_are_copied(self, static_trees, tmp_path):
+        """Test that formats outside include_formats are copied, not dropped"""
+        processor = ImageProcessor({'enabled': True, 'cache': False, 'include_formats': ['.jpg']})
+        plan = build_asset_plan(static_trees, processor)
+        
+        assert str(tmp_path / "_output" / "static" / "logo.png") in plan.copies
+        assert plan.conversion_count() == 1
+    
+    def test_later_tree_overrides_earlier(self, tmp_path):
+        """Test that a later source wins for the same destination"""
+        first = tmp_path / "first"
+        second = tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        (first / "a.txt").write_text("first")
+        (second / "a.txt").write_text("second")
+        
+        plan = build_asset_plan([(str(first), str(tmp_path / "out"), False),
+                                 (str(second), str(tmp_path / "out"), False)])
+        
+        assert plan.copies == {str(tmp_path / "out" / "a.txt"): str(second / "a.txt")}
+    
+    def test_missing_source_is_skipped(self, tmp_path):
+        """Test that nonexistent trees are ignored"""
+        plan = build_asset_plan([(str(tmp_path / "missing"), str(tmp_path / "out"), True)])
+        
+        assert plan.copies == {}
+
+
+class TestAssetSync:
+    """Test incremental syncing of planned copies."""
+    
+    def test_first_sync_copies_everything(self, static_trees, tmp_path):
+        """Test that planned copies land in the output tree"""
+        plan = build_asset_plan(static_trees)
+        sync = AssetSync()
+        sync.prune_output(str(tmp_path / "_output"), plan)
+        stats = sync.sync(plan)
+        
+        assert stats['copied'] == 6
+        assert stats['bytes_copied'] > 0
+        assert (tmp_path / "_output" / "static" / "css" / "style.css").read_text() == "body {}"
+        assert (tmp_path / "_output" / "CNAME").exists()
+    
+    def test_second_sync_skips_unchanged(self, static_trees, tmp_path):
+        """Test that unchanged binary assets are not copied again"""
+        plan = build_asset_plan(static_trees)
+        first = AssetSync()
+        first.sync(plan)
+        
+        second = AssetSync()
+        second.prune_output(str(tmp_path / "_output"), plan)
+        stats = second.sync(plan)
+        
+        # style.css is always recopied because builds may rewrite it in place
+        assert stats['skipped'] == 5
+        assert stats['copied'] == 1
+        assert stats['bytes_skipped'] > 0
+    
+    def test_changed_file_is_copied(self, static_trees, tmp_path):
+        """Test that a modified source is synced again"""
+        plan = build_asset_plan(static_trees)
+        AssetSync().sync(plan)
+        (tmp_path / "root-import" / "CNAME").write_text("changed.example.org")
+        
+        sync = AssetSync()
+        sync.prune_output(str(tmp_path / "_output"), plan)
+        sync.sync(plan)
+        
+        assert (tmp_path / "_output" / "CNAME").read_text() == "changed.example.org"
+    
+    def test_prune_removes_stale_files(self, static_trees, tmp_path):
+        """Test that files not in the plan are removed from the output"""
+        plan = build_asset_plan(static_trees)
+        AssetSync().sync(plan)
+        stale_dir = tmp_path / "_output" / "old-post"
+        stale_dir.mkdir()
+        (stale_dir / "index.html").write_text("old")
+        
+        sync = AssetSync()
+        sync.prune_output(str(tmp_path / "_output"), plan)
+        
+        assert not stale_dir.exists()
+        assert sync.stats['removed'] == 2  # index.html and style.css
+    
+    def test_hash_mode_ignores_touched_files(self, static_trees, tmp_path):
+        """Test that hash comparison skips files whose mtime alone changed"""
+        plan = build_asset_plan(static_trees)
+        AssetSync().sync(plan)
+        os.utime(tmp_path / "root-import" / "CNAME", (1, 1))
+        
+        sync = AssetSync(use_hash=True)
+        sync.prune_output(str(tmp_path / "_output"), plan)
+        sync.sync(plan)
+        
+        assert sync.stats['skipped'] == 5
+    
+    def test_hardlink_mode(self, static_trees, tmp_path):
+        """Test that hardlink mode links binaries but copies rewritable text"""
+        plan = build_asset_plan(static_trees)
+        sync = AssetSync(mode='hardlink')
+        sync.sync(plan)
+        
+        assert os.path.samefile(tmp_path / "_output" / "CNAME", tmp_path / "root-import" / "CNAME")
+        assert not os.path.samefile(tmp_path / "_output" / "static" / "css" / "style.css",
+                                    tmp_path / "theme-static" / "css" / "style.css")
+        assert sync.stats['linked'] == 5
+    
+    def test_reflink_mode_falls_back_to_copy(self, static_trees, tmp_path):
+        """Test that reflink mode always produces the file contents"""
+        plan = build_asset_plan(static_trees)
+        sync = AssetSync(mode='reflink')
+        sync.sync(plan)
+        
+        assert (tmp_path / "_output" / "CNAME").read_text() == "example.org"
+        assert sync.stats['linked'] + sync.stats['copied'] == 6
+    
+    def test_invalid_mode(self):
+        """Test that unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            AssetSync(mode='symlink')
+    
+    def test_summary(self, static_trees, tmp_path):
+        """Test the one-line report"""
+        sync = AssetSync()
+        sync.sync(build_asset_plan(static_trees))
+        
+        assert sync.summary().startswith("Static assets: 6 copied")
+
+
+class TestGeneratorAssetPlan:
+    """Test the asset plan inside a full build."""
+    
+    def test_originals_not_written_when_converted(self, test_site, sample_config):
+        """Test that converted originals never appear in the output"""
+        from bestatic.generator import generator
+        
+        images = test_site / "static-content" / "images"
+        images.mkdir(parents=True)
+        Image.new('RGB', (60, 60), color='red').save(str(images / "a.jpg"), 'JPEG')
+        Image.new('RGB', (60, 60), color='red').save(str(images / "b.png"), 'PNG')
+        
+        config = {**sample_config, 'image_processing': {'enabled': True, 'workers': 1,
+                                                        'include_formats': ['.jpg']}}
+        generator(**config)
+        
+        out = test_site / "_output" / "static-content" / "images"
+        assert sorted(p.name for p in out.iterdir()) == ['a.webp', 'b.png']
+    
+    def test_failed_conversion_publishes_original(self, test_site, sample_config):
+        """Test that an image that cannot be converted is published unchanged"""
+        from bestatic.generator import generator
+        
+        images = test_site / "static-content"
+        images.mkdir()
+        Image.new('RGB', (60, 60), color='red').save(str(images / "a.jpg"), 'JPEG')
+        (images / "broken.jpg").write_bytes(b"not an image")
+        
+        config = {**sample_config, 'image_processing': {'enabled': True, 'workers': 1}}
+        generator(**config)
+        
+        out = test_site / "_output" / "static-content"
+        assert sorted(p.name for p in out.iterdir()) == ['a.webp', 'broken.jpg']
+        assert (out / "broken.jpg").read_bytes() == b"not an image"
+    
+    def test_keep_original_copies_bytes(self, test_site, sample_config):
+        """Test that keep_original publishes the original file unchanged"""
+        from bestatic.generator import generator
+        
+        images = test_site / "static-content"
+        images.mkdir()
+        Image.new('RGB', (60, 60), color='red').save(str(images / "a.jpg"), 'JPEG')
+        
+        config = {**sample_config, 'image_processing': {'enabled': True, 'workers': 1,
+                                                        'keep_original': True}}
+        generator(**config)
+        
+        out = test_site / "_output" / "static-content"
+        assert (out / "a.jpg").read_bytes() == (images / "a.jpg").read_bytes()
+        assert (out / "a.webp").exists()
+
+    def test_rebuild_keeps_unchanged_assets(self, test_site, sample_config):
+        """Test that a rebuild does not recopy unchanged static files"""
+        from bestatic.generator import generator
+        
+        (test_site / "static-content").mkdir()
+        (test_site / "static-content" / "video.mp4").write_bytes(b"0" * 4096)
+        generator(**sample_config)
+        inode = os.stat(test_site / "_output" / "static-content" / "video.mp4").st_ino
+        
+        generator(**sample_config)
+        
+        assert os.stat(test_site / "_output" / "static-content" / "video.mp4").st_ino == inode
+        assert (test_site / "_output" / "index.html").exists()
+
+    def test_staged_build_links_unchanged_assets(self, test_site, sample_config):
+        """Test that a build into a staging directory reuses unchanged assets of the previous build"""
+        from bestatic.generator import generator
+        
+        (test_site / "static-content").mkdir()
+        (test_site / "static-content" / "video.mp4").write_bytes(b"0" * 4096)
+        generator(**sample_config)
+        inode = os.stat(test_site / "_output" / "static-content" / "video.mp4").st_ino
+        
+        generator(output_dir="staging", previous_output="_output", **sample_config)
+        
+        assert os.stat(test_site / "staging" / "static-content" / "video.mp4").st_ino == inode
+        assert (test_site / "staging" / "index.html").exists()
+        assert (test_site / "_output" / "index.html").exists()
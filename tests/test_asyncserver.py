@@ -0,0 +1,170 @@
+"""Tests for asyncserver.py - asyncio static file server"""
+import asyncio
+import socket
+import threading
+import http.client
+import pytest
+
+from bestatic.asyncserver import AsyncStaticServer
+from bestatic.livereload import LiveReloadHub, EVENTS_PATH
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start an AsyncStaticServer on a free port in a background event loop; returns the port"""
+    (tmp_path / "index.html").write_text("<html><body>Home</body></html>")
+    (tmp_path / "style.css").write_text("body { margin: 0; }")
+    (tmp_path / "blog").mkdir()
+    (tmp_path / "blog" / "index.html").write_text("<p>Blog</p>")
+    (tmp_path / "video.mp4").write_bytes(bytes(range(256)) * 4)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    def start(**options):
+        app = AsyncStaticServer(str(tmp_path), **options)
+        server = asyncio.run_coroutine_threadsafe(app.start("127.0.0.1", 0), loop).result(5)
+        servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    yield start
+
+    async def shutdown():
+        for server in servers:
+            server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+class TestAsyncStaticServer:
+    """Test responses of the asyncio backend"""
+
+    def test_keep_alive_and_validators(self, serve):
+        """Test several requests on one connection, including a 304"""
+        conn = http.client.HTTPConnection("127.0.0.1", serve(), timeout=5)
+
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.read() == b"<html><body>Home</body></html>"
+        assert response.getheader("Content-Type") == "text/html"
+        etag = response.getheader("ETag")
+
+        conn.request("GET", "/style.css")
+        response = conn.getresponse()
+        assert response.getheader("Content-Type") == "text/css"
+        assert response.read() == b"body { margin: 0; }"
+
+        conn.request("GET", "/", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304
+        assert response.read() == b""
+        conn.close()
+
+    def test_range_and_head(self, serve):
+        """Test 206, 416 and HEAD responses"""
+        conn = http.client.HTTPConnection("127.0.0.1", serve(), timeout=5)
+
+        conn.request("GET", "/video.mp4", headers={"Range": "bytes=-4"})
+        response = conn.getresponse()
+        assert response.status == 206
+        assert response.getheader("Content-Range") == "bytes 1020-1023/1024"
+        assert response.read() == bytes([252, 253, 254, 255])
+
+        conn.request("GET", "/video.mp4", headers={"Range": "bytes=5000-"})
+        response = conn.getresponse()
+        assert response.status == 416
+        response.read()
+
+        conn.request("HEAD", "/video.mp4")
+        response = conn.getresponse()
+        assert response.getheader("Content-Length") == "1024"
+        assert response.read() == b""
+        conn.close()
+
+    def test_redirects_and_errors(self, serve):
+        """Test directory redirects, 404s, traversal and unsupported methods"""
+        conn = http.client.HTTPConnection("127.0.0.1", serve(), timeout=5)
+
+        conn.request("GET", "/blog?page=2")
+        response = conn.getresponse()
+        assert response.status == 301
+        assert response.getheader("Location") == "/blog/?page=2"
+        response.read()
+
+        conn.request("GET", "/blog/")
+        assert conn.getresponse().read() == b"<p>Blog</p>"
+
+        conn.request("GET", "/missing.html")
+        response = conn.getresponse()
+        assert response.status == 404
+        response.read()
+
+        conn.request("GET", "/../../etc/passwd")
+        response = conn.getresponse()
+        assert response.status == 404
+        response.read()
+
+        conn.request("POST", "/", body=b"x=1")
+        response = conn.getresponse()
+        assert response.status == 501
+        response.read()
+        conn.close()
+
+    def test_no_store(self, serve):
+        """Test that no_store sends the never-cache headers without validators"""
+        conn = http.client.HTTPConnection("127.0.0.1", serve(no_store=True), timeout=5)
+
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        assert "no-store" in response.getheader("Cache-Control")
+        assert response.getheader("ETag") is None
+        response.read()
+        conn.close()
+
+    def test_connection_cap(self, serve):
+        """Test that connections beyond max_connections wait for a free slot"""
+        port = serve(max_connections=1)
+        first = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        first.request("GET", "/")
+        first.getresponse().read()
+
+        second = socket.create_connection(("127.0.0.1", port), timeout=0.5)
+        second.sendall(b"GET / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        with pytest.raises(socket.timeout):
+            second.recv(1024)
+
+        first.close()
+        second.settimeout(5)
+        assert second.recv(1024).startswith(b"HTTP/1.1 200 OK")
+        second.close()
+
+    def test_live_reload(self, serve):
+        """Test script injection and rebuild events on the asyncio backend"""
+        hub = LiveReloadHub()
+        port = serve(live_reload=hub)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/blog/")
+        assert conn.getresponse().read() == b'<p>Blog</p><script src="/__bestatic/livereload.js"></script>'
+        conn.close()
+
+        events = socket.create_connection(("127.0.0.1", port), timeout=5)
+        events.sendall(f"GET {EVENTS_PATH} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        received = b""
+        while b"retry:" not in received:
+            received += events.recv(4096)
+
+        hub.publish(["blog/index.html"])
+        while not (b"event: rebuild" in received and received.endswith(b"\n\n")):
+            received += events.recv(4096)
+        assert b'"/blog/"' in received
+        events.close()
@@ -0,0 +1,57 @@
+"""Tests for benchmark.py - Synthetic site builds"""
+import os
+import frontmatter
+
+from bestatic.benchmark import scaffold_site, run_benchmark, format_report
+
+
+class TestScaffoldSite:
+    """Test synthetic site generation"""
+
+    def test_posts_and_taxonomies(self, tmp_path):
+        """Test that the requested posts, terms and taxonomies are written"""
+        config = scaffold_site(str(tmp_path), posts=12, tags_per_post=2, tag_pool=5,
+                               taxonomies=("tags", "categories"), pages=2)
+
+        posts = [os.path.join(root, name) for root, dirs, files in os.walk(tmp_path / "posts") for name in files]
+        assert len(posts) == 12
+        post = frontmatter.load(posts[0])
+        assert len(post.metadata["tags"].split(", ")) == 2
+        assert "categories" in post.metadata
+        assert len(os.listdir(tmp_path / "pages")) == 2
+        assert set(config["taxonomies"]) == {"tags", "categories"}
+
+    def test_same_seed_same_site(self, tmp_path):
+        """Test that scaffolding is deterministic"""
+        scaffold_site(str(tmp_path / "a"), posts=3, pages=0)
+        scaffold_site(str(tmp_path / "b"), posts=3, pages=0)
+
+        first = (tmp_path / "a" / "posts" / "000" / "post-2.md").read_text()
+        assert first == (tmp_path / "b" / "posts" / "000" / "post-2.md").read_text()
+
+    def test_shortcodes_and_code_blocks(self, tmp_path):
+        """Test that the densities control code blocks and shortcodes"""
+        config = scaffold_site(str(tmp_path), posts=4, code_density=1.0, shortcode_density=1.0, pages=0)
+
+        body = frontmatter.load(tmp_path / "posts" / "000" / "post-0.md").content
+        assert "```python" in body
+        assert "{!!{ note" in body
+        assert config["SHORTCODES"] is True
+        assert (tmp_path / "_shortcodes" / "note.py").exists()
+
+
+class TestRunBenchmark:
+    """Test measured builds"""
+
+    def test_report(self):
+        """Test that a build is measured and reported"""
+        results = run_benchmark([8], isolate=False, pages=1, shortcode_density=0.5)
+
+        result = results[0]
+        assert result["posts"] == 8
+        assert result["wall"] > 0
+        assert result["output_bytes"] > 0
+        assert "parse" in result["phases"]
+        report = format_report(results)
+        assert report.splitlines()[0].split()[:3] == ["posts", "wall", "s"]
+        assert report.splitlines()[1].split()[0] == "8"
@@ -0,0 +1,58 @@
+"""Tests for changeset.py - Output snapshots and diffs"""
+import os
+import pytest
+from bestatic.changeset import snapshot, changed_paths
+
+
+class TestChangeset:
+    """Test snapshotting an output tree and diffing two snapshots"""
+
+    def test_changed_paths(self, tmp_path):
+        """Test that added, removed and modified files are reported"""
+        (tmp_path / "blog").mkdir()
+        (tmp_path / "index.html").write_text("home")
+        (tmp_path / "blog" / "index.html").write_text("blog")
+        (tmp_path / "old.css").write_text("old")
+        before = snapshot(str(tmp_path))
+        assert set(before) == {"index.html", "blog/index.html", "old.css"}
+
+        (tmp_path / "blog" / "index.html").write_text("blog, updated")
+        (tmp_path / "old.css").unlink()
+        (tmp_path / "new.css").write_text("new")
+
+        assert changed_paths(before, snapshot(str(tmp_path))) == {"blog/index.html", "old.css", "new.css"}
+
+    def test_unchanged(self, tmp_path):
+        """Test that an untouched tree has no changes"""
+        (tmp_path / "index.html").write_text("home")
+        assert changed_paths(snapshot(str(tmp_path)), snapshot(str(tmp_path))) == set()
+
+    def test_rewritten_with_same_content(self, tmp_path):
+        """Test that a staged rebuild only reports files whose bytes changed"""
+        from bestatic.publish import StagedOutput
+        output = str(tmp_path / "_output")
+        publisher = StagedOutput(output, builds_dir=str(tmp_path / ".bestatic-builds"))
+
+        def build(css):
+            staging = publisher.begin()
+            for name, text in (("index.html", "home"), ("index.json", "[]"), ("style.css", css)):
+                with open(os.path.join(staging, name), "w") as f:
+                    f.write(text)
+            publisher.publish(staging)
+
+        build("a { color: red }")
+        before = snapshot(output)
+        build("a { color: blue }")
+        assert changed_paths(before, snapshot(output, previous=before)) == {"style.css"}
+
+    def test_reuses_previous_digests(self, tmp_path, monkeypatch):
+        """Test that files with an unchanged stat are not read again"""
+        from bestatic import changeset
+        (tmp_path / "index.html").write_text("home")
+        before = snapshot(str(tmp_path))
+        monkeypatch.setattr(changeset, "_file_digest", lambda path: pytest.fail(f"re-read {path}"))
+        assert snapshot(str(tmp_path), previous=before) == before
+
+    def test_missing_root(self, tmp_path):
+        """Test that a missing directory is an empty snapshot"""
+        assert snapshot(str(tmp_path / "missing")) == {}
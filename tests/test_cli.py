@@ -218,6 +218,15 @@ class TestServerFunctionality:
         run_server(None, 9090)
         
         mock_serve.assert_called_once_with(port=9090)
+    
+    @patch('bestatic.bestatic.bestatic_serv')
+    def test_run_server_no_store(self, mock_serve):
+        """Test that server options such as no_store are passed through"""
+        from bestatic.bestatic import run_server
+        
+        run_server("custom_dir", 8080, no_store=True)
+        
+        mock_serve.assert_called_once_with("custom_dir", port=8080, no_store=True)
 
 
 class TestFileWatcherSetup:
@@ -319,3 +328,23 @@ class TestIntegrationScenarios:
         
         # Should create page file
         assert (tmp_path / "pages" / "about.md").exists()
+
+
+class TestDevAssetMode:
+    """Test the autoreload asset sync mode override"""
+    
+    def test_dev_mode_overrides_mode(self):
+        """Test that assets.dev_mode replaces assets.mode"""
+        from bestatic.bestatic import apply_dev_asset_mode
+        
+        config = {"assets": {"mode": "copy", "dev_mode": "hardlink"}}
+        
+        assert apply_dev_asset_mode(config)["assets"]["mode"] == "hardlink"
+    
+    def test_no_dev_mode(self):
+        """Test that configs without dev_mode are unchanged"""
+        from bestatic.bestatic import apply_dev_asset_mode
+        
+        config = {"theme": "Amazing"}
+        
+        assert apply_dev_asset_mode(config) == {"theme": "Amazing"}
@@ -0,0 +1,102 @@
+"""Tests for docstore.py - Low-memory document storage"""
+import os
+import json
+import shutil
+import filecmp
+
+from bestatic.docstore import SpillStore, DocumentRecord
+
+
+class Document:
+    def __init__(self):
+        self.path_of_md = "posts/first.md"
+        self.metadata = {"title": "First", "date": "January 01, 2024"}
+        self.content = "<p>Ünïcode content</p>" * 100
+        self.text = "Ünïcode content " * 100
+        self.summary = "Ünïcode content..."
+        self.tags = ["a", "b"]
+        self.katex = None
+        self.title = "First"
+        self.slug = "first"
+        self.path_info = ""
+
+
+class TestSpillStore:
+    """Test the scratch file"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that stored strings are read back in any order"""
+        with SpillStore(str(tmp_path / "cache")) as store:
+            first = store.put("één")
+            second = store.put("x" * 10000)
+            assert store.get(second) == "x" * 10000
+            assert store.get(first) == "één"
+            assert store.bytes == len("één".encode("utf-8")) + 10000
+        assert os.listdir(tmp_path / "cache") == []
+
+
+class TestDocumentRecord:
+    """Test the compact document stand-in"""
+
+    def test_fields(self, tmp_path):
+        """Test that resident fields are copied and the body is spilled on first use"""
+        document = Document()
+        with SpillStore(str(tmp_path)) as store:
+            record = DocumentRecord(document, store)
+            assert store.bytes == 0
+            assert record.content == document.content
+            assert store.bytes > len(document.text)
+            assert record._document is None
+            assert record.summary == document.summary
+            assert record.text == document.text
+            assert (record.title, record.slug, record.tags) == ("First", "first", ["a", "b"])
+            assert record.metadata is document.metadata
+            assert not hasattr(record, "__dict__")
+
+    def test_usage_tracked(self, tmp_path):
+        """Test that reads of a record's fields are counted, but not its internals"""
+        from bestatic.report import FieldUsage
+        usage = FieldUsage()
+        with SpillStore(str(tmp_path)) as store:
+            record = DocumentRecord(Document(), store, usage=usage)
+            with usage.template("list.html.jinja2"):
+                record.title
+                record.summary
+            assert record.sections is None
+
+        assert usage.templates == {"list.html.jinja2": {"summary": 1, "title": 1}}
+        assert usage.phases == {"build": {"sections": 1}}
+
+
+class TestLowMemoryBuild:
+    """Test generator() with low_memory"""
+
+    def test_same_output_as_normal_build(self, test_site, sample_config):
+        """Test that a low-memory build writes exactly the same site"""
+        from bestatic.generator import generator
+        generator(**sample_config)
+        shutil.move("_output", "normal")
+        generator(**{**sample_config, "low_memory": True})
+
+        comparison = filecmp.dircmp("normal", "_output")
+        pending = [comparison]
+        while pending:
+            current = pending.pop()
+            assert not current.left_only and not current.right_only
+            assert not filecmp.cmpfiles(current.left, current.right, current.common_files, shallow=False)[1]
+            pending.extend(current.subdirs.values())
+
+        with open("_output/index.json") as f:
+            index = json.load(f)
+        with open("_output/index.json") as f:
+            assert f.read() == json.dumps(index, indent=2)
+        assert any(entry["uri"].startswith("/post/") for entry in index)
+
+    def test_documents_not_kept_in_session(self, test_site, sample_config):
+        """Test that a low-memory build leaves no parsed documents behind"""
+        from bestatic.generator import generator
+        from bestatic.session import BuildSession
+        session = BuildSession()
+        generator(session=session, **{**sample_config, "low_memory": True})
+
+        assert session.documents() == []
@@ -0,0 +1,109 @@
+"""Tests for feeds.py - Streaming RSS/Atom feeds"""
+import os
+import datetime
+import xml.etree.ElementTree as ET
+import pytz
+from bestatic.feeds import write_feed
+
+
+def make_items(count):
+    """Feed items, newest first"""
+    base = pytz.utc.localize(datetime.datetime(2024, 1, 1))
+    return [{'title': f"Post {n}", 'link': f"https://example.org/post/post-{n}",
+             'description': f"Text of post {n} & more", 'date': base + datetime.timedelta(days=n)}
+            for n in range(count, 0, -1)]
+
+
+def make_channel(items):
+    return {'title': "Site", 'link': "https://example.org/posts", 'description': "Demo",
+            'feed_url': "https://example.org/index.rss", 'updated': items[0]['date'] if items else None}
+
+
+class TestWriteFeed:
+    """Test the streaming feed writer"""
+
+    ATOM = "{http://www.w3.org/2005/Atom}"
+
+    def test_rss_structure(self, tmp_path):
+        """Test that an RSS 2.0 feed is written with escaped text"""
+        items = make_items(3)
+        path = tmp_path / "index.rss"
+        write_feed(str(path), make_channel(items), iter(items))
+
+        channel = ET.parse(path).getroot().find("channel")
+        assert channel.findtext("title") == "Site"
+        assert channel.findtext("lastBuildDate") == "Thu, 04 Jan 2024 00:00:00 +0000"
+        titles = [item.findtext("title") for item in channel.iter("item")]
+        assert titles == ["Post 3", "Post 2", "Post 1"]
+        assert channel.find("item").findtext("description") == "Text of post 3 & more"
+
+    def test_limit(self, tmp_path):
+        """Test that limit keeps only the newest items"""
+        items = make_items(10)
+        path = tmp_path / "index.rss"
+        write_feed(str(path), make_channel(items), iter(items), limit=2)
+
+        titles = [item.findtext("title") for item in ET.parse(path).getroot().iter("item")]
+        assert titles == ["Post 10", "Post 9"]
+
+    def test_atom(self, tmp_path):
+        """Test that an Atom feed is written"""
+        items = make_items(2)
+        path = tmp_path / "index.atom"
+        write_feed(str(path), make_channel(items), iter(items), "atom")
+
+        root = ET.parse(path).getroot()
+        assert root.tag == f"{self.ATOM}feed"
+        assert root.findtext(f"{self.ATOM}updated") == "2024-01-03T00:00:00+00:00"
+        assert len(root.findall(f"{self.ATOM}entry")) == 2
+
+    def test_unchanged_feed_keeps_mtime(self, tmp_path):
+        """Test that rewriting an identical feed restores the previous file's mtime"""
+        items = make_items(3)
+        path = tmp_path / "out" / "index.rss"
+        cache_path = tmp_path / "cache" / "index.rss"
+
+        assert write_feed(str(path), make_channel(items), iter(items), cache_path=str(cache_path)) is True
+        os.utime(cache_path, (1_000_000, 1_000_000))
+        os.remove(path)
+
+        assert write_feed(str(path), make_channel(items), iter(items), cache_path=str(cache_path)) is False
+        assert os.path.getmtime(path) == 1_000_000
+
+        changed = make_items(4)
+        assert write_feed(str(path), make_channel(changed), iter(changed), cache_path=str(cache_path)) is True
+        assert path.read_bytes() == cache_path.read_bytes()
+
+
+class TestFeedsFromBuild:
+    """Test the feeds written by generator()"""
+
+    def test_default_feed(self, test_site, sample_config):
+        """Test that the site feed links to the posts"""
+        from bestatic.generator import generator
+        generator(**sample_config)
+
+        channel = ET.parse(test_site / "_output" / "index.rss").getroot().find("channel")
+        links = [item.findtext("link") for item in channel.iter("item")]
+        assert links == ["http://example.org/post/second-post", "http://example.org/post/first-post"]
+        assert not (test_site / "_output" / "index.atom").exists()
+
+    def test_summary_and_taxonomy_feeds(self, test_site, sample_config):
+        """Test summary-only items and per-term feeds, including list-valued tags"""
+        from bestatic.generator import generator
+        sample_config["feeds"] = {"summary_only": True, "taxonomies": True, "atom": True, "limit": 1}
+        sample_config["summary_length"] = 5
+        generator(**sample_config)
+
+        output = test_site / "_output"
+        items = list(ET.parse(output / "index.rss").getroot().iter("item"))
+        assert len(items) == 1
+        assert items[0].findtext("description").endswith("...")
+        assert (output / "index.atom").exists()
+
+        python_feed = ET.parse(output / "post" / "tags" / "python" / "index.rss").getroot()
+        assert [item.findtext("title") for item in python_feed.iter("item")] == ["Second Post"]
+        assert (output / "post" / "tags" / "bestatic" / "index.rss").exists()
+        self_link = python_feed.find("channel/{http://www.w3.org/2005/Atom}link").get("href")
+        assert self_link == "http://example.org/post/tags/python/index.rss"
+        assert not (output / "post" / "tags" / "['python'").exists()
@@ -0,0 +1,105 @@
+"""Tests for filecache.py - In-memory cache of served files"""
+import os
+import gzip
+from bestatic.filecache import FileCache
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+class TestFileCache:
+    """Test loading, eviction and invalidation"""
+
+    def test_load_and_get(self, tmp_path):
+        """Test that a loaded file is served from memory with a gzip variant"""
+        cache = FileCache(1)
+        path = write(tmp_path / "style.css", "body { color: red; }\n" * 200)
+
+        entry = cache.load("/style.css", path, "style.css", "text/css")
+        assert cache.get("/style.css") is entry
+        assert entry.etag.startswith('"') and entry.last_modified
+        assert gzip.decompress(entry.gzip_body) == entry.body
+        assert entry.gzip_etag != entry.etag
+        assert cache.hits == 1
+
+    def test_no_gzip_for_images_or_small_files(self, tmp_path):
+        """Test that gzip variants are only built for larger text files"""
+        cache = FileCache(1)
+        small = write(tmp_path / "small.html", "<p>hi</p>")
+        image = write(tmp_path / "image.png", "x" * 4096)
+
+        assert cache.load("/small.html", small, "small.html", "text/html").gzip_body is None
+        assert cache.load("/image.png", image, "image.png", "image/png").gzip_body is None
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry goes first when over the cap"""
+        cache = FileCache(0.01, gzip_min_size=10**9)  # ~10 KB
+        paths = [write(tmp_path / f"{n}.bin", "x" * 2000) for n in range(6)]
+
+        for n, path in enumerate(paths[:4]):
+            cache.load(f"/{n}.bin", path, f"{n}.bin", "application/octet-stream")
+        cache.get("/0.bin")
+        cache.load("/4.bin", paths[4], "4.bin", "application/octet-stream")
+        cache.load("/5.bin", paths[5], "5.bin", "application/octet-stream")
+
+        assert cache.size <= cache.max_bytes
+        assert cache.get("/0.bin") is not None
+        assert cache.get("/1.bin") is None
+
+    def test_large_files_not_cached(self, tmp_path):
+        """Test that files over a quarter of the cap are left on disk"""
+        cache = FileCache(0.01)
+        path = write(tmp_path / "big.bin", "x" * 5000)
+
+        assert cache.load("/big.bin", path, "big.bin", "application/octet-stream") is None
+        assert len(cache) == 0
+
+    def test_invalidate(self, tmp_path):
+        """Test that invalidation drops every URL serving a changed file"""
+        cache = FileCache(1)
+        index = write(tmp_path / "blog" / "index.html", "<p>blog</p>")
+        other = write(tmp_path / "about" / "index.html", "<p>about</p>")
+        cache.load("/blog/", index, "blog/index.html", "text/html")
+        cache.load("/blog/index.html", index, "blog/index.html", "text/html")
+        cache.load("/about/", other, "about/index.html", "text/html")
+
+        assert cache.invalidate(["blog/index.html", "missing.html"]) == 2
+        assert cache.get("/blog/") is None
+        assert cache.get("/about/") is not None
+        assert cache.invalidate(None) == 1
+        assert cache.size == 0
+
+    def test_invalidated_while_loading(self, tmp_path):
+        """Test that bytes read before a concurrent invalidation are not cached"""
+        cache = FileCache(1)
+        path = write(tmp_path / "index.html", "<p>old</p>")
+
+        def invalidate_during_load(body):
+            cache.invalidate(["index.html"])
+            return body
+
+        entry = cache.load("/", path, "index.html", "text/html", transform=invalidate_during_load)
+        assert entry.body == b"<p>old</p>"
+        assert cache.get("/") is None
+        assert cache.load("/", path, "index.html", "text/html") is cache.get("/")
+
+    def test_unchanged_files_survive_rebuild(self, tmp_path):
+        """Test that a rebuild rewriting identical files only drops the changed ones"""
+        from bestatic.changeset import snapshot, changed_paths
+        cache = FileCache(1)
+        output = tmp_path / "_output"
+        index = write(output / "index.html", "<p>home</p>")
+        style = write(output / "style.css", "a { color: red }")
+        cache.load("/", index, "index.html", "text/html")
+        cache.load("/style.css", style, "style.css", "text/css")
+        before = snapshot(str(output))
+
+        os.remove(index)
+        write(output / "index.html", "<p>home</p>")
+        write(output / "style.css", "a { color: blue }")
+        assert cache.invalidate(changed_paths(before, snapshot(str(output)))) == 1
+        assert cache.get("/") is not None
+        assert cache.get("/style.css") is None
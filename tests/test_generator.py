@@ -402,3 +402,89 @@ print("Hello, World!")
         
         output_dir = tmp_path / "_output"
         assert output_dir.exists()
+
+
+class TestLazyBodies:
+    """Test the frontmatter prescan and lazy Markdown rendering"""
+
+    @pytest.fixture
+    def converted(self, monkeypatch):
+        """Record the build phase of every Markdown conversion"""
+        from markdown import Markdown
+        from bestatic.tracing import PhaseTracer
+        calls = []
+        tracer = PhaseTracer()
+        tracer.add_listener(lambda name: calls.append(("phase", name)))
+        convert = Markdown.convert
+
+        def recording_convert(self, text):
+            calls.append(("convert", text))
+            return convert(self, text)
+
+        monkeypatch.setattr(Markdown, "convert", recording_convert)
+        return tracer, calls
+
+    def test_no_markdown_while_parsing(self, test_site, sample_config, converted):
+        """Test that parsing reads frontmatter only and each body is rendered once"""
+        tracer, calls = converted
+        generator(tracer=tracer, **sample_config)
+
+        phase = None
+        bodies = []
+        for kind, value in calls:
+            if kind == "phase":
+                phase = value
+            else:
+                assert phase != "parse"
+                bodies.append(value)
+        assert sum("This is the first post" in text for text in bodies) == 1
+        assert "<strong>markdown</strong>" in (test_site / "_output" / "post" / "first-post" / "index.html").read_text()
+
+    def test_frontmatter_prescan(self, test_site, sample_config):
+        """Test headers after blank lines and bodies with horizontal rules"""
+        (test_site / "posts" / "ruled.md").write_text(
+            "\n\n---\ntitle: Ruled Post\ndate: March 03, 2024\nslug: ruled\ntags: [rules]\n---\n"
+            "Above\n\n---\n\nBelow\n")
+        generator(**sample_config)
+
+        html = (test_site / "_output" / "post" / "ruled" / "index.html").read_text()
+        assert "Ruled Post" in html
+        assert "<hr" in html and "Below" in html
+        assert (test_site / "_output" / "post" / "tags" / "rules" / "index.html").exists()
+
+    def test_field_usage_in_report(self, test_site, sample_config, minimal_theme):
+        """Test that the report shows the fields each template read and summaries are only computed when used"""
+        from bestatic.report import BuildReport
+        report = BuildReport()
+        generator(report=report, **sample_config)
+        fields = report.fields.to_dict()
+
+        assert fields["templates"]["post.html.jinja2"] == {"content": 2, "title": 2}
+        assert "summary" not in fields["computed"]
+        assert fields["computed"]["content"] == 4
+
+        (minimal_theme / "templates" / "list.html.jinja2").write_text(
+            "{% for key, item in post.items() %}<p>{{ item.title }}: {{ item.summary }}</p>{% endfor %}")
+        report = BuildReport()
+        generator(report=report, **sample_config)
+        fields = report.fields.to_dict()
+
+        assert fields["templates"]["list.html.jinja2"] == {"summary": 2, "title": 2}
+        assert fields["computed"]["summary"] == 2
+
+    def test_sections(self, test_site, sample_config, minimal_theme):
+        """Test that pages with 'section: true' get their sections, computed on demand"""
+        (minimal_theme / "templates" / "page.html.jinja2").write_text(
+            "{% for section in sections or [] %}<section>{{ section.heading }}</section>{% endfor %}")
+        (test_site / "pages" / "guide.md").write_text(
+            "---\ntitle: Guide\nslug: guide\nsection: true\n---\nIntro\n\n"
+            "## Setup {: .splitsection }\n\nInstall it.\n\n## Usage {: .splitsection }\n\nRun it.\n")
+        sample_config["markdown"]["extensions"].append("attr_list")
+        from bestatic.report import BuildReport
+        for low_memory in (False, True):
+            report = BuildReport()
+            generator(report=report, **{**sample_config, "low_memory": low_memory})
+
+            html = (test_site / "_output" / "guide" / "index.html").read_text()
+            assert "<section>Setup</section><section>Usage</section>" in html
+            assert report.fields.to_dict()["computed"]["sections"] == 1
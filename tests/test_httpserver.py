@@ -8,9 +8,13 @@ import pytest
 import threading
 import time
 import requests
+import gzip
+import http.client
+from functools import partial
 from pathlib import Path
 
-from bestatic.httpserver import bestatic_serv, ThreadedHTTPServer
+from bestatic.httpserver import bestatic_serv, ThreadedHTTPServer, BestaticHandler, parse_byte_range
+from bestatic.filecache import FileCache
 
 
 class TestHTTPServerBasics:
@@ -335,3 +339,151 @@ class TestHTTPServerErrorHandling:
         except requests.exceptions.RequestException:
             # If we can't connect, that's okay for this test
             pass
+
+
+class TestByteRangeParsing:
+    """Test Range header parsing."""
+    
+    def test_ranges(self):
+        """Test explicit, open-ended and suffix ranges"""
+        assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+        assert parse_byte_range("bytes=90-", 100) == (90, 99)
+        assert parse_byte_range("bytes=-10", 100) == (90, 99)
+        assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    
+    def test_ignored_ranges(self):
+        """Test that malformed and multi-range headers mean the whole file"""
+        assert parse_byte_range(None, 100) is None
+        assert parse_byte_range("items=0-9", 100) is None
+        assert parse_byte_range("bytes=0-9,20-29", 100) is None
+        assert parse_byte_range("bytes=9-0", 100) is None
+        assert parse_byte_range("bytes=abc", 100) is None
+    
+    def test_unsatisfiable(self):
+        """Test that a range past the end starts at or after the file size"""
+        start, _ = parse_byte_range("bytes=100-", 100)
+        assert start >= 100
+
+
+class TestHTTPCaching:
+    """Test keep-alive, conditional GET and Range responses."""
+    
+    @pytest.fixture
+    def server(self, tmp_path):
+        """Serve a small site on a free port; yields (port, site directory)"""
+        (tmp_path / "index.html").write_text("<html><body>Home</body></html>")
+        (tmp_path / "video.mp4").write_bytes(bytes(range(256)) * 4)
+        
+        def start(no_store=False, file_cache=None):
+            handler = partial(BestaticHandler, directory=str(tmp_path), no_store=no_store, file_cache=file_cache)
+            httpd = ThreadedHTTPServer(("127.0.0.1", 0), handler)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            servers.append(httpd)
+            return httpd.server_address[1]
+        
+        servers = []
+        yield start
+        for httpd in servers:
+            httpd.shutdown()
+            httpd.server_close()
+    
+    def test_keep_alive_and_304(self, server):
+        """Test that one connection serves a GET and a conditional GET"""
+        conn = http.client.HTTPConnection("127.0.0.1", server(), timeout=5)
+        
+        conn.request("GET", "/index.html")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert b"Home" in response.read()
+        etag = response.getheader("ETag")
+        assert etag and response.getheader("Last-Modified")
+        assert response.getheader("Cache-Control") == "no-cache"
+        
+        conn.request("GET", "/index.html", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304
+        assert response.read() == b""
+        
+        conn.request("GET", "/index.html", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+        response = conn.getresponse()
+        assert response.status == 304
+        response.read()
+        conn.close()
+    
+    def test_range_requests(self, server):
+        """Test 206 for a satisfiable range and 416 past the end"""
+        conn = http.client.HTTPConnection("127.0.0.1", server(), timeout=5)
+        
+        conn.request("GET", "/video.mp4", headers={"Range": "bytes=256-259"})
+        response = conn.getresponse()
+        assert response.status == 206
+        assert response.getheader("Content-Range") == "bytes 256-259/1024"
+        assert response.read() == bytes([0, 1, 2, 3])
+        
+        conn.request("GET", "/video.mp4", headers={"Range": "bytes=2000-"})
+        response = conn.getresponse()
+        assert response.status == 416
+        assert response.getheader("Content-Range") == "bytes */1024"
+        response.read()
+        
+        conn.request("GET", "/video.mp4", headers={"Range": "bytes=0-3", "If-Range": '"stale"'})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert len(response.read()) == 1024
+        conn.close()
+    
+    def test_no_store(self, server):
+        """Test that no_store restores the never-cache headers"""
+        conn = http.client.HTTPConnection("127.0.0.1", server(no_store=True), timeout=5)
+        
+        conn.request("GET", "/index.html", headers={"If-None-Match": "*"})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert "no-store" in response.getheader("Cache-Control")
+        assert response.getheader("ETag") is None
+        response.read()
+        conn.close()
+    
+    def test_directory_listing(self, server, tmp_path):
+        """Test that directories without an index are listed"""
+        (tmp_path / "files").mkdir()
+        (tmp_path / "files" / "a.txt").write_text("a")
+        conn = http.client.HTTPConnection("127.0.0.1", server(), timeout=5)
+        
+        conn.request("GET", "/files/")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert b"a.txt" in response.read()
+        conn.close()
+    
+    def test_memory_cache(self, server, tmp_path):
+        """Test serving from the memory cache, with gzip and invalidation"""
+        (tmp_path / "style.css").write_text("body { color: red; }\n" * 200)
+        file_cache = FileCache(1)
+        conn = http.client.HTTPConnection("127.0.0.1", server(file_cache=file_cache), timeout=5)
+        
+        conn.request("GET", "/style.css", headers={"Accept-Encoding": "gzip"})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Encoding") == "gzip"
+        assert response.getheader("Vary") == "Accept-Encoding"
+        body = gzip.decompress(response.read()).decode()
+        assert body.startswith("body { color: red; }")
+        
+        conn.request("GET", "/style.css", headers={"Range": "bytes=0-3"})
+        response = conn.getresponse()
+        assert response.status == 206
+        assert response.read() == b"body"
+        
+        # Until invalidated, the cached copy is served without touching the disk
+        (tmp_path / "style.css").write_text("p { margin: 0; }")
+        conn.request("GET", "/style.css")
+        response = conn.getresponse()
+        assert response.read().startswith(b"body")
+        
+        file_cache.invalidate(["style.css"])
+        conn.request("GET", "/style.css")
+        response = conn.getresponse()
+        assert response.read() == b"p { margin: 0; }"
+        assert file_cache.hits >= 2
+        conn.close()
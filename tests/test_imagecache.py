@@ -0,0 +1,148 @@
+"""
+Tests for imagecache module and its use by ImageProcessor.
+"""
+
+import os
+import pytest
+from pathlib import Path
+from PIL import Image
+
+from bestatic.imagecache import ImageCache
+from bestatic.imageprocessor import ImageProcessor
+
+
+@pytest.fixture
+def sample_image(tmp_path):
+    """Create a sample JPEG image"""
+    img_path = tmp_path / "photo.jpg"
+    Image.new('RGB', (200, 100), color='blue').save(str(img_path), 'JPEG')
+    return img_path
+
+
+class TestImageCache:
+    """Test the ImageCache class directly."""
+    
+    def test_key_depends_on_settings(self, tmp_path, sample_image):
+        """Test that different encoder settings give different keys"""
+        cache = ImageCache(str(tmp_path / "cache"))
+        
+        key_a = cache.key_for(str(sample_image), {'quality': 80, 'method': 6})
+        key_b = cache.key_for(str(sample_image), {'quality': 90, 'method': 6})
+        key_c = cache.key_for(str(sample_image), {'method': 6, 'quality': 80})
+        
+        assert key_a != key_b
+        assert key_a == key_c
+    
+    def test_key_depends_on_source_bytes(self, tmp_path, sample_image):
+        """Test that changing the source changes the key"""
+        cache = ImageCache(str(tmp_path / "cache"))
+        key_before = cache.key_for(str(sample_image), {'quality': 80})
+        
+        Image.new('RGB', (200, 100), color='red').save(str(sample_image), 'JPEG')
+        
+        assert cache.key_for(str(sample_image), {'quality': 80}) != key_before
+    
+    def test_store_and_fetch(self, tmp_path):
+        """Test storing an encoded file and fetching it elsewhere"""
+        cache = ImageCache(str(tmp_path / "cache"))
+        encoded = tmp_path / "encoded.webp"
+        encoded.write_bytes(b"webp-bytes")
+        
+        assert cache.fetch("ab" * 32, str(tmp_path / "out" / "a.webp")) is False
+        
+        cache.store("ab" * 32, str(encoded))
+        destination = tmp_path / "out" / "a.webp"
+        
+        assert cache.fetch("ab" * 32, str(destination)) is True
+        assert destination.read_bytes() == b"webp-bytes"
+    
+    def test_fetch_with_copy_mode(self, tmp_path):
+        """Test that copy mode does not hard-link"""
+        cache = ImageCache(str(tmp_path / "cache"), link=False)
+        encoded = tmp_path / "encoded.webp"
+        encoded.write_bytes(b"data")
+        cache.store("cd" * 32, str(encoded))
+        
+        destination = tmp_path / "copy.webp"
+        cache.fetch("cd" * 32, str(destination))
+        
+        assert os.stat(destination).st_nlink == 1
+    
+    def test_evict_removes_oldest(self, tmp_path):
+        """Test size-based eviction of least recently used entries"""
+        cache = ImageCache(str(tmp_path / "cache"), max_size_mb=1.5 / 1024, link=False)
+        for i, key in enumerate(["11" * 32, "22" * 32]):
+            encoded = tmp_path / f"e{i}.webp"
+            encoded.write_bytes(b"x" * 1024)
+            cache.store(key, str(encoded))
+            entry = cache._entry_path(key, ".webp")
+            os.utime(entry, (1000 + i, 1000 + i))
+        
+        removed = cache.evict()
+        
+        assert removed == 1024
+        assert not cache._entry_path("11" * 32, ".webp").exists()
+        assert cache._entry_path("22" * 32, ".webp").exists()
+
+
+class TestProcessorCaching:
+    """Test cache hits and misses through ImageProcessor."""
+    
+    def test_second_run_is_cache_hit(self, tmp_path, sample_image):
+        """Test that re-processing an unchanged image uses the cache"""
+        config = {'enabled': True, 'workers': 1, 'cache_dir': str(tmp_path / "cache")}
+        
+        first = ImageProcessor(config)
+        first.process_jobs([(str(sample_image), str(tmp_path / "out1"))])
+        assert (first.cache_hits, first.cache_misses) == (0, 1)
+        
+        second = ImageProcessor(config)
+        results = second.process_jobs([(str(sample_image), str(tmp_path / "out2"))])
+        assert (second.cache_hits, second.cache_misses) == (1, 0)
+        
+        webp = Path(results[str(sample_image)]['webp'])
+        assert webp.exists()
+        assert Image.open(webp).size == (200, 100)
+    
+    def test_quality_change_is_cache_miss(self, tmp_path, sample_image):
+        """Test that changing quality does not reuse the old encoding"""
+        base = {'enabled': True, 'workers': 1, 'cache_dir': str(tmp_path / "cache")}
+        ImageProcessor(base).process_jobs([(str(sample_image), str(tmp_path / "out1"))])
+        
+        processor = ImageProcessor({**base, 'quality': 50})
+        processor.process_jobs([(str(sample_image), str(tmp_path / "out2"))])
+        
+        assert processor.cache_misses == 1
+    
+    def test_same_stem_outputs_keep_their_entries(self, tmp_path):
+        """Test that encoding over a hard-linked output leaves the other entry intact"""
+        src = tmp_path / "src"
+        src.mkdir()
+        Image.new('RGB', (40, 40), color='red').save(str(src / "photo.jpg"), 'JPEG')
+        Image.new('RGB', (40, 40), color='blue').save(str(src / "photo.png"), 'PNG')
+        config = {'enabled': True, 'workers': 1, 'cache_dir': str(tmp_path / "cache")}
+        jobs = [(str(src / "photo.jpg"), str(tmp_path / "out")), (str(src / "photo.png"), str(tmp_path / "out"))]
+        ImageProcessor(config).process_jobs(jobs)
+
+        # A later build of the JPEG alone must get red pixels back from the cache
+        processor = ImageProcessor(config)
+        results = processor.process_jobs([jobs[0]])
+        assert processor.cache_hits == 1
+        with Image.open(results[jobs[0][0]]['webp']) as img:
+            red, green, blue = img.convert('RGB').getpixel((20, 20))
+        assert red > 200 and blue < 50
+
+    def test_cache_disabled(self, tmp_path, sample_image):
+        """Test that the cache can be switched off"""
+        processor = ImageProcessor({'enabled': True, 'cache': False})
+        results = processor.process_image(str(sample_image), str(tmp_path / "out"))
+        
+        assert processor.cache is None
+        assert 'cache' not in results
+    
+    def test_configurable_max_dimension(self, tmp_path, sample_image):
+        """Test that max_dimension limits the output size"""
+        processor = ImageProcessor({'enabled': True, 'cache': False, 'max_dimension': 100})
+        results = processor.process_image(str(sample_image), str(tmp_path / "out"))
+        
+        assert Image.open(results['webp']).size == (100, 50)
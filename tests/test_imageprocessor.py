@@ -10,6 +10,12 @@ from PIL import Image
 from bestatic.imageprocessor import ImageProcessor
 
 
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """Keep the default image cache directory inside the test's tmp_path"""
+    monkeypatch.chdir(tmp_path)
+
+
 class TestImageProcessorBasics:
     """Test basic ImageProcessor functionality."""
     
@@ -478,3 +484,160 @@ class TestFullWorkflow:
         conversion_map = processor.process_static_content(str(static_dir), str(output_static))
         
         assert len(conversion_map) == 0
+
+
+class TestParallelConversion:
+    """Test process-pool image conversion."""
+    
+    @pytest.fixture
+    def many_images(self, tmp_path):
+        """Create a static directory with several images in nested folders"""
+        static_dir = tmp_path / "static-content"
+        for sub in ["a", "b"]:
+            (static_dir / sub).mkdir(parents=True)
+            for i in range(3):
+                img = Image.new('RGB', (120, 80), color='green')
+                img.save(str(static_dir / sub / f"img{i}.jpg"), 'JPEG')
+        return static_dir
+    
+    def test_workers_config(self):
+        """Test that worker settings are read from config"""
+        processor = ImageProcessor({'enabled': True, 'workers': 3, 'max_large_decodes': 1})
+        
+        assert processor.workers == 3
+        assert processor.max_large_decodes == 1
+    
+    def test_pool_matches_serial(self, tmp_path, many_images):
+        """Test that parallel conversion gives the same map as serial conversion"""
+        serial = ImageProcessor({'enabled': True, 'workers': 1})
+        parallel = ImageProcessor({'enabled': True, 'workers': 2})
+        
+        map_serial = serial.process_static_content(str(many_images), str(tmp_path / "out1"))
+        map_parallel = parallel.process_static_content(str(many_images), str(tmp_path / "out2"))
+        
+        assert list(map_serial.items()) == list(map_parallel.items())
+        assert (tmp_path / "out2" / "a" / "img0.webp").exists()
+        assert (tmp_path / "out2" / "b" / "img2.webp").exists()
+    
+    def test_per_image_timings(self, tmp_path, many_images):
+        """Test that each converted image gets a timing entry"""
+        processor = ImageProcessor({'enabled': True, 'workers': 2})
+        processor.process_static_content(str(many_images), str(tmp_path / "out"))
+        
+        assert len(processor.timings) == 6
+        assert all(seconds >= 0 for seconds in processor.timings.values())
+
+    def test_bytes_counted(self, tmp_path, many_images):
+        """Test that converted images and their source/output bytes are counted"""
+        processor = ImageProcessor({'enabled': True, 'workers': 2, 'cache': False})
+        processor.process_static_content(str(many_images), str(tmp_path / "out"))
+
+        assert processor.converted == 6
+        assert processor.bytes_in == sum(path.stat().st_size for path in many_images.rglob("*.jpg"))
+        assert processor.bytes_out == sum(path.stat().st_size for path in (tmp_path / "out").rglob("*.webp"))
+    
+    def test_cache_hits_not_counted_as_converted(self, tmp_path, many_images):
+        """Test that images served from the cache do not count as encoded"""
+        config = {'enabled': True, 'workers': 1, 'cache_dir': str(tmp_path / "cache")}
+        ImageProcessor(config).process_static_content(str(many_images), str(tmp_path / "out1"))
+        processor = ImageProcessor(config)
+        processor.process_static_content(str(many_images), str(tmp_path / "out2"))
+
+        assert processor.cache_hits == 6
+        assert (processor.converted, processor.bytes_in, processor.bytes_out) == (0, 0, 0)
+
+    def test_quiet_with_summary(self, tmp_path, many_images, capsys):
+        """Test that conversion prints nothing and the summary line reports the batch"""
+        processor = ImageProcessor({'enabled': True, 'workers': 2, 'cache_dir': str(tmp_path / "cache")})
+        processor.process_static_content(str(many_images), str(tmp_path / "out"))
+
+        assert capsys.readouterr().out == ""
+        assert processor.summary() == (f"Images: 6 processed, cache: {processor.cache_hits} hits, "
+                                       f"{processor.cache_misses} misses")
+        assert processor.cache_hits + processor.cache_misses == 6
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_failing_image_does_not_abort_batch(self, tmp_path, many_images, workers):
+        """Test that an exception from one job leaves the other images converted"""
+        processor = ImageProcessor({'enabled': True, 'workers': workers, 'keep_original': True, 'cache': False})
+        jobs = [(str(path), str(tmp_path / "out")) for path in sorted(many_images.glob("a/*.jpg"))]
+        # Copying the kept original of a vanished file raises outside process_image's try
+        jobs.insert(1, (str(many_images / "a" / "missing.jpg"), str(tmp_path / "out")))
+
+        results = processor.process_jobs(jobs)
+
+        assert list(results) == [jobs[0][0], jobs[2][0], jobs[3][0]]
+        assert processor.converted == 3
+
+    def test_large_image_detection(self, tmp_path, many_images, monkeypatch):
+        """Test that large images are detected from the header"""
+        processor = ImageProcessor({'enabled': True})
+        image_path = str(many_images / "a" / "img0.jpg")
+        
+        assert processor._is_large(image_path) is False
+        monkeypatch.setattr(ImageProcessor, 'LARGE_IMAGE_PIXELS', 100)
+        assert processor._is_large(image_path) is True
+    
+    def test_large_images_throttled_in_pool(self, tmp_path, many_images, monkeypatch):
+        """Test that pool conversion completes when every image counts as large"""
+        monkeypatch.setattr(ImageProcessor, 'LARGE_IMAGE_PIXELS', 100)
+        processor = ImageProcessor({'enabled': True, 'workers': 2, 'max_large_decodes': 1})
+        
+        conversion_map = processor.process_static_content(str(many_images), str(tmp_path / "out"))
+        
+        assert len(conversion_map) == 3  # same filenames in both folders
+        assert len(processor.timings) == 6
+
+
+class TestResponsiveVariants:
+    """Test srcset variant generation."""
+    
+    @pytest.fixture
+    def wide_image(self, tmp_path):
+        """Create a 2000x1000 JPEG"""
+        static_dir = tmp_path / "static-content" / "images"
+        static_dir.mkdir(parents=True)
+        img_path = static_dir / "wide.jpg"
+        Image.new('RGB', (2000, 1000), color='orange').save(str(img_path), 'JPEG')
+        return img_path
+    
+    def test_variants_created(self, tmp_path, wide_image):
+        """Test that each configured width below the main size gets a variant"""
+        processor = ImageProcessor({'enabled': True, 'widths': [480, 960, 4000]})
+        results = processor.process_image(str(wide_image), str(tmp_path / "out"))
+        
+        assert [v['width'] for v in results['variants']] == [2000, 960, 480]
+        assert Image.open(tmp_path / "out" / "wide-960w.webp").size == (960, 480)
+        assert Image.open(tmp_path / "out" / "wide-480w.webp").size == (480, 240)
+        assert not (tmp_path / "out" / "wide-4000w.webp").exists()
+    
+    def test_no_variants_without_widths(self, tmp_path, wide_image):
+        """Test that the default config still writes a single WebP"""
+        processor = ImageProcessor({'enabled': True})
+        results = processor.process_image(str(wide_image), str(tmp_path / "out"))
+        
+        assert 'variants' not in results
+        assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ['wide.webp']
+    
+    def test_variants_come_from_cache(self, tmp_path, wide_image):
+        """Test that cached variants are reused without decoding"""
+        config = {'enabled': True, 'workers': 1, 'widths': [480]}
+        ImageProcessor(config).process_jobs([(str(wide_image), str(tmp_path / "out1"))])
+        
+        processor = ImageProcessor(config)
+        processor.process_jobs([(str(wide_image), str(tmp_path / "out2"))])
+        
+        assert processor.cache_hits == 1
+        assert (tmp_path / "out2" / "wide-480w.webp").exists()
+    
+    def test_variant_manifest(self, tmp_path, wide_image):
+        """Test the manifest built by process_static_content"""
+        processor = ImageProcessor({'enabled': True, 'widths': [480]})
+        static_dir = tmp_path / "static-content"
+        processor.process_static_content(str(static_dir), str(tmp_path / "_output" / "static-content"))
+        
+        manifest = processor.variant_manifest
+        assert 'static-content/images/wide.jpg' in manifest
+        assert 'static-content/images/wide.webp' in manifest
+        urls = [entry['url'] for entry in manifest['static-content/images/wide.jpg']]
+        assert urls == ['/static-content/images/wide.webp', '/static-content/images/wide-480w.webp']
@@ -0,0 +1,107 @@
+"""Tests for livereload.py - Push-based live reload"""
+import json
+import queue
+import socket
+import threading
+import http.client
+from functools import partial
+
+from bestatic import livereload
+from bestatic.livereload import LiveReloadHub, paths_to_urls, inject_script
+from bestatic.httpserver import ThreadedHTTPServer, BestaticHandler, watch_rebuilds
+from bestatic.filecache import FileCache
+
+
+class TestLiveReloadHelpers:
+    """Test URL mapping, script injection and event fan-out"""
+
+    def test_paths_to_urls(self):
+        """Test that index pages are announced under their directory URL too"""
+        assert paths_to_urls(["index.html", "blog/index.html", "css/site.css"]) == [
+            "/index.html", "/", "/blog/index.html", "/blog/", "/css/site.css"]
+
+    def test_inject_script(self):
+        """Test that the script tag goes before </body>, or at the end"""
+        assert inject_script(b"<html><body><p>x</p></BODY></html>") == (
+            b'<html><body><p>x</p><script src="/__bestatic/livereload.js"></script></BODY></html>')
+        assert inject_script(b"<p>x</p>").endswith(livereload.SCRIPT_TAG)
+
+    def test_hub_publish(self):
+        """Test that every subscriber gets a rebuild event until it unsubscribes"""
+        hub = LiveReloadHub()
+        first, second = queue.Queue(), queue.Queue()
+        hub.subscribe(first.put)
+        hub.subscribe(second.put)
+        hub.publish(["css/site.css"])
+        hub.unsubscribe(second.put)
+        hub.publish(["index.html"])
+
+        assert first.qsize() == 2 and second.qsize() == 1
+        event = second.get().decode()
+        assert event.startswith("event: rebuild\n")
+        assert json.loads(event.split("data: ", 1)[1]) == {"urls": ["/css/site.css"]}
+
+
+class TestLiveReloadServer:
+    """Test the threaded server's live reload endpoints"""
+
+    def start(self, directory, file_cache=None):
+        hub = LiveReloadHub()
+        changes = queue.Queue()
+        threading.Thread(target=watch_rebuilds, args=(changes, file_cache, hub), daemon=True).start()
+        handler = partial(BestaticHandler, directory=str(directory), file_cache=file_cache, live_reload=hub)
+        httpd = ThreadedHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return httpd, hub, changes
+
+    def test_script_injected(self, tmp_path):
+        """Test that HTML pages (cached or not) include the client script, which is served"""
+        (tmp_path / "index.html").write_text("<html><body>Home</body></html>")
+        for file_cache in (None, FileCache(1)):
+            httpd, hub, changes = self.start(tmp_path, file_cache)
+            conn = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+
+            conn.request("GET", "/")
+            body = conn.getresponse().read()
+            assert body == b'<html><body>Home<script src="/__bestatic/livereload.js"></script></body></html>'
+
+            conn.request("GET", livereload.SCRIPT_PATH)
+            response = conn.getresponse()
+            assert response.getheader("Content-Type") == "text/javascript"
+            assert b"EventSource" in response.read()
+            conn.close()
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_rebuild_event_pushed(self, tmp_path):
+        """Test that changed paths from the watcher reach an open event stream"""
+        (tmp_path / "index.html").write_text("<html><body>Home</body></html>")
+        file_cache = FileCache(1)
+        httpd, hub, changes = self.start(tmp_path, file_cache)
+        port = httpd.server_address[1]
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/index.html")
+        conn.getresponse().read()
+        assert len(file_cache) == 1
+
+        events = socket.create_connection(("127.0.0.1", port), timeout=5)
+        events.sendall(f"GET {livereload.EVENTS_PATH} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        received = b""
+        while b"retry:" not in received:
+            received += events.recv(4096)
+        assert b"text/event-stream" in received
+
+        changes.put(["index.html", "style.css"])
+        while b"event: rebuild" not in received:
+            received += events.recv(4096)
+        while not received.endswith(b"\n\n"):
+            received += events.recv(4096)
+        data = received.split(b"data: ", 1)[1].split(b"\n", 1)[0]
+        assert json.loads(data) == {"urls": ["/index.html", "/", "/style.css"]}
+        assert len(file_cache) == 0
+
+        events.close()
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
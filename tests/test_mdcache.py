@@ -0,0 +1,166 @@
+"""Tests for mdcache.py - Markdown render caches"""
+import os
+import json
+import shutil
+import filecmp
+
+from markdown import Markdown
+
+from bestatic.mdcache import HighlightCache, IncludeCache
+
+
+CODE = "```python\ndef greet(name):\n    return f'Hello {name}'\n```\n"
+
+
+def highlighted(text, cache=None, **codehilite):
+    converter = Markdown(extensions=["fenced_code", "codehilite"],
+                         extension_configs={"codehilite": codehilite})
+    if cache is not None:
+        cache.install(converter)
+    return converter.convert(text)
+
+
+def included(text, base_path, cache=None):
+    converter = Markdown(extensions=["markdown_include.include"],
+                         extension_configs={"markdown_include.include": {"base_path": str(base_path)}})
+    if cache is not None:
+        cache.install(converter)
+    return converter.convert(text)
+
+
+class TestHighlightCache:
+    """Test caching of highlighted code blocks"""
+
+    def test_hit_matches_uncached_output(self, tmp_path):
+        """Test that a cached block gives the same HTML, also from a new process"""
+        expected = highlighted(CODE)
+        cache = HighlightCache(str(tmp_path / "highlight"))
+        assert highlighted(CODE, cache) == expected
+        assert highlighted(CODE, cache) == expected
+        assert cache.stats() == {'hits': 1, 'misses': 1}
+
+        restarted = HighlightCache(str(tmp_path / "highlight"))
+        assert highlighted(CODE, restarted) == expected
+        assert restarted.stats() == {'hits': 1, 'misses': 0}
+
+    def test_key_depends_on_code_language_and_options(self, tmp_path):
+        """Test that other code, another language or other options are not served from the cache"""
+        cache = HighlightCache(str(tmp_path / "highlight"))
+        highlighted(CODE, cache)
+        assert highlighted(CODE.replace("Hello", "Bye"), cache) == highlighted(CODE.replace("Hello", "Bye"))
+        assert highlighted(CODE.replace("python", "ruby"), cache) == highlighted(CODE.replace("python", "ruby"))
+        assert highlighted(CODE, cache, linenos="table") == highlighted(CODE, linenos="table")
+        assert cache.stats() == {'hits': 0, 'misses': 4}
+
+    def test_only_installed_converter_cached(self, tmp_path):
+        """Test that install() leaves CodeHilite and other converters untouched"""
+        from markdown.extensions.codehilite import CodeHilite
+        original = CodeHilite.hilite
+        cache = HighlightCache(str(tmp_path))
+        highlighted(CODE, cache)
+        assert CodeHilite.hilite is original
+        highlighted(CODE)
+        assert cache.stats() == {'hits': 0, 'misses': 1}
+
+    def test_evict_keeps_recent_entries(self, tmp_path):
+        """Test that eviction trims the directory, least recently used first"""
+        cache = HighlightCache(str(tmp_path / "highlight"), max_size_mb=None)
+        cache._put("a" * 64, "x" * 100)
+        cache._put("b" * 64, "y" * 100)
+        old_entry = cache._entry_path("a" * 64)
+        os.utime(old_entry, (0, 0))
+
+        restarted = HighlightCache(str(tmp_path / "highlight"), max_size_mb=150 / 1024 / 1024)
+        assert restarted.evict() == 100
+        assert not old_entry.exists()
+        assert restarted._entry_path("b" * 64).exists()
+
+    def test_memory_bounded(self, tmp_path):
+        """Test that the in-memory copies are capped, least recently used first"""
+        cache = HighlightCache(str(tmp_path / "highlight"))
+        cache.memory_bytes = 10
+        cache._put("a" * 64, "x" * 6)
+        cache._put("b" * 64, "y" * 6)
+        assert list(cache._memory) == ["b" * 64]
+        assert cache._get("a" * 64) == "x" * 6  # read back from disk
+
+class TestIncludeCache:
+    """Test caching of markdown_include fragments"""
+
+    def test_hit_matches_uncached_output(self, tmp_path):
+        """Test that a fragment included by two documents is expanded once"""
+        (tmp_path / "note.md").write_text("Shared **note**\n")
+        cache = IncludeCache(str(tmp_path / "includes"))
+        first = "# One\n\n{!note.md!}\n"
+        second = "# Two\n\n{!note.md!}\n"
+
+        assert included(first, tmp_path, cache) == included(first, tmp_path)
+        assert included(second, tmp_path, cache) == included(second, tmp_path)
+        assert cache.stats() == {'hits': 1, 'misses': 1}
+
+        restarted = IncludeCache(str(tmp_path / "includes"))
+        assert included(first, tmp_path, restarted) == included(first, tmp_path)
+        assert restarted.stats() == {'hits': 1, 'misses': 0}
+
+    def test_nested_change_invalidates(self, tmp_path):
+        """Test that changing a file included by an included file is picked up"""
+        (tmp_path / "top.md").write_text("Top\n\n{!outer.md!}\n")
+        (tmp_path / "outer.md").write_text("Outer\n\n{!inner.md!}\n")
+        (tmp_path / "inner.md").write_text("Inner v1\n")
+        document = "{!top.md!}\n"
+        cache = IncludeCache(str(tmp_path / "includes"))
+        assert "Inner v1" in included(document, tmp_path, cache)
+
+        (tmp_path / "inner.md").write_text("Inner version 2\n")
+        html = included(document, tmp_path, cache)
+        assert "Inner version 2" in html
+        assert html == included(document, tmp_path)
+
+        # Entries list every file they were expanded from, however deeply included
+        entries = [json.loads(path.read_text()) for path in (tmp_path / "includes").rglob("*.json")]
+        assert sorted(len(entry['files']) for entry in entries) == [0, 0, 1, 2]
+
+    def test_nested_files_not_read_on_hit(self, tmp_path, monkeypatch):
+        """Test that a hit does not expand (or open) the files a fragment includes"""
+        import builtins
+        (tmp_path / "outer.md").write_text("Outer\n\n{!inner.md!}\n")
+        (tmp_path / "inner.md").write_text("Inner\n")
+        cache = IncludeCache(str(tmp_path / "includes"))
+        included("{!outer.md!}\n", tmp_path, cache)
+
+        opened = []
+        real_open = builtins.open
+        monkeypatch.setattr(builtins, "open", lambda path, *args, **kwargs: (
+            opened.append(os.path.basename(path)), real_open(path, *args, **kwargs))[1])
+        assert "Inner" in included("{!outer.md!}\n", tmp_path, cache)
+        assert "outer.md" in opened and "inner.md" not in opened
+
+
+class TestGeneratorMarkdownCache:
+    """Test generator() with the Markdown render caches"""
+
+    def test_same_output_with_cache(self, test_site, sample_config):
+        """Test that a build using the caches writes the same site as one without"""
+        from bestatic.generator import generator
+        from bestatic.report import BuildReport
+        with open("posts/code.md", "w") as f:
+            f.write("---\ntitle: Code\ndate: \"January 05, 2024\"\n---\n\n" + CODE)
+        uncached = {**sample_config, "markdown": {**sample_config["markdown"], "cache": False}}
+        generator(**uncached)
+        assert not os.path.exists(".bestatic-cache/markdown")
+        shutil.move("_output", "uncached")
+
+        generator(**sample_config)
+        shutil.rmtree("_output")
+        report = BuildReport()
+        generator(report=report, **sample_config)
+        assert report.data['caches']['highlight']['hits'] >= 1
+        assert report.data['caches']['highlight']['misses'] == 0
+
+        comparison = filecmp.dircmp("uncached", "_output")
+        pending = [comparison]
+        while pending:
+            current = pending.pop()
+            assert not current.left_only and not current.right_only
+            assert not filecmp.cmpfiles(current.left, current.right, current.common_files, shallow=False)[1]
+            pending.extend(current.subdirs.values())
@@ -0,0 +1,95 @@
+"""Tests for memory.py - Memory accounting per build phase"""
+import sys
+import tracemalloc
+
+from bestatic.memory import MemoryReport, deep_size, document_bytes
+from bestatic.tracing import PhaseTracer
+
+
+class Document:
+    def __init__(self, content):
+        self.content = content
+        self.metadata = {"title": "A title"}
+        self.shortcode_processor = "x" * 100000  # Shared, not counted
+
+
+class TestSizes:
+    """Test retained size estimates"""
+
+    def test_deep_size_counts_nested_strings(self):
+        """Test that referenced strings are included once"""
+        text = "y" * 10000
+        assert deep_size({"a": [text, text]}) >= 10000
+        assert deep_size({"a": [text, text]}) < 20000
+
+    def test_document_bytes_skips_shared(self):
+        """Test that shared attributes are not charged to every document"""
+        size = document_bytes(Document("z" * 5000))
+        assert 5000 < size < 100000
+
+
+class TestMemoryReport:
+    """Test per-phase numbers, allocation sites and documents"""
+
+    def test_phases(self):
+        """Test that a phase that allocates shows a higher peak and retained memory"""
+        report = MemoryReport(rss_interval=0.01)
+        tracer = PhaseTracer(on_phase=report.on_phase)
+        report.start()
+        tracer.mark("setup")
+        tracer.mark("parse")
+        held = [bytearray(1024) for _ in range(2000)]
+        temporary = bytearray(4 * 1024 * 1024)
+        del temporary
+        tracer.finish()
+        report.stop()
+
+        assert list(report.phases) == ["setup", "parse"]
+        parse = report.phases["parse"]
+        assert parse["peak"] >= 4 * 1024 * 1024
+        assert parse["retained"] >= 2000 * 1024
+        assert parse["retained"] < parse["peak"]
+        assert report.sites and report.sites[0][1] >= 2000 * 1024
+        assert "test_memory.py" in report.sites[0][0]
+        assert not tracemalloc.is_tracing()
+        del held
+
+    def test_format(self):
+        """Test the console report"""
+        report = MemoryReport(top=1)
+        report.start()
+        report.on_phase("render")
+        report.on_phase(None)
+        report.stop()
+        report.add_documents([("posts/a.md", Document("a" * 100)), ("posts/b.md", Document("b" * 9000))])
+
+        text = report.format()
+        assert "render" in text
+        assert "Documents: 2" in text
+        assert "posts/b.md" in text
+        assert "posts/a.md" not in text
+
+
+class TestMemoryReportOption:
+    """Test bestatic --memory-report"""
+
+    def test_memory_report_build(self, test_site, monkeypatch, capsys):
+        """Test that a build prints the memory report with its documents"""
+        from bestatic import bestatic as cli
+        monkeypatch.setattr(sys, "argv", ["bestatic", "--memory-report"])
+        monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+        cli.main()
+
+        output = capsys.readouterr().out
+        assert "Memory by phase" in output
+        assert "parse" in output
+        assert "Documents: 4" in output
+
+    def test_memory_report_low_memory(self, test_site, monkeypatch, capsys):
+        """Test that a low-memory build says why documents are not measured"""
+        from bestatic import bestatic as cli
+        monkeypatch.setattr(sys, "argv", ["bestatic", "--memory-report", "--low-memory"])
+        monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+        cli.main()
+
+        assert "Documents: not measured (low-memory builds" in capsys.readouterr().out
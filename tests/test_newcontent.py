@@ -119,6 +119,20 @@ class TestNewPost:
         assert posts_dir.is_dir()
 
 
+    def test_metadata_and_content_overrides(self, tmp_path):
+        """Test that frontmatter fields and the body can be supplied"""
+        os.chdir(tmp_path)
+        
+        newpost("custom", "%B %d, %Y", metadata={'title': "Custom", 'tags': "a, b"}, content="Body text")
+        
+        with open(tmp_path / "posts" / "custom.md", 'r') as f:
+            post = frontmatter.load(f)
+        assert post.metadata['title'] == "Custom"
+        assert post.metadata['tags'] == "a, b"
+        assert post.metadata['slug'] == "custom"
+        assert post.content == "Body text"
+
+
 class TestNewPage:
     """Test page creation functionality"""
     
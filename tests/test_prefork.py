@@ -0,0 +1,76 @@
+"""Tests for prefork.py - Multi-process server mode"""
+import os
+import time
+import signal
+import socket
+import pytest
+import requests
+
+from bestatic.prefork import WorkerSupervisor, reuse_port_supported
+
+pytestmark = pytest.mark.skipif(not reuse_port_supported(), reason="SO_REUSEPORT is not available")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return requests.get(url, timeout=2)
+        except requests.exceptions.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / "index.html").write_text("<html><body>Workers</body></html>")
+    return tmp_path
+
+
+class TestWorkerSupervisor:
+    """Test starting, restarting and stopping server workers"""
+
+    @pytest.mark.parametrize("backend", ["threaded", "asyncio"])
+    def test_workers_serve_and_restart(self, site, backend):
+        """Test that all workers serve the port and a killed worker is replaced"""
+        port = free_port()
+        supervisor = WorkerSupervisor(str(site), port, 2, backend=backend)
+        supervisor.start()
+        try:
+            assert "Workers" in wait_for(f"http://127.0.0.1:{port}/").text
+            pids = [process.pid for process in supervisor.processes]
+            assert len(set(pids)) == 2
+
+            os.kill(pids[0], signal.SIGKILL)
+            supervisor.processes[0].join(5)
+            assert supervisor.check() is True
+            assert supervisor.processes[0].pid != pids[0]
+            assert supervisor.processes[0].is_alive()
+            assert wait_for(f"http://127.0.0.1:{port}/").status_code == 200
+        finally:
+            supervisor.stop()
+        assert not any(process.is_alive() for process in supervisor.processes)
+
+    def test_gives_up_on_crash_loop(self, site, capsys):
+        """Test that workers failing over and over (port taken) stop the supervisor"""
+        with socket.socket() as taken:
+            taken.bind(("", 0))
+            taken.listen()
+            supervisor = WorkerSupervisor(str(site), taken.getsockname()[1], 1, max_restarts=2)
+            supervisor.start()
+            try:
+                results = []
+                for _ in range(4):
+                    supervisor.processes[0].join(5)
+                    results.append(supervisor.check())
+                assert results[-1] is False
+                assert "keep exiting" in capsys.readouterr().out
+            finally:
+                supervisor.stop()
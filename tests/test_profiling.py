@@ -0,0 +1,90 @@
+"""Tests for profiling.py - Build profiling with cProfile and stack samples"""
+import sys
+import time
+import pstats
+import pytest
+
+from bestatic.profiling import BuildProfiler
+from bestatic.tracing import PhaseTracer
+
+
+def busy_parse(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def busy_render(seconds):
+    busy_parse(seconds)
+
+
+class TestBuildProfiler:
+    """Test profiles, collapsed stacks and phase selection"""
+
+    def test_whole_build(self, tmp_path):
+        """Test that both output files are written for an unrestricted profile"""
+        profiler = BuildProfiler(interval=0.001)
+        profiler.start()
+        busy_render(0.1)
+        profiler.stop()
+        pstats_path, collapsed_path = profiler.write(str(tmp_path / "build"))
+
+        stats = pstats.Stats(pstats_path)
+        assert any(name == "busy_render" for _, _, name in stats.stats)
+        lines = open(collapsed_path).read().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert "busy_render (test_profiling.py:" in stack
+        assert stack.index("busy_render") < stack.index("busy_parse")
+
+    def test_phase_only(self, tmp_path):
+        """Test that only the selected phase is profiled"""
+        profiler = BuildProfiler(phase="render", interval=0.001)
+        tracer = PhaseTracer(on_phase=profiler.on_phase)
+        profiler.start()
+        tracer.mark("parse")
+        busy_parse(0.05)
+        tracer.mark("render pages")
+        busy_render(0.05)
+        tracer.finish()
+        busy_parse(0.05)
+        profiler.stop()
+        pstats_path, collapsed_path = profiler.write(str(tmp_path / "render"))
+
+        names = {name for _, _, name in pstats.Stats(pstats_path).stats}
+        assert "busy_render" in names
+        callers = pstats.Stats(pstats_path).stats
+        parse_calls = [value for key, value in callers.items() if key[2] == "busy_parse"]
+        assert parse_calls[0][0] == 1  # Only the call made by busy_render
+        # Samples from the phase boundaries (inside tracer.mark()/finish()) are
+        # in the phase too, but nothing from the parse calls outside it
+        lines = open(collapsed_path).read().splitlines()
+        assert any("busy_render" in line for line in lines)
+        assert not [line for line in lines if "busy_parse" in line and "busy_render" not in line]
+
+    def test_phase_never_runs(self, tmp_path):
+        """Test that an empty profile is reported instead of failing"""
+        profiler = BuildProfiler(phase="feeds")
+        profiler.start()
+        busy_parse(0.01)
+        profiler.stop()
+
+        pstats_path, collapsed_path = profiler.write(str(tmp_path / "feeds"))
+        assert pstats_path is None
+        assert open(collapsed_path).read() == ""
+
+
+class TestProfileOption:
+    """Test bestatic --profile"""
+
+    def test_profile_build(self, test_site, monkeypatch, capsys):
+        """Test that a profiled build writes both files"""
+        from bestatic import bestatic as cli
+        monkeypatch.setattr(sys, "argv", ["bestatic", "--profile", "build", "--profile-phase", "parse"])
+        monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+        cli.main()
+
+        assert (test_site / "build.pstats").exists()
+        assert (test_site / "build.collapsed").exists()
+        assert "Profile written to build.pstats and build.collapsed" in capsys.readouterr().out
@@ -0,0 +1,133 @@
+"""
+Tests for publish module (staged builds published atomically).
+"""
+
+import os
+import pytest
+
+from bestatic.publish import StagedOutput
+
+
+@pytest.fixture
+def publisher(tmp_path):
+    """StagedOutput working inside tmp_path"""
+    return StagedOutput(str(tmp_path / "_output"), str(tmp_path / ".bestatic-builds"), grace=0)
+
+
+def build(publisher, content):
+    staging = publisher.begin()
+    with open(os.path.join(staging, "index.html"), "w") as f:
+        f.write(content)
+    publisher.publish(staging)
+    return staging
+
+
+class TestStagedOutput:
+    """Test staging and publishing generations."""
+    
+    def test_nothing_published(self, publisher):
+        """Test that there is no current generation before the first build"""
+        assert publisher.current() is None
+    
+    def test_publish_creates_symlink(self, publisher, tmp_path):
+        """Test that the output path points at the published generation"""
+        staging = build(publisher, "v1")
+        
+        assert os.path.islink(tmp_path / "_output")
+        assert (tmp_path / "_output" / "index.html").read_text() == "v1"
+        assert os.path.samefile(publisher.current(), staging)
+    
+    def test_symlink_target_is_relative(self, publisher, tmp_path):
+        """Test that the link survives moving the project directory"""
+        build(publisher, "v1")
+        
+        assert not os.path.isabs(os.readlink(tmp_path / "_output"))
+    
+    def test_republish_swaps_content(self, publisher, tmp_path):
+        """Test that a new generation replaces the old one"""
+        build(publisher, "v1")
+        build(publisher, "v2")
+        
+        assert (tmp_path / "_output" / "index.html").read_text() == "v2"
+    
+    def test_open_file_survives_swap(self, publisher, tmp_path):
+        """Test that a file opened before a swap can still be read"""
+        build(publisher, "v1")
+        with open(tmp_path / "_output" / "index.html") as f:
+            build(publisher, "v2")
+            build(publisher, "v3")
+            assert f.read() == "v1"
+    
+    def test_old_generations_cleaned_up(self, publisher):
+        """Test that only the newest generations are kept"""
+        for version in range(5):
+            build(publisher, f"v{version}")
+        
+        assert len(publisher.generations()) == 2
+        assert os.path.samefile(publisher.generations()[-1], publisher.current())
+    
+    def test_recently_retired_generations_kept(self, tmp_path):
+        """Test that generations retired within the grace period are not deleted"""
+        publisher = StagedOutput(str(tmp_path / "_output"), grace=60)
+        for version in range(4):
+            build(publisher, f"v{version}")
+        assert len(publisher.generations()) == 4
+        
+        for path in publisher.generations()[:2]:
+            os.utime(path, (0, 0))
+        build(publisher, "v4")
+        
+        assert len(publisher.generations()) == 3
+        assert os.path.samefile(publisher.generations()[-1], publisher.current())
+    
+    def test_plain_directory_is_migrated(self, publisher, tmp_path):
+        """Test that an existing output directory is replaced by the first publish"""
+        (tmp_path / "_output").mkdir()
+        (tmp_path / "_output" / "old.html").write_text("old")
+        
+        build(publisher, "v1")
+        
+        assert os.path.islink(tmp_path / "_output")
+        assert not (tmp_path / "_output" / "old.html").exists()
+    
+    def test_discard(self, publisher):
+        """Test that a failed build's staging directory is removed"""
+        staging = publisher.begin()
+        publisher.discard(staging)
+        
+        assert not os.path.exists(staging)
+        assert publisher.current() is None
+    
+    def test_unpublish(self, publisher, tmp_path):
+        """Test that the published generation becomes a plain directory again"""
+        build(publisher, "v1")
+        build(publisher, "v2")
+        
+        publisher.unpublish()
+        
+        assert not os.path.islink(tmp_path / "_output")
+        assert (tmp_path / "_output" / "index.html").read_text() == "v2"
+        assert not (tmp_path / ".bestatic-builds").exists()
+    
+    def test_generations_next_to_output(self, tmp_path):
+        """Test that generations default to a sibling of the published path"""
+        deploy = tmp_path / "deploy" / "site"
+        deploy.parent.mkdir()
+        publisher = StagedOutput(str(deploy) + os.sep)
+        build(publisher, "v1")
+        
+        assert publisher.builds_dir == str(tmp_path / "deploy" / ".site-builds")
+        assert os.path.samefile(os.path.dirname(publisher.current()), tmp_path / "deploy" / ".site-builds")
+        assert StagedOutput("_output").builds_dir == "._output-builds"
+    
+    def test_rename_fallback(self, publisher, tmp_path, monkeypatch):
+        """Test publishing where symlinks cannot be created"""
+        def no_symlink(*args, **kwargs):
+            raise OSError("symlinks not supported")
+        monkeypatch.setattr(os, "symlink", no_symlink)
+        
+        build(publisher, "v1")
+        build(publisher, "v2")
+        
+        assert not os.path.islink(tmp_path / "_output")
+        assert (tmp_path / "_output" / "index.html").read_text() == "v2"
@@ -0,0 +1,97 @@
+"""Tests for rebuild.py - Debounced rebuild scheduling"""
+import time
+import threading
+import pytest
+
+from bestatic.rebuild import RebuildScheduler, file_signature
+
+
+@pytest.fixture
+def scheduler():
+    """Scheduler with a short debounce that records its batches"""
+    batches = []
+    done = threading.Event()
+
+    def rebuild(paths):
+        batches.append(set(paths))
+        done.set()
+
+    scheduler = RebuildScheduler(rebuild, debounce=0.1)
+    scheduler.batches = batches
+    scheduler.done = done
+    scheduler.start()
+    yield scheduler
+    scheduler.stop(timeout=2)
+
+
+class TestRebuildScheduler:
+    """Test coalescing, no-op detection and failure handling"""
+
+    def test_burst_coalesced(self, scheduler, tmp_path):
+        """Test that several events in the window become one rebuild"""
+        post = tmp_path / "post.md"
+        post.write_text("one")
+        scheduler.notify(str(post))
+        post.write_text("two")
+        scheduler.notify(str(post))
+        (tmp_path / "new.md").write_text("new")
+        scheduler.notify(str(tmp_path / "new.md"))
+
+        assert scheduler.done.wait(2)
+        time.sleep(0.2)
+        assert scheduler.batches == [{str(post), str(tmp_path / "new.md")}]
+
+    def test_unchanged_content_ignored(self, scheduler, tmp_path):
+        """Test that a save with identical content does not rebuild"""
+        page = tmp_path / "page.md"
+        page.write_text("same")
+        scheduler.prime([str(tmp_path)])
+
+        page.write_text("same")
+        assert scheduler.notify(str(page)) is False
+        time.sleep(0.25)
+        assert scheduler.batches == []
+
+        page.unlink()
+        assert scheduler.notify(str(page)) is True
+        assert scheduler.done.wait(2)
+
+    def test_failed_build_keeps_running(self, tmp_path, capsys):
+        """Test that an exception in a build is reported and later builds still run"""
+        calls = []
+        ready = threading.Event()
+
+        def rebuild(paths):
+            calls.append(paths)
+            if len(calls) == 1:
+                raise ValueError("broken template")
+            ready.set()
+
+        scheduler = RebuildScheduler(rebuild, debounce=0.05)
+        scheduler.start()
+        try:
+            target = tmp_path / "a.md"
+            target.write_text("1")
+            scheduler.notify(str(target))
+            time.sleep(0.2)
+            target.write_text("2")
+            scheduler.notify(str(target))
+            assert ready.wait(2)
+        finally:
+            scheduler.stop(timeout=2)
+
+        output = capsys.readouterr()
+        assert "Rebuild failed" in output.out
+        assert "broken template" in output.err
+        assert scheduler.builds == 1
+
+    def test_file_signature(self, tmp_path):
+        """Test signatures of small, missing and large files"""
+        small = tmp_path / "small.txt"
+        small.write_text("abc")
+        assert file_signature(str(small))[0] == "hash"
+        assert file_signature(str(tmp_path / "missing")) is None
+
+        large = tmp_path / "large.bin"
+        large.write_bytes(b"x" * (1024 * 1024 + 1))
+        assert file_signature(str(large))[0] == "stat"
@@ -0,0 +1,125 @@
+"""Tests for report.py - Machine-readable build reports"""
+import sys
+import json
+import logging
+import warnings
+
+from bestatic.report import BuildReport, FieldUsage, output_files_by_type
+
+
+class TestOutputFiles:
+    """Test counting output files per type"""
+
+    def test_by_type(self, tmp_path):
+        """Test that files are grouped by extension with their sizes"""
+        (tmp_path / "a.html").write_text("x" * 10)
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.HTML").write_text("x" * 5)
+        (tmp_path / "sub" / "style.css").write_text("x" * 3)
+        (tmp_path / "CNAME").write_text("x")
+
+        by_type = output_files_by_type(str(tmp_path))
+
+        assert by_type[".html"] == {"files": 2, "bytes": 15}
+        assert by_type[".css"] == {"files": 1, "bytes": 3}
+        assert by_type[""] == {"files": 1, "bytes": 1}
+        assert list(by_type)[0] == ".html"
+
+
+class TestCapture:
+    """Test recording warnings during a build"""
+
+    def test_warnings_and_log_records(self, monkeypatch):
+        """Test that warnings.warn() and bestatic log warnings are recorded, repeats included"""
+        shown = []
+        monkeypatch.setattr(warnings, "showwarning", lambda message, *args, **kwargs: shown.append(str(message)))
+        report = BuildReport()
+        with report.capture():
+            for _ in range(2):
+                warnings.warn("Unknown shortcode 'gallery', keeping original content")
+            logging.getLogger("bestatic.imageprocessor").warning("Large image detected")
+            logging.getLogger("bestatic.imageprocessor").info("Converted")
+            report.warning("generator", "Image processing failed")
+
+        assert [entry["source"] for entry in report.warnings] == \
+            ["UserWarning", "UserWarning", "bestatic.imageprocessor", "generator"]
+        assert "Unknown shortcode 'gallery'" in report.warnings[0]["message"]
+        assert len(shown) == 1
+        assert not logging.getLogger("bestatic").handlers
+
+
+class TestFieldUsage:
+    """Test counting document field reads"""
+
+    def test_templates_and_phases(self):
+        """Test that reads inside a template count for it and others for the running phase"""
+        usage = FieldUsage()
+        usage.record("metadata")
+        usage.on_phase("render posts")
+        with usage.template("post.html.jinja2"):
+            usage.record("content")
+            usage.record("title")
+            usage.record("title")
+        usage.record("slug")
+        usage.computed("content")
+
+        assert usage.to_dict() == {
+            "templates": {"post.html.jinja2": {"content": 1, "title": 2}},
+            "phases": {"build": {"metadata": 1}, "render posts": {"slug": 1}},
+            "computed": {"content": 1},
+        }
+
+
+class TestGeneratorReport:
+    """Test the report generator() fills in"""
+
+    def test_build_report(self, test_site, sample_config):
+        """Test documents, output, caches, phases and slowest files of a build"""
+        from bestatic.generator import generator
+        report = BuildReport(slowest=2)
+        with report.capture():
+            generator(report=report, **sample_config)
+        data = report.to_dict()
+
+        assert data["documents"] == {"posts": 2, "pages": 2}
+        assert data["output"]["by_type"][".html"]["files"] >= 5
+        assert data["output"]["files"] == sum(entry["files"] for entry in data["output"]["by_type"].values())
+        assert data["caches"]["documents"]["misses"] == 4
+        assert data["caches"]["feeds"]["written"] == 1
+        assert {"parse", "render posts", "feeds"} <= set(data["phases"])
+        assert data["duration"] >= sum(data["phases"].values()) * 0.99
+        assert len(data["slowest"]) == 2
+        assert set(data["slowest"][0]["phases"]) == {"parse", "render"}
+        assert data["images"] is None
+        assert "content" in data["fields"]["templates"]["post.html.jinja2"]
+        json.dumps(data)
+
+    def test_warm_rebuild_hit_rates(self, test_site, sample_config):
+        """Test that an unchanged rebuild reports reused documents and feeds"""
+        from bestatic.generator import generator
+        from bestatic.session import BuildSession
+        session = BuildSession()
+        generator(session=session, **sample_config)
+        report = BuildReport()
+        generator(session=session, report=report, **sample_config)
+
+        assert report.data["caches"]["documents"] == {"hits": 4, "misses": 0, "hit_rate": 1.0}
+        assert report.data["caches"]["feeds"]["hit_rate"] == 1.0
+
+
+class TestReportOption:
+    """Test bestatic --report"""
+
+    def test_report_written(self, test_site, monkeypatch, capsys):
+        """Test that a build with --report writes the JSON report"""
+        from bestatic import bestatic as cli
+        monkeypatch.setattr(sys, "argv", ["bestatic", "--report", "reports/build.json"])
+        monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+        cli.main()
+
+        with open(test_site / "reports" / "build.json") as f:
+            data = json.load(f)
+        assert data["version"] == 1
+        assert data["documents"]["posts"] == 2
+        assert isinstance(data["warnings"], list)
+        assert "Build report written to reports/build.json" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+"""
+Tests for responsiveimages module (srcset from the image variant manifest).
+"""
+
+import os
+import yaml
+import pytest
+import frontmatter
+from markdown import markdown
+from PIL import Image
+
+from bestatic.responsiveimages import (ResponsiveImagesExtension, lookup_variants,
+                                       make_srcset_helper, srcset_value)
+
+
+MANIFEST = {
+    'static-content/photo.jpg': [
+        {'url': '/static-content/photo.webp', 'width': 1600, 'height': 800},
+        {'url': '/static-content/photo-480w.webp', 'width': 480, 'height': 240},
+    ]
+}
+
+
+class TestLookup:
+    """Test resolving image references against the manifest."""
+    
+    def test_root_relative_src(self):
+        """Test a root-relative image path"""
+        assert lookup_variants(MANIFEST, '/static-content/photo.jpg') == MANIFEST['static-content/photo.jpg']
+    
+    def test_site_url_src(self):
+        """Test an absolute URL under the site URL"""
+        variants = lookup_variants(MANIFEST, 'https://example.org/static-content/photo.jpg', 'https://example.org')
+        assert variants == MANIFEST['static-content/photo.jpg']
+    
+    def test_external_src(self):
+        """Test that external images are ignored"""
+        assert lookup_variants(MANIFEST, 'https://cdn.example.com/static-content/photo.jpg') is None
+    
+    def test_unknown_src(self):
+        """Test images without variants"""
+        assert lookup_variants(MANIFEST, '/static-content/other.jpg') is None
+    
+    def test_srcset_value(self):
+        """Test srcset formatting"""
+        assert srcset_value(MANIFEST['static-content/photo.jpg']) == \
+            '/static-content/photo.webp 1600w, /static-content/photo-480w.webp 480w'
+
+
+class TestMarkdownExtension:
+    """Test the Markdown treeprocessor."""
+    
+    def test_adds_srcset_and_sizes(self):
+        """Test that images with variants get srcset and sizes"""
+        html = markdown('![Photo](/static-content/photo.jpg)',
+                        extensions=[ResponsiveImagesExtension(manifest=MANIFEST, sizes='50vw')])
+        
+        assert 'srcset="/static-content/photo.webp 1600w, /static-content/photo-480w.webp 480w"' in html
+        assert 'sizes="50vw"' in html
+    
+    def test_leaves_other_images(self):
+        """Test that images without variants are untouched"""
+        html = markdown('![Other](/static-content/other.jpg)',
+                        extensions=[ResponsiveImagesExtension(manifest=MANIFEST)])
+        
+        assert 'srcset' not in html
+
+
+class TestJinjaHelper:
+    """Test the srcset Jinja global."""
+    
+    def test_helper(self):
+        """Test helper output for known and unknown images"""
+        srcset = make_srcset_helper(MANIFEST)
+        
+        assert '480w' in srcset('/static-content/photo.jpg')
+        assert srcset('/static-content/other.jpg') == ''
+
+
+class TestGeneratorIntegration:
+    """Test srcset output from a full build."""
+    
+    def test_post_image_gets_srcset(self, test_site, sample_config):
+        """Test that a post image referencing a converted image gets srcset"""
+        from bestatic.generator import generator
+        
+        images_dir = test_site / "static-content"
+        images_dir.mkdir()
+        Image.new('RGB', (1200, 600), color='purple').save(str(images_dir / "hero.jpg"), 'JPEG')
+        
+        post = frontmatter.Post("![Hero](/static-content/hero.jpg)", title='Image Post',
+                                date='February 01, 2024', slug='image-post')
+        (test_site / "posts" / "image-post.md").write_text(frontmatter.dumps(post))
+        
+        config = {**sample_config,
+                  'image_processing': {'enabled': True, 'workers': 1, 'widths': [400]}}
+        generator(**config)
+        
+        html = (test_site / "_output" / "post" / "image-post" / "index.html").read_text()
+        assert 'srcset="/static-content/hero.webp 1200w, /static-content/hero-400w.webp 400w"' in html
+        assert 'src="/static-content/hero.webp"' in html
+        assert (test_site / "_output" / "image-variants.json").exists()
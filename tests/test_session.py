@@ -0,0 +1,157 @@
+"""Tests for session.py - Warm build state across rebuilds"""
+import os
+import pytest
+
+from bestatic.session import BuildSession
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("one")
+    return path
+
+
+def parse(path):
+    with open(path) as f:
+        return {"text": f.read()}
+
+
+class TestBuildSession:
+    """Test document, file and converter reuse"""
+
+    def test_unchanged_document_reused(self, document):
+        """Test that a document is parsed once while its file is unchanged"""
+        session = BuildSession()
+        first = session.document(str(document), "key", parse)
+        second = session.document(str(document), "key", parse)
+
+        assert first is second
+        assert session.stats == {'parsed': 1, 'reused': 1}
+
+    def test_changed_document_parsed_again(self, document):
+        """Test that editing the file invalidates the document"""
+        session = BuildSession()
+        session.document(str(document), "key", parse)
+        document.write_text("two, longer")
+
+        assert session.document(str(document), "key", parse)["text"] == "two, longer"
+
+    def test_changed_key_parsed_again(self, document):
+        """Test that different settings invalidate the document"""
+        session = BuildSession()
+        first = session.document(str(document), "key", parse)
+
+        assert session.document(str(document), "other", parse) is not first
+
+    def test_apply_changes_drops_document(self, document):
+        """Test that a reported change forces a parse even with the same stat"""
+        session = BuildSession()
+        first = session.document(str(document), "key", parse)
+        session.apply_changes([str(document)])
+
+        assert session.document(str(document), "key", parse) is not first
+
+    def test_shortcode_change_drops_everything(self, document, tmp_path, monkeypatch):
+        """Test that editing a shortcode invalidates all documents and the registry"""
+        monkeypatch.chdir(tmp_path)
+        session = BuildSession()
+        first = session.document(str(document), "key", parse)
+        registry = session.shortcodes(object)
+        session.apply_changes([str(tmp_path / "_shortcodes" / "note.py")])
+
+        assert session.document(str(document), "key", parse) is not first
+        assert session.shortcodes(object) is not registry
+
+    def test_include_change_drops_documents(self, document, tmp_path, monkeypatch):
+        """Test that editing an included fragment invalidates all documents but not the registry"""
+        monkeypatch.chdir(tmp_path)
+        session = BuildSession()
+        first = session.document(str(document), "key", parse)
+        registry = session.shortcodes(object)
+        session.apply_changes([str(tmp_path / "_includes" / "note.md")])
+
+        assert session.document(str(document), "key", parse) is not first
+        assert session.shortcodes(object) is registry
+
+    def test_load_file(self, tmp_path):
+        """Test that data files are loaded again only when changed"""
+        data = tmp_path / "data.yaml"
+        data.write_text("a")
+        session = BuildSession()
+        calls = []
+
+        def loader(path):
+            calls.append(path)
+            return len(calls)
+
+        assert session.load_file(str(data), loader) == 1
+        assert session.load_file(str(data), loader) == 1
+        data.write_text("ab")
+        assert session.load_file(str(data), loader) == 2
+
+    def test_converter_and_environment_reused(self):
+        """Test that converters and the environment are created once per key"""
+        session = BuildSession()
+
+        assert session.converter("md", object) is session.converter("md", object)
+        assert session.converter("md", object) is not session.converter("other", object)
+        environment = session.environment("themes/a", object)
+        assert session.environment("themes/a", object) is environment
+        assert session.environment("themes/b", object) is not environment
+
+
+class TestWarmRebuild:
+    """Test generator() builds sharing a session"""
+
+    def test_rebuild_reparses_only_changed_post(self, test_site, sample_config):
+        """Test that a rebuild reuses unchanged posts and pages and picks up the edit"""
+        from bestatic.generator import generator
+        session = BuildSession()
+        generator(session=session, **sample_config)
+        documents = session.stats['parsed']
+
+        post = test_site / "posts" / "first-post.md"
+        post.write_text(post.read_text().replace("first post", "edited post") + "\n")
+        session.apply_changes([str(post)])
+        generator(session=session, **sample_config)
+
+        assert session.stats == {'parsed': 1, 'reused': documents - 1}
+        html = (test_site / "_output" / "post" / "first-post" / "index.html").read_text()
+        assert "edited post" in html
+
+    def test_include_change_rerenders_including_pages(self, test_site, sample_config):
+        """Test that editing an included fragment updates the documents that include it"""
+        from bestatic.generator import generator
+        includes = test_site / "_includes"
+        includes.mkdir(exist_ok=True)
+        (includes / "note.md").write_text("Old fragment text\n")
+        post = test_site / "posts" / "first-post.md"
+        post.write_text(post.read_text() + "\n{!note.md!}\n")
+        config = {**sample_config, "markdown": {
+            **sample_config["markdown"],
+            "extensions": sample_config["markdown"]["extensions"] + ["markdown_include.include"],
+            "extension_configs": {**sample_config["markdown"]["extension_configs"],
+                                  "markdown_include.include": {"base_path": "./_includes"}}}}
+        session = BuildSession()
+        generator(session=session, **config)
+        html = test_site / "_output" / "post" / "first-post" / "index.html"
+        assert "Old fragment text" in html.read_text()
+
+        (includes / "note.md").write_text("New fragment text\n")
+        session.apply_changes([str(includes / "note.md")])
+        generator(session=session, **config)
+
+        assert "New fragment text" in html.read_text()
+        assert "Old fragment text" not in html.read_text()
+
+    def test_config_change_reparses(self, test_site, sample_config):
+        """Test that different Markdown settings are not served from the session"""
+        from bestatic.generator import generator
+        session = BuildSession()
+        generator(session=session, **sample_config)
+
+        sample_config["summary_length"] = 5
+        generator(session=session, **sample_config)
+
+        assert session.stats['reused'] == 0
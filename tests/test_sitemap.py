@@ -1,12 +1,14 @@
 """Tests for bestaticSitemap.py - Sitemap XML generation"""
 import os
+import datetime
 import pytest
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from bestatic.bestaticSitemap import (
     get_last_modified_time,
     find_single_index_folders,
-    generate_sitemap
+    generate_sitemap,
+    write_sitemap
 )
 
 
@@ -319,3 +321,69 @@ class TestSitemapXMLValidity:
         # Should parse without errors
         tree = ET.parse(sitemap_file)
         assert tree is not None
+
+
+class TestSitemapWriter:
+    """Test the streaming sitemap writer"""
+    
+    NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+    
+    def test_single_file(self, tmp_path):
+        """Test that small sites get a single urlset in sitemap.xml"""
+        files = write_sitemap("https://example.com", [("", None), ("about", datetime.date(2024, 1, 2))],
+                              str(tmp_path))
+        
+        assert files == ["sitemap.xml"]
+        root = ET.parse(tmp_path / "sitemap.xml").getroot()
+        locs = [loc.text for loc in root.iter(f"{self.NS}loc")]
+        assert locs == ["https://example.com/", "https://example.com/about"]
+        assert [m.text for m in root.iter(f"{self.NS}lastmod")] == ["2024-01-02"]
+    
+    def test_split_into_index(self, tmp_path):
+        """Test splitting into several files with a sitemap index"""
+        entries = [(f"page{i}", None) for i in range(5)]
+        files = write_sitemap("https://example.com", entries, str(tmp_path), max_urls=2)
+        
+        assert files == ["sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"]
+        index = ET.parse(tmp_path / "sitemap.xml").getroot()
+        assert index.tag == f"{self.NS}sitemapindex"
+        assert [loc.text for loc in index.iter(f"{self.NS}loc")] == \
+            [f"https://example.com/sitemap-{i}.xml" for i in (1, 2, 3)]
+        assert len(ET.parse(tmp_path / "sitemap-3.xml").getroot()) == 1
+    
+    def test_gzip(self, tmp_path):
+        """Test gzip-compressed URL sets"""
+        import gzip
+        write_sitemap("https://example.com", [("a", None)], str(tmp_path), gzip=True)
+        
+        with gzip.open(tmp_path / "sitemap-1.xml.gz", "rt", encoding="utf-8") as f:
+            assert "https://example.com/a" in f.read()
+        index = ET.parse(tmp_path / "sitemap.xml").getroot()
+        assert index.tag == f"{self.NS}sitemapindex"
+    
+    def test_escapes_urls(self, tmp_path):
+        """Test that special characters are escaped"""
+        write_sitemap("https://example.com", [("q&a", None)], str(tmp_path))
+        
+        root = ET.parse(tmp_path / "sitemap.xml").getroot()
+        assert next(root.iter(f"{self.NS}loc")).text == "https://example.com/q&a"
+
+
+class TestSitemapFromBuild:
+    """Test the sitemap written by generator()"""
+    
+    NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+    
+    def test_lastmod_from_frontmatter(self, test_site, sample_config):
+        """Test that post lastmod comes from the frontmatter date"""
+        from bestatic.generator import generator
+        generator(**sample_config)
+        
+        root = ET.parse(test_site / "_output" / "sitemap.xml").getroot()
+        entries = {url.findtext(f"{self.NS}loc"): url.findtext(f"{self.NS}lastmod")
+                   for url in root.iter(f"{self.NS}url")}
+        
+        assert entries["http://example.org/post/first-post"] == "2024-01-01"
+        assert entries["http://example.org/post/second-post"] == "2024-01-15"
+        assert entries["http://example.org/post/tags/python"] == "2024-01-15"
+        assert "http://example.org/about" in entries
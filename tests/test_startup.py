@@ -0,0 +1,67 @@
+"""Tests for CLI startup cost - each subcommand imports only what it uses"""
+import os
+import sys
+import subprocess
+import pytest
+
+import bestatic
+
+# Run the subprocesses against this checkout, installed or not
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(bestatic.__file__)))
+
+# Heavy dependencies of the build, watch and serve paths
+BUILD_MODULES = {"jinja2", "markdown", "bs4", "pymdownx", "PIL", "pytz", "chardet"}
+WATCH_MODULES = {"watchdog.observers", "multiprocessing"}
+SERVER_MODULES = {"http.server", "asyncio"}
+
+# Subcommand -> (modules it must not import, budget in ms for the imports it adds)
+# The budgets are generous so slow CI machines pass; they catch a heavy import
+# creeping back into startup, not small regressions
+STARTUP_BUDGETS = {
+    "version": (BUILD_MODULES | WATCH_MODULES | SERVER_MODULES | {"yaml", "frontmatter", "bestatic.generator"}, 150),
+    "newpost": (BUILD_MODULES | WATCH_MODULES | SERVER_MODULES | {"bestatic.generator"}, 400),
+    "newpage": (BUILD_MODULES | WATCH_MODULES | SERVER_MODULES | {"bestatic.generator"}, 400),
+}
+
+
+def import_times(code, cwd):
+    """Run code under -X importtime; returns {module: self time in microseconds}"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = int(self_time)
+    return times
+
+
+def run_subcommand(action, cwd):
+    code = ("import sys; sys.argv = ['bestatic', %r, 'startup-check']; "
+            "from bestatic.bestatic import main; main()" % action)
+    return import_times(code, cwd)
+
+
+class TestStartupBudget:
+    """Test that subcommands stay cheap to start"""
+
+    @pytest.mark.parametrize("action", sorted(STARTUP_BUDGETS))
+    def test_subcommand_imports(self, action, tmp_path):
+        """Test that a subcommand avoids unrelated imports and stays within its budget"""
+        forbidden, budget_ms = STARTUP_BUDGETS[action]
+        baseline = import_times("pass", tmp_path)
+        times = run_subcommand(action, tmp_path)
+
+        assert sorted(forbidden & set(times)) == []
+        added_ms = sum(time for name, time in times.items() if name not in baseline) / 1000
+        assert added_ms < budget_ms, f"'{action}' imports took {added_ms:.0f} ms (budget {budget_ms} ms)"
+
+    def test_generator_defers_optional_subsystems(self, tmp_path):
+        """Test that importing the builder does not load feeds or image processing"""
+        times = import_times("import bestatic.generator", tmp_path)
+
+        assert not {"bestatic.feeds", "bestatic.imageprocessor", "PIL", "pytz", "jinja2"} & set(times)
@@ -0,0 +1,97 @@
+"""Tests for tracing.py - Build phase timing"""
+import sys
+import json
+import time
+import pytest
+
+from bestatic.tracing import PhaseTracer
+
+
+class TestPhaseTracer:
+    """Test phase marks, nested spans and totals"""
+
+    def test_marks_close_previous_phase(self):
+        """Test that each mark ends the phase before it"""
+        tracer = PhaseTracer()
+        tracer.mark("parse")
+        tracer.mark("render")
+        tracer.finish()
+
+        assert [name for name, start, end in tracer.spans] == ["parse", "render"]
+        assert tracer.spans[0][2] == tracer.spans[1][1]
+
+    def test_repeated_phase_is_summed(self):
+        """Test that totals add up a phase that occurs twice"""
+        tracer = PhaseTracer()
+        tracer.mark("render")
+        time.sleep(0.01)
+        tracer.mark("taxonomies")
+        tracer.mark("render")
+        time.sleep(0.01)
+        tracer.finish()
+
+        totals = tracer.totals()
+        assert list(totals) == ["render", "taxonomies"]
+        assert totals["render"] >= 0.02
+
+    def test_nested_phase(self):
+        """Test timing a span with the context manager"""
+        tracer = PhaseTracer()
+        with tracer.phase("feeds"):
+            pass
+
+        assert "feeds" in tracer.totals()
+
+    def test_generator_reports_phases(self, test_site, sample_config):
+        """Test that a build records its main phases"""
+        from bestatic.generator import generator
+        tracer = PhaseTracer()
+        generator(tracer=tracer, **sample_config)
+
+        assert {"assets", "parse", "render posts", "render pages", "sitemap", "feeds"} <= set(tracer.totals())
+        assert {kind for kind, path, start, end in tracer.items} == {"parse", "render"}
+        assert any(path.endswith("first-post.md") for kind, path, start, end in tracer.items)
+
+    def test_slowest(self):
+        """Test that files are ranked by their combined parse and render time"""
+        tracer = PhaseTracer()
+        start = tracer.now()
+        tracer.items = [("parse", "a.md", start, start + 0.002), ("render", "a.md", start, start + 0.002),
+                        ("parse", "b.md", start, start + 0.003)]
+
+        assert [path for path, total, kinds in tracer.slowest(2)] == ["a.md", "b.md"]
+        assert tracer.slowest(1)[0][2] == pytest.approx({"parse": 0.002, "render": 0.002})
+        assert "a.md" in tracer.format_slowest(1)
+        assert "b.md" not in tracer.format_slowest(1)
+
+    def test_chrome_trace_format(self):
+        """Test that phases and files become complete events with microsecond times"""
+        tracer = PhaseTracer()
+        tracer.mark("parse")
+        tracer.item("parse", "posts/a.md", tracer.now())
+        tracer.finish()
+
+        events = tracer.chrome_trace()["traceEvents"]
+        complete = [event for event in events if event["ph"] == "X"]
+        assert [event["cat"] for event in complete] == ["phase", "parse"]
+        assert complete[0]["ts"] == 0
+        assert complete[1]["args"] == {"file": "posts/a.md"}
+        assert complete[1]["ts"] + complete[1]["dur"] <= complete[0]["ts"] + complete[0]["dur"]
+
+
+class TestTraceOption:
+    """Test bestatic --trace"""
+
+    def test_trace_written(self, test_site, monkeypatch, capsys):
+        """Test that a build with --trace writes a loadable trace and prints the slowest files"""
+        from bestatic import bestatic as cli
+        monkeypatch.setattr(sys, "argv", ["bestatic", "--trace", "trace.json", "--trace-top", "3"])
+        monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+        cli.main()
+
+        with open(test_site / "trace.json") as f:
+            trace = json.load(f)
+        assert any(event.get("cat") == "render" for event in trace["traceEvents"])
+        output = capsys.readouterr().out
+        assert "Slowest 3 files:" in output
+        assert "Build trace written to trace.json" in output